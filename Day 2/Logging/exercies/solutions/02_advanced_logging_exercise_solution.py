@@ -12,86 +12,118 @@ This solution demonstrates:
 5. Proper error context in logs
 """
 
+import asyncio
+import contextvars
 import logging
+import os
+import sys
 import time
 import random
-import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, Token
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Mapping, Optional
 from dataclasses import dataclass, asdict
 from enum import Enum
 from contextlib import contextmanager
-import threading
+
+# queue_logging.py, json_logging.py and sampling_logging.py live with the tutorials
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tutorials'))
+from json_logging import FastJsonFormatter
+from queue_logging import setup_queue_logging
+from sampling_logging import SamplingFilter
 
 # -----------------------------------------------------------------------------
 # Logging Setup
 # -----------------------------------------------------------------------------
 
-class JsonFormatter(logging.Formatter):
-    """Format log records as JSON."""
+class JsonFormatter(FastJsonFormatter):
+    """
+    Format log records as JSON, one object per line.
     
-    def format(self, record: logging.LogRecord) -> str:
-        """Format the log record as JSON."""
-        # Get the regular formatted message
-        message = super().format(record)
-        
-        # Create the base log record
-        log_data = {
-            'timestamp': self.formatTime(record, self.datefmt),
-            'level': record.levelname,
-            'logger': record.name,
-            'message': message
-        }
-        
-        # Add extra fields from the record
-        if hasattr(record, 'batch_id'):
-            log_data['batch_id'] = record.batch_id
-        if hasattr(record, 'object_type'):
-            log_data['object_type'] = record.object_type
-        if hasattr(record, 'duration_ms'):
-            log_data['duration_ms'] = record.duration_ms
-        
-        # Add any extra contextual information
-        context = getattr(record, 'context', {})
-        if context:
-            log_data['context'] = context
-        
-        # Add exception info if present
-        if record.exc_info:
-            log_data['exception'] = self.formatException(record.exc_info)
-        
-        return json.dumps(log_data)
+    The fields are planned once and serialized with orjson when it is
+    installed (see json_logging.py); fields a record lacks, or holds as
+    None or an empty context, are left out. batch_id, object_type and the
+    other LogContext values arrive in 'context' (see ContextFilter).
+    """
+    
+    def __init__(self, datefmt: Optional[str] = None):
+        super().__init__(fields=('duration_ms', 'context'), datefmt=datefmt)
 
 class LogContext:
-    """Thread-local storage for log context."""
-    _context = threading.local()
+    """
+    Logging context for the current thread or asyncio task.
+    
+    Backed by a ContextVar holding a dict that is never changed in place:
+    setting context stores a new dict, so reading it (ContextFilter does
+    once per record) needs no copy and no lock. asyncio tasks start with
+    their creator's context; thread pool workers get it through
+    ContextExecutor.
+    """
+    _context: ContextVar = ContextVar('log_context', default={})
     
     @classmethod
-    def get_context(cls) -> Dict[str, Any]:
-        """Get the current context dictionary."""
-        if not hasattr(cls._context, 'data'):
-            cls._context.data = {}
-        return cls._context.data
+    def get_context(cls) -> Mapping[str, Any]:
+        """Get the current context dictionary (read-only; use set_context)."""
+        return cls._context.get()
     
     @classmethod
-    def set_context(cls, **kwargs):
-        """Update the current context."""
-        cls.get_context().update(kwargs)
+    def set_context(cls, **kwargs) -> Token:
+        """Update the current context; the token undoes it (reset_context)."""
+        return cls._context.set({**cls._context.get(), **kwargs})
+    
+    @classmethod
+    def reset_context(cls, token: Token):
+        """Restore the context from before the set_context() call that gave `token`."""
+        cls._context.reset(token)
     
     @classmethod
     def clear_context(cls):
         """Clear the current context."""
-        if hasattr(cls._context, 'data'):
-            cls._context.data.clear()
+        cls._context.set({})
+
+class ContextFilter(logging.Filter):
+    """
+    Inject the current LogContext into every record.
+    
+    Each context key becomes a record attribute (so formats like
+    %(object_type)s work) unless the call passed it in extra=, and
+    record.context is the context dict itself, shared rather than copied.
+    Keyword arguments are defaults for records logged outside any context.
+    
+    Add it to the logger, not to a handler: handlers behind a queue run on
+    the listener thread, which does not have the caller's context.
+    """
+    
+    def __init__(self, **defaults):
+        super().__init__()
+        self.defaults = defaults
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = LogContext._context.get()
+        attributes = record.__dict__
+        for name, value in context.items():
+            attributes.setdefault(name, value)
+        for name, value in self.defaults.items():
+            attributes.setdefault(name, value)
+        attributes.setdefault('context', context)
+        return True
+
+class ContextExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor whose tasks run in a copy of the submitter's context."""
+    
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
 
 @contextmanager
 def log_context(**kwargs):
-    """Context manager for temporary logging context."""
+    """Context manager for temporary logging context; the outer context comes back on exit."""
+    token = LogContext.set_context(**kwargs)
     try:
-        LogContext.set_context(**kwargs)
         yield
     finally:
-        LogContext.clear_context()
+        LogContext.reset_context(token)
 
 @contextmanager
 def log_performance(logger: logging.Logger, operation: str):
@@ -109,6 +141,8 @@ def log_performance(logger: logging.Logger, operation: str):
             }
         )
 
+CONTEXT_FILTER = ContextFilter()
+
 # -----------------------------------------------------------------------------
 # Business Logic
 # -----------------------------------------------------------------------------
@@ -158,15 +192,31 @@ class BatchMetrics:
 class BatchProcessor:
     """Processes Salesforce objects in batches."""
     
-    def __init__(self, config: BatchConfig):
+    def __init__(self, config: BatchConfig, use_queue: bool = True, console: bool = True,
+                 sampling: Optional[SamplingFilter] = None):
         self.config = config
+        self.use_queue = use_queue
+        self.console = console
+        self.sampling = sampling
+        self.queue_logging = None
+        self.work_seconds = 0.1  # Simulated processing time per record
         self.logger = self._setup_logger()
         self.batch_id = datetime.now().strftime('%Y%m%d_%H%M%S')
     
     def _setup_logger(self) -> logging.Logger:
-        """Setup logging for the batch processor."""
+        """
+        Setup logging for the batch processor.
+        
+        With use_queue (the default) the handlers run on a background
+        listener thread, so process_batch() never waits for JSON formatting
+        or file writes (see queue_logging.py). A `sampling` filter drops
+        per-record events before they are formatted or queued.
+        """
         logger = logging.getLogger(f'salesforce.batch.{self.config.object_type.value.lower()}')
         logger.setLevel(logging.DEBUG)
+        if self.sampling:
+            logger.addFilter(self.sampling)
+        logger.addFilter(CONTEXT_FILTER)  # On the logger: runs on the calling thread
         
         # Console handler with simple format
         console_handler = logging.StreamHandler()
@@ -183,14 +233,34 @@ class BatchProcessor:
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(JsonFormatter())
         
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
+        handlers = [console_handler, file_handler] if self.console else [file_handler]
+        if self.use_queue:
+            self.queue_logging = setup_queue_logging(logger, handlers)
+        else:
+            for handler in handlers:
+                logger.addHandler(handler)
         
         return logger
     
-    def process_batch(self, records: List[Dict]) -> Dict[str, Any]:
-        """Process a batch of records."""
-        with log_context(batch_id=self.batch_id, object_type=self.config.object_type.value):
+    def close(self):
+        """Write out queued records and detach this processor's handlers."""
+        if self.sampling:
+            self.sampling.flush()
+            self.logger.removeFilter(self.sampling)
+        if self.queue_logging:
+            self.queue_logging.stop()
+            handlers = self.queue_logging.listener.handlers
+        else:
+            handlers = list(self.logger.handlers)
+            for handler in handlers:
+                self.logger.removeHandler(handler)
+        for handler in handlers:
+            handler.close()
+    
+    def process_batch(self, records: List[Dict], batch_id: Optional[str] = None) -> Dict[str, Any]:
+        """Process a batch of records (under `batch_id`, default: this processor's)."""
+        with log_context(batch_id=batch_id or self.batch_id,
+                         object_type=self.config.object_type.value):
             self.logger.info(
                 f"Starting batch processing",
                 extra={'record_count': len(records)}
@@ -253,8 +323,9 @@ class BatchProcessor:
             
             try:
                 with log_performance(self.logger, "record_processing"):
-                    # Simulate processing
-                    time.sleep(0.1)
+                    # Simulate processing (sleep(0) alone still costs a thread switch)
+                    if self.work_seconds:
+                        time.sleep(self.work_seconds)
                     
                     # Simulate random failures
                     if random.random() < 0.1:  # 10% chance of failure
@@ -311,11 +382,166 @@ def get_sample_records(object_type: ObjectType, count: int) -> List[Dict]:
     
     return records
 
+def benchmark_queue_logging(batches: int = 10, batch_size: int = 500,
+                            work_seconds=(0, 0.0002)):
+    """
+    Logging cost per process_batch() call with direct and queued handlers.
+    
+    The listener thread needs the GIL to format records, so the queue only
+    pays off when the caller spends time waiting (on the API, the database,
+    ...). Each `work_seconds` value is simulated per-record wait time; 0 is
+    the pure-CPU worst case for the queue.
+    """
+    config = BatchConfig(ObjectType.ACCOUNT, batch_size, timeout_seconds=30, max_retries=3)
+    records = get_sample_records(ObjectType.ACCOUNT, batch_size)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # The file handler writes to the working directory
+        try:
+            for work in work_seconds:
+                print(f"\n{batches} batches x {batch_size} records, "
+                      f"{work * 1000:g} ms simulated work per record, JSON file handler")
+                for use_queue in (False, True):
+                    processor = BatchProcessor(config, use_queue=use_queue, console=False)
+                    processor.work_seconds = work
+                    processor.logger.propagate = False
+                    latencies = []
+                    started = time.perf_counter()
+                    for _ in range(batches):
+                        call_started = time.perf_counter()
+                        processor.process_batch(records)
+                        latencies.append(time.perf_counter() - call_started)
+                    hot_seconds = time.perf_counter() - started
+                    processor.close()
+                    total_seconds = time.perf_counter() - started
+                    
+                    with open(f'batch_{ObjectType.ACCOUNT.value.lower()}.json.log') as f:
+                        written = sum(1 for _ in f)
+                    os.remove(f.name)
+                    latencies.sort()
+                    name = 'QueueHandler' if use_queue else 'direct FileHandler'
+                    print(f"{name:>18}: {written / hot_seconds:9,.0f} records/s on the caller, "
+                          f"{latencies[len(latencies) // 2] * 1000:6.1f} ms median per batch, "
+                          f"{total_seconds:.2f}s until all {written:,} records were written")
+        finally:
+            os.chdir(cwd)
+
+def stress_test_log_context(batches: int = 64, batch_size: int = 20):
+    """
+    Run `batches` batches at once and check that no context leaks between them.
+    
+    Half run process_batch() on ContextExecutor threads; the other half are
+    asyncio tasks on one thread that interleave their records and hand
+    some logging to the same pool. Every record must carry the run's outer
+    context and its own batch's batch_id, and record_id context must match
+    that batch.
+    """
+    config = BatchConfig(ObjectType.ACCOUNT, batch_size, timeout_seconds=30, max_retries=3)
+    sample = get_sample_records(ObjectType.ACCOUNT, batch_size)
+    collected = []
+    
+    def batch_records(i):
+        return [dict(record, id=f"B{i:02d}_{record['id']}") for record in sample]
+    
+    class Collector(logging.Handler):
+        def emit(self, record):
+            collected.append(record)
+    
+    async def async_batch(i, logger, pool):
+        loop = asyncio.get_running_loop()
+        with log_context(batch_id=f"B{i:02d}", object_type=ObjectType.ACCOUNT.value):
+            for record in batch_records(i):
+                with log_context(record_id=record['id']):
+                    logger.info("Processing record in task")
+                    await asyncio.sleep(0)  # Let the other batches' tasks run in between
+                    await loop.run_in_executor(pool, logger.info, "Processing record in worker")
+    
+    async def async_batches(logger, pool):
+        await asyncio.gather(*(async_batch(i, logger, pool)
+                               for i in range(batches // 2, batches)))
+    
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # The file handler writes to the working directory
+        try:
+            processor = BatchProcessor(config, console=False)
+            processor.work_seconds = 0.001
+            processor.logger.propagate = False
+            processor.logger.addHandler(Collector())
+            started = time.perf_counter()
+            with log_context(stress_run='log-context'):
+                with ContextExecutor(max_workers=16) as pool:
+                    futures = [pool.submit(processor.process_batch, batch_records(i), f"B{i:02d}")
+                               for i in range(batches // 2)]
+                    asyncio.run(async_batches(processor.logger, pool))
+                    for future in futures:
+                        future.result()
+            elapsed = time.perf_counter() - started
+            processor.close()
+        finally:
+            os.chdir(cwd)
+    
+    def leaked(record):
+        batch_id = getattr(record, 'batch_id', None)
+        return (batch_id is None or record.context.get('stress_run') != 'log-context'
+                or not record.context.get('record_id', batch_id).startswith(batch_id))
+    
+    leaks = [record for record in collected if leaked(record)]
+    batch_ids = {getattr(record, 'batch_id', None) for record in collected} - {None}
+    print(f"{len(collected):,} records from {len(batch_ids)} concurrent batches in {elapsed:.2f}s, "
+          f"{len(leaks)} with another batch's context")
+    assert len(batch_ids) == batches and not leaks
+    assert not LogContext.get_context(), "context left behind after the run"
+
+def benchmark_sampling(batches: int = 20, batch_size: int = 5000):
+    """
+    Log volume and caller cost of per-record events, unfiltered vs sampled.
+    
+    The sampled run keeps 1% of DEBUG and INFO, and lets each message
+    template through at most 20 times a second; failures (ERROR) are rate
+    limited too but every dropped line is counted in a summary.
+    """
+    config = BatchConfig(ObjectType.ACCOUNT, batch_size, timeout_seconds=30, max_retries=3)
+    records = get_sample_records(ObjectType.ACCOUNT, batch_size)
+    policies = {
+        'no sampling': None,
+        'sampled': lambda: SamplingFilter(
+            rates={'salesforce.batch': {logging.DEBUG: 0.01, logging.INFO: 0.01}},
+            rate_limit=20, summary_interval=1.0, exempt_level=logging.CRITICAL),
+    }
+    print(f"{batches} batches x {batch_size} records, no simulated work, queued JSON file handler")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # The file handler writes to the working directory
+        try:
+            for name, policy in policies.items():
+                processor = BatchProcessor(config, console=False, sampling=policy and policy())
+                processor.work_seconds = 0
+                processor.logger.propagate = False
+                started = time.perf_counter()
+                for i in range(batches):
+                    processor.process_batch(records, f"B{i:02d}")
+                hot_seconds = time.perf_counter() - started
+                processor.close()
+                
+                path = f'batch_{ObjectType.ACCOUNT.value.lower()}.json.log'
+                with open(path) as f:
+                    lines = f.readlines()
+                summaries = sum('similar messages suppressed' in line for line in lines)
+                overflows = sum('Log queue overflow' in line for line in lines)
+                print(f"{name:>12}: {batches * batch_size / hot_seconds:9,.0f} records/s on the caller, "
+                      f"{len(lines):,} lines ({summaries} sampling summaries, "
+                      f"{overflows} queue overflow reports), {os.path.getsize(path) / 1e6:.1f} MB")
+                os.remove(path)
+        finally:
+            os.chdir(cwd)
+
 def main():
     """Main function demonstrating batch processing."""
     # Setup root logger
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger('salesforce.batch')
+    logger.addFilter(CONTEXT_FILTER)
     
     logger.info("Starting batch processing demonstration")
     
@@ -350,7 +576,9 @@ def main():
                         exc_info=True,
                         extra={'batch_number': i//config.batch_size + 1}
                     )
-    
+
+            processor.close()
+
     logger.info("Batch processing demonstration completed")
 
 if __name__ == "__main__":
@@ -18,6 +18,8 @@ import logging.handlers
 import time
 import random
 import json
+import os
+import sys
 import yaml
 from datetime import datetime
 from typing import Dict, List, Optional
@@ -25,6 +27,10 @@ from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 
+# lazy_logging.py lives with the tutorials
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tutorials'))
+from lazy_logging import EventLogger
+
 # -----------------------------------------------------------------------------
 # Logging Configuration
 # -----------------------------------------------------------------------------
@@ -163,12 +169,14 @@ class SalesforceMonitor:
             "Streaming API",
             "Metadata API"
         ]
-        self.logger = logging.getLogger('salesforce.service')
+        # Level-gated: disabled calls cost a level check, and payloads are
+        # callables built only for records a handler writes
+        self.logger = EventLogger(logging.getLogger('salesforce.service'))
     
     def check_service_health(self, service: str) -> ServiceMetrics:
         """Check health of a specific service."""
-        self.logger.info(f"Checking health of {service}")
-        self.logger.debug(f"Starting health check for {service}")
+        self.logger.info("Checking health of %s", service)
+        self.logger.debug("Starting health check for %s", service)
         
         # Simulate service check
         time.sleep(0.5)
@@ -196,25 +204,23 @@ class SalesforceMonitor:
         
         # Log results with appropriate levels
         self.logger.info(
-            f"Service check completed for {service}",
-            extra={'metrics': metrics.to_dict()}
+            "Service check completed for %s", service,
+            metrics=metrics.to_dict
         )
         
         self.logger.debug(
-            f"Service metrics",
-            extra={
-                'service': service,
-                'response_time': response_time,
-                'success_rate': success_rate
-            }
+            "Service metrics",
+            service=service,
+            response_time=response_time,
+            success_rate=success_rate
         )
         
         if status != ServiceStatus.HEALTHY:
             level = logging.CRITICAL if status == ServiceStatus.DOWN else logging.WARNING
             self.logger.log(
                 level,
-                f"Service {service} is {status.value}",
-                extra={'metrics': metrics.to_dict()}
+                "Service %s is %s", service, status.value,
+                metrics=metrics.to_dict
             )
         
         return metrics
@@ -236,7 +242,7 @@ class DataSyncMonitor:
         results = {}
         
         for process, config in self.sync_processes.items():
-            self.logger.debug(f"Checking sync status for {process}")
+            self.logger.debug("Checking sync status for %s", process)
             
             # Simulate check
             time.sleep(0.3)
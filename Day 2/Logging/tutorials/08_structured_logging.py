@@ -1,6 +1,5 @@
 import logging
 import logging.config
-import json
 import time
 import threading
 import queue
@@ -9,6 +8,9 @@ from typing import Dict, Any, Optional
 from dataclasses import dataclass, asdict
 from contextlib import contextmanager
 
+from json_logging import FastJsonFormatter
+from queue_logging import setup_queue_logging
+
 
 @dataclass
 class SalesforceEvent:
@@ -29,41 +31,30 @@ class SalesforceEvent:
 class StructuredLogger:
     """Logger that handles structured data."""
     
-    def __init__(self, name: str):
+    def __init__(self, name: str, use_queue: bool = True):
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.INFO)
+        self.queue_logging = None
         
         # Setup JSON handler
         handler = logging.FileHandler('structured.log')
         handler.setFormatter(JsonFormatter())
-        self.logger.addHandler(handler)
+        if use_queue:
+            # JSON formatting and the file write happen on a listener thread
+            self.queue_logging = setup_queue_logging(self.logger, [handler])
+        else:
+            self.logger.addHandler(handler)
     
     def log_event(self, event: SalesforceEvent, level: int = logging.INFO):
         """Log a structured event."""
         self.logger.log(level, '', extra={'event': event.to_dict()})
 
-class JsonFormatter(logging.Formatter):
+class JsonFormatter(FastJsonFormatter):
     """Format log records as JSON."""
     
-    def format(self, record: logging.LogRecord) -> str:
-        """Format the log record as JSON."""
-        data = {
-            'timestamp': self.formatTime(record, self.datefmt),
-            'level': record.levelname,
-            'logger': record.name
-        }
-        
-        # Add event data if present
-        if hasattr(record, 'event'):
-            data['event'] = record.event
-        else:
-            data['message'] = record.getMessage()
-        
-        # Add exception info if present
-        if record.exc_info:
-            data['exception'] = self.formatException(record.exc_info)
-        
-        return json.dumps(data)
+    def __init__(self, datefmt: Optional[str] = None):
+        # Event records carry everything in 'event' and have an empty message
+        super().__init__(fields=('event',), datefmt=datefmt, omit_empty_message=True)
 
 def demonstrate_structured_logging():
     """Demonstrate structured logging."""
@@ -0,0 +1,220 @@
+"""
+Lazy, level-gated structured log events.
+
+    logger.debug(f"Metrics for {service}", extra={'metrics': metrics.to_dict()})
+
+pays for the f-string and for to_dict() on every call, even when DEBUG is
+off and the record is thrown away. EventLogger keeps the logger.debug(...)
+call shape but defers all of that work:
+
+    log = EventLogger(logging.getLogger('salesforce.service'))
+    log.debug("Metrics for %s", service, metrics=metrics.to_dict)
+
+- Nothing past the level check runs when the level is disabled: no
+  LogRecord, no message formatting, no payload.
+- Keyword arguments other than logging's own (exc_info, extra, ...) become
+  fields on the record, like extra= entries. A callable field is wrapped
+  in Lazy and only called when a handler formats the record, so a record
+  that reaches no handler (or only handlers above its level) never builds
+  its payload.
+- when_enabled() turns a whole logging helper into a no-op while its
+  level is off.
+
+Lazy values resolve when they are formatted: str() (so %(metrics)s and %s
+args work), FastJsonFormatter (json_logging.py), or the queue handler in
+queue_logging.py, which resolves them before the record leaves the
+calling thread.
+
+Compare the disabled-level cost per call with:
+python lazy_logging.py
+"""
+
+import functools
+import logging
+import timeit
+from typing import Any, Callable
+
+# Keyword arguments Logger.log() takes itself; every other keyword is a field
+LOGGING_KWARGS = frozenset(('exc_info', 'stack_info', 'stacklevel', 'extra'))
+
+
+class Lazy:
+    """A value computed on first use and then kept."""
+
+    __slots__ = ('func', 'computed', 'result')
+
+    def __init__(self, func: Callable[[], Any]):
+        self.func = func
+        self.computed = False
+        self.result = None
+
+    @property
+    def value(self) -> Any:
+        if not self.computed:
+            self.result = self.func()
+            self.computed = True
+            self.func = None  # Let go of whatever the callable closed over
+        return self.result
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+    def __repr__(self) -> str:
+        return repr(self.value)
+
+
+def resolve_lazy_fields(record: logging.LogRecord):
+    """Replace the record's Lazy fields with their values."""
+    for name in getattr(record, 'lazy_fields', ()):
+        value = record.__dict__[name]
+        if type(value) is Lazy:
+            record.__dict__[name] = value.value
+
+
+class EventLogger(logging.LoggerAdapter):
+    """
+    Logger adapter for structured events with lazily built payloads.
+
+    Call it like a logger: log.info(msg, *args, exc_info=..., **fields).
+    Fields are added to the record (callables as Lazy), next to any
+    `extra` given here or to the adapter. Field names must not clash with
+    LogRecord attributes ('name', 'message', 'args', ...).
+    """
+
+    def __init__(self, logger: logging.Logger, extra: dict = None):
+        super().__init__(logger, extra or {})
+
+    # The level methods check the level before anything else is built; the
+    # generic LoggerAdapter path costs a few extra calls even when disabled
+
+    def debug(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.log_event(logging.DEBUG, msg, args, kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.INFO):
+            self.log_event(logging.INFO, msg, args, kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.WARNING):
+            self.log_event(logging.WARNING, msg, args, kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.ERROR):
+            self.log_event(logging.ERROR, msg, args, kwargs)
+
+    def exception(self, msg, *args, exc_info=True, **kwargs):
+        if self.logger.isEnabledFor(logging.ERROR):
+            kwargs['exc_info'] = exc_info
+            self.log_event(logging.ERROR, msg, args, kwargs)
+
+    def critical(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.CRITICAL):
+            self.log_event(logging.CRITICAL, msg, args, kwargs)
+
+    def log(self, level, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(level):
+            self.log_event(level, msg, args, kwargs)
+
+    def log_event(self, level, msg, args, kwargs):
+        msg, kwargs = self.process(msg, kwargs)
+        # Report the caller of debug()/info()/..., not this module
+        kwargs['stacklevel'] = kwargs.get('stacklevel', 1) + 2
+        self.logger.log(level, msg, *args, **kwargs)
+
+    def process(self, msg, kwargs):
+        extra = dict(self.extra)
+        if kwargs.get('extra'):
+            extra.update(kwargs['extra'])
+        lazy_fields = []
+        for name in [name for name in kwargs if name not in LOGGING_KWARGS]:
+            value = kwargs.pop(name)
+            if callable(value):
+                value = Lazy(value)
+                lazy_fields.append(name)
+            extra[name] = value
+        if lazy_fields:
+            extra['lazy_fields'] = tuple(lazy_fields)
+        kwargs['extra'] = extra
+        return msg, kwargs
+
+
+def when_enabled(logger, level: int = logging.DEBUG):
+    """
+    Decorator: skip the function entirely unless `logger` is enabled for `level`.
+
+    For helpers that only gather and log diagnostics; the wrapped function
+    returns None while the level is off. The check uses the logger's level
+    cache, so it follows later setLevel()/dictConfig() changes.
+    """
+    if isinstance(logger, logging.LoggerAdapter):
+        logger = logger.logger
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if logger.isEnabledFor(level):
+                return func(*args, **kwargs)
+            return None
+        return wrapper
+    return decorator
+
+
+def benchmark_disabled_logging(number: int = 200_000):
+    """Nanoseconds per logging call with DEBUG disabled, then with DEBUG reaching no handler."""
+    from dataclasses import asdict, dataclass
+
+    @dataclass
+    class Metrics:
+        name: str
+        status: str
+        response_time_ms: float
+        error_count: int
+        success_rate: float
+
+        def to_dict(self):
+            return asdict(self)
+
+    logger = logging.getLogger('benchmark.lazy')
+    logger.propagate = False
+    handler = logging.NullHandler()
+    logger.addHandler(handler)
+    log = EventLogger(logger)
+    metrics = Metrics('REST API', 'Healthy', 431.25, 2, 0.97)
+    service = metrics.name
+
+    @when_enabled(logger)
+    def log_metrics():
+        logger.debug(f"Service metrics for {service}", extra={'metrics': metrics.to_dict()})
+
+    calls = {
+        'f-string + to_dict() (eager)':
+            lambda: logger.debug(f"Service metrics for {service}",
+                                 extra={'metrics': metrics.to_dict()}),
+        '%s args, no payload':
+            lambda: logger.debug("Service metrics for %s", service),
+        'EventLogger, lazy payload':
+            lambda: log.debug("Service metrics for %s", service, metrics=metrics.to_dict),
+        '@when_enabled helper':
+            log_metrics,
+        'isEnabledFor() guard':
+            lambda: logger.isEnabledFor(logging.DEBUG) and logger.debug(
+                f"Service metrics for {service}", extra={'metrics': metrics.to_dict()}),
+    }
+
+    def run(title):
+        print(f"\n{title}")
+        for name, call in calls.items():
+            best = min(timeit.repeat(call, number=number, repeat=5))
+            print(f"{name:>30}: {best / number * 1e9:8.0f} ns/call")
+
+    logger.setLevel(logging.INFO)
+    run("Logger at INFO (DEBUG disabled):")
+    logger.setLevel(logging.DEBUG)
+    handler.setLevel(logging.INFO)
+    run("Logger at DEBUG, only an INFO handler (records built, none emitted):")
+    logger.removeHandler(handler)
+
+
+if __name__ == '__main__':
+    benchmark_disabled_logging()
@@ -0,0 +1,245 @@
+"""
+Non-blocking logging through a queue.
+
+A logger set up with setup_queue_logging() only puts records on a queue;
+a background QueueListener thread formats them and writes them to the real
+handlers. The thread doing the work never waits for JSON formatting or
+disk I/O.
+
+- Writes are batched: the listener drains whatever is queued (up to
+  `batch_size` records) and flushes the handlers once per `flush_interval`
+  instead of after every record. WARNING and above flush right away.
+  Stream and file handlers get each batch as writes to their stream (one
+  NDJSON block with a FastJsonFormatter); other handlers, including any
+  subclass with its own emit(), get their usual per-record handle().
+- The queue is bounded. When it fills past `debug_high_water`, DEBUG records
+  are dropped first; INFO is dropped only when the queue is completely full;
+  WARNING and above are never dropped (the caller waits for room instead).
+  Dropped records are reported by a periodic WARNING summary.
+
+Usage:
+    handler = logging.FileHandler('app.log')
+    queue_logging = setup_queue_logging(logger, [handler])
+    ...
+    queue_logging.stop()  # also done automatically at exit
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from collections import Counter
+from typing import List, Union
+
+from lazy_logging import resolve_lazy_fields
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler with a bounded queue that sheds DEBUG, then INFO, under load."""
+
+    def __init__(self, log_queue: queue.Queue, debug_high_water: float = 0.8):
+        super().__init__(log_queue)
+        self.debug_limit = int(log_queue.maxsize * debug_high_water) if log_queue.maxsize else 0
+        self.dropped = Counter()
+        self.dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Merge args into the message and compute Lazy fields now, while the
+        values they read are current; formatting is left to the listener.
+        """
+        resolve_lazy_fields(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if record.levelno <= logging.DEBUG and self.debug_limit \
+                and self.queue.qsize() >= self.debug_limit:
+            self.drop(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record)  # Never lose warnings and errors
+            else:
+                self.drop(record)
+
+    def drop(self, record: logging.LogRecord):
+        with self.dropped_lock:
+            self.dropped[record.levelname] += 1
+
+    def take_dropped(self) -> Counter:
+        with self.dropped_lock:
+            dropped, self.dropped = self.dropped, Counter()
+        return dropped
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """QueueListener that handles records in batches and flushes on an interval."""
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler,
+                 batch_size: int = 512, flush_interval: float = 1.0,
+                 source: DroppingQueueHandler = None):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.source = source
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # Blocking: the queue may be full
+
+    def _monitor(self):
+        q = self.queue
+        last_flush = time.monotonic()
+        pending = False  # Records written since the last flush
+        stopping = False
+        while not stopping:
+            timeout = max(0.0, last_flush + self.flush_interval - time.monotonic()) \
+                if pending else self.flush_interval
+            try:
+                batch = [q.get(timeout=timeout)]
+            except queue.Empty:
+                batch = []
+            while batch and batch[-1] is not self._sentinel and len(batch) < self.batch_size:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            if batch and batch[-1] is self._sentinel:
+                batch.pop()
+                stopping = True
+            self.handle_batch(batch)
+            pending = pending or bool(batch)
+            urgent = any(record.levelno >= logging.WARNING for record in batch)
+            if pending and (urgent or stopping
+                            or time.monotonic() - last_flush >= self.flush_interval):
+                self.report_dropped()
+                for handler in self.handlers:
+                    handler.flush()
+                pending = False
+                last_flush = time.monotonic()
+            elif not batch and not pending:
+                self.report_dropped()
+
+    def handle_batch(self, records: List[logging.LogRecord]):
+        """
+        Handle a batch of records.
+
+        Plain stream and file handlers have the batch written to their stream
+        under the handler's lock, without emit()'s flush per record; the
+        listener flushes them on its interval. A formatter with format_batch()
+        (FastJsonFormatter in json_logging.py) makes it one NDJSON write.
+        Every other handler gets the records one by one through handle().
+        """
+        for handler in self.handlers:
+            if not _is_plain_stream(handler):
+                for record in records:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+                continue
+            selected = [record for record in records
+                        if record.levelno >= handler.level and handler.filter(record)]
+            if not selected:
+                continue
+            format_batch = getattr(handler.formatter, 'format_batch', None)
+            with handler.lock:
+                stream = handler.stream
+                if format_batch is not None and handler.terminator == '\n':
+                    try:
+                        stream.write(format_batch(selected))
+                    except Exception:
+                        handler.handleError(selected[0])
+                    continue
+                for record in selected:
+                    try:
+                        stream.write(handler.format(record) + handler.terminator)
+                    except Exception:
+                        handler.handleError(record)
+
+    def report_dropped(self):
+        """Log one summary record for everything dropped since the last one."""
+        dropped = self.source.take_dropped() if self.source else None
+        if not dropped:
+            return
+        counts = ', '.join(f"{count} {level}" for level, count in sorted(dropped.items()))
+        record = logging.LogRecord('logging.queue', logging.WARNING, __file__, 0,
+                                   f"Log queue overflow: dropped {counts} records",
+                                   None, None)
+        self.handle(record)
+        for handler in self.handlers:
+            handler.flush()
+
+
+# emit() methods that do nothing but format, write and flush; a subclass with
+# its own emit() (rotating, colouring, redacting...) must keep getting called
+PLAIN_EMITS = (logging.StreamHandler.emit, logging.FileHandler.emit)
+
+
+def _is_plain_stream(handler: logging.Handler) -> bool:
+    """A stream or file handler with an open stream and the stock emit()."""
+    return type(handler).emit in PLAIN_EMITS and getattr(handler, 'stream', None) is not None
+
+
+class QueueLogging:
+    """A running queue setup: the handler on the logger and its listener."""
+
+    def __init__(self, logger: logging.Logger, handler: DroppingQueueHandler,
+                 listener: BatchingQueueListener):
+        self.logger = logger
+        self.handler = handler
+        self.listener = listener
+        self.stopped = False
+
+    def stop(self):
+        """Write out everything still queued and detach from the logger."""
+        if self.stopped:
+            return
+        self.stopped = True
+        atexit.unregister(self.stop)  # Don't keep a stopped setup alive until exit
+        self.logger.removeHandler(self.handler)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def setup_queue_logging(logger: Union[logging.Logger, str], handlers: List[logging.Handler],
+                        queue_size: int = 10_000, batch_size: int = 512,
+                        flush_interval: float = 1.0, debug_high_water: float = 0.8) -> QueueLogging:
+    """
+    Route `logger` through a bounded queue to `handlers` on a background thread.
+
+    Args:
+        logger: Logger (or logger name) to attach the queue handler to
+        handlers: The real handlers; they keep their own levels and formatters
+        queue_size: Records the queue holds before shedding load
+        batch_size: Most records the listener handles between queue checks
+        flush_interval: Longest time (seconds) a written record may sit unflushed
+        debug_high_water: Queue fill ratio above which DEBUG records are dropped
+
+    Returns:
+        QueueLogging; call stop() to drain the queue (registered with atexit too)
+    """
+    if isinstance(logger, str):
+        logger = logging.getLogger(logger)
+    log_queue = queue.Queue(maxsize=queue_size)
+    handler = DroppingQueueHandler(log_queue, debug_high_water)
+    # Records no real handler would emit never enter the queue
+    handler.setLevel(min(h.level for h in handlers))
+    listener = BatchingQueueListener(log_queue, *handlers, batch_size=batch_size,
+                                     flush_interval=flush_interval, source=handler)
+    logger.addHandler(handler)
+    listener.start()
+    queue_logging = QueueLogging(logger, handler, listener)
+    atexit.register(queue_logging.stop)
+    return queue_logging
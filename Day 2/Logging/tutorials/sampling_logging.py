@@ -0,0 +1,137 @@
+"""
+Sampling and rate limiting for high-volume log events.
+
+Per-record logging in a batch job of millions of records writes millions
+of near-identical lines. SamplingFilter thins them out before anything is
+formatted or queued:
+
+    sampling = SamplingFilter(
+        rates={'salesforce.batch': {logging.DEBUG: 0.01}},  # Keep 1% of DEBUG
+        rate_limit=50,                                       # Per template, per second
+    )
+    logger.addFilter(sampling)
+
+- Probabilistic sampling per logger and level. A logger's rates apply to
+  its children too; the most specific name wins ('' covers every logger).
+- A token bucket per message template (logger, level and the unformatted
+  msg): at most `rate_limit` records per second after a burst of `burst`.
+  Templates are the msg before %-formatting, so log with
+  logger.info("Processed %s", record_id), not an f-string.
+- Every `summary_interval` seconds, each template that had records dropped
+  gets one "N similar messages suppressed" record on its own logger.
+- Records at `exempt_level` (WARNING by default) and above always pass.
+
+Add it to the logger rather than a handler: logger filters run before any
+handler, so a dropped record is never formatted, queued or written, and
+the summaries go to all of the logger's handlers. Call flush() before
+shutting down to log the last summaries.
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+SUMMARY_MESSAGE = "%d similar messages suppressed in the last %.1fs: %r"
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Drop a share of records per logger and level, and rate-limit each message template.
+
+    Args:
+        rates: {logger name: {level: share of records to keep}}; levels not
+            listed keep everything
+        rate_limit: Records per second allowed per template (None: no limit)
+        burst: Records a template may log at once before the limit applies
+            (default: rate_limit)
+        summary_interval: Seconds between "suppressed" summaries
+        exempt_level: Records at this level and above are never dropped
+    """
+
+    def __init__(self, rates: Optional[Dict[str, Dict[int, float]]] = None,
+                 rate_limit: Optional[float] = None, burst: Optional[float] = None,
+                 summary_interval: float = 10.0, exempt_level: int = logging.WARNING):
+        super().__init__()
+        self.rates = rates or {}
+        self.rate_limit = rate_limit
+        self.burst = burst or rate_limit
+        self.summary_interval = summary_interval
+        self.exempt_level = exempt_level
+        self.resolved = {}  # (logger name, level) -> share to keep
+        self.buckets = {}  # (logger name, level, template) -> [tokens, last refill]
+        self.suppressed = {}  # (logger name, level, template) -> [count, pathname, lineno]
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.next_summary = self.window_start + summary_interval
+
+    def rate_for(self, name: str, level: int) -> float:
+        """The share of `name`'s records at `level` to keep, from the closest configured logger."""
+        while True:
+            levels = self.rates.get(name)
+            if levels is not None and level in levels:
+                return levels[level]
+            if not name:
+                return 1.0
+            name = name.rpartition('.')[0]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.exempt_level or 'suppressed_count' in record.__dict__:
+            return True
+        level_key = (record.name, record.levelno)
+        rate = self.resolved.get(level_key)
+        if rate is None:
+            rate = self.resolved[level_key] = self.rate_for(*level_key)
+        keep = rate >= 1.0 or random.random() < rate
+        now = time.monotonic()
+        if keep and self.rate_limit is None and now < self.next_summary:
+            return True  # The common case: no lock taken
+
+        template = record.msg if type(record.msg) is str else str(record.msg)
+        key = (record.name, record.levelno, template)
+        with self.lock:
+            if keep and self.rate_limit is not None:
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    bucket = self.buckets[key] = [self.burst, now]
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate_limit)
+                bucket[1] = now
+                if bucket[0] >= 1:
+                    bucket[0] -= 1
+                else:
+                    keep = False
+            if not keep:
+                entry = self.suppressed.get(key)
+                if entry is None:
+                    self.suppressed[key] = [1, record.pathname, record.lineno]
+                else:
+                    entry[0] += 1
+        if now >= self.next_summary:
+            self.flush()
+        return keep
+
+    def flush(self):
+        """
+        Log one summary per template that had records dropped since the last summary.
+
+        Also forgets buckets that have been idle long enough to refill to
+        `burst`, which a new bucket would start with anyway, so one-off
+        messages (f-strings) don't pile up.
+        """
+        with self.lock:
+            suppressed, self.suppressed = self.suppressed, {}
+            now = time.monotonic()
+            elapsed = now - self.window_start
+            self.window_start = now
+            self.next_summary = now + self.summary_interval
+            if self.rate_limit:
+                refill = self.burst / self.rate_limit
+                self.buckets = {key: bucket for key, bucket in self.buckets.items()
+                                if now - bucket[1] < refill}
+            self.resolved = {}  # Cheap to rebuild; drops loggers that have gone quiet
+        for (name, level, template), (count, pathname, lineno) in suppressed.items():
+            summary = logging.LogRecord(name, level, pathname, lineno, SUMMARY_MESSAGE,
+                                        (count, elapsed, template), None)
+            summary.suppressed_count = count  # Lets the summary through this filter
+            logging.getLogger(name).handle(summary)
@@ -1,4 +1,4 @@
-import requests
+from http_cache import cached_session
 
 # Example URL (replace with actual URL in training)
 url = "https://www.maxi.rs/online/Smrznuti-proizvodi/c/06"
@@ -10,8 +10,11 @@ headers = {
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
 }
 
-# Make request with proper error handling
-response = requests.get(url, headers=headers, timeout=10)
+# Make request with proper error handling. The session answers repeated runs
+# from http_cache.db (revalidating once the page is stale), so iterating on
+# this script doesn't refetch the page every time
+session = cached_session("http_cache.db")
+response = session.get(url, headers=headers, timeout=10)
 response.raise_for_status()
 
 # Print the source code
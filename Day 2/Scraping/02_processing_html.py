@@ -7,12 +7,14 @@ This tutorial demonstrates how to extract data from HTML using BeautifulSoup.
 We'll scrape a product page to extract basic product information.
 """
 
-import requests
 from bs4 import BeautifulSoup
 
-# 1. Get the webpage content
+from http_cache import cached_session
+
+# 1. Get the webpage content (cached in http_cache.db between runs)
 url = "https://pypi.org/project/tensorflow/"
-response = requests.get(url)
+session = cached_session("http_cache.db")
+response = session.get(url)
 
 # 2. Create BeautifulSoup object
 # 'html.parser' is Python's built-in parser
@@ -1,15 +1,37 @@
 from selenium import webdriver 
 from selenium.webdriver.common.by import By 
 from webdriver_manager.chrome import ChromeDriverManager 
-from selenium.common.exceptions import WebDriverException 
+from selenium.common.exceptions import WebDriverException, TimeoutException 
 from selenium.webdriver.chrome.service import Service 
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
 
+import os
+import csv
+import json
 import time 
 import hashlib 
-import pandas as pd 
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
+import requests
 from tqdm import tqdm 
-from bs4 import BeautifulSoup 
+from bs4 import BeautifulSoup, SoupStrainer
+
+USER_AGENT = "Chrome/51.0.2704.79 Safari/537.36 Edge/14.14393"
+
+# Column order of the output CSV (the order the scraper builds each product in)
+CSV_COLUMNS = [
+    "product_name", "original_url", "currency", "brand_name", "quantity_measurement",
+    "product_image", "price_per_unit", "price", "is_available", "old_price",
+    "old_price_per_unit", "discount", "product_hash", "product_id", "discount_start",
+    "discount_end", "category",
+]
+
+# Parse only the parts of a page we read; the rest of the ~600 KB shell is skipped
+PRODUCT_ITEMS = SoupStrainer("li", attrs={"class": "product-item"})
+PROMO_DATE = SoupStrainer("span", attrs={"data-testid": "tag-promo-expiration-date"})
  
 class ScraperBase(object): 
  
@@ -26,7 +48,7 @@ class ScraperBase(object):
         self.chrome_options.add_argument('--no-sandbox') 
         self.chrome_options.add_argument('--disable-dev-shm-usage') 
         self.chrome_options.add_argument("--ignore-certificate-errors") 
-        self.chrome_options.add_argument("user-agent=Chrome/51.0.2704.79 Safari/537.36 Edge/14.14393") 
+        self.chrome_options.add_argument(f"user-agent={USER_AGENT}") 
         self.chrome_options.add_argument("--disable-extensions") 
  
         self._driver_start() 
@@ -71,31 +93,82 @@ class ScraperBase(object):
 
 
 class MaxiScraper(ScraperBase): 
+    """
+    Scrapes Maxi category listings in two stages:
+
+    1. Listing pages are loaded one after another in the browser, waiting
+       for the product list to appear instead of sleeping a fixed time.
+    2. Product pages of discounted items (needed only for the promo dates)
+       are fetched concurrently over plain HTTP by a pool of `workers`
+       threads, while the browser moves on to the next listing page.
+       maxi.rs renders the promo block client-side, so a page whose HTML
+       has no promo element is loaded in the browser after all.
+
+    Rows are appended to the CSV as each listing page completes, and a
+    checkpoint file records the next page per category, so an interrupted
+    run resumes where it stopped instead of starting over.
+
+    With use_browser=False listing pages are fetched over HTTP as well,
+    which works for server-rendered pages such as the local fixture site
+    (maxi_fixture.py).
+    """
  
-    def __init__(self, headless=True): 
-        super().__init__(headless) 
- 
-        self.home_link = "https://www.maxi.rs" 
+    def __init__(self, headless=True, home_link="https://www.maxi.rs", links_to_scrape=None,
+                 workers=8, use_browser=True, wait_timeout=10):
+        if use_browser:
+            super().__init__(headless)
+        else:
+            self.headless = headless
+            self.driver = None
+
+        self.home_link = home_link
          
-        self.links_to_scrape = [ 
-            "https://www.maxi.rs/online/Smrznuti-proizvodi/c/06", 
-        ] 
+        self.links_to_scrape = links_to_scrape or [
+            self.home_link + "/online/Smrznuti-proizvodi/c/06",
+        ]
+
+        self.workers = workers
+        self.wait_timeout = wait_timeout
+        self._local = threading.local()
          
     def __link_builder(self, link, page_num): 
         return link + "?pageNumber={}".format(page_num) 
- 
-    def __get_discount_dates(self, url): 
-         
-        _ = self.driver.get(url) 
-         
-        time.sleep(3) 
-        product_page_obj = BeautifulSoup(self.driver.page_source, 'lxml') 
+
+    def _session(self):
+        """One keep-alive HTTP session per worker thread."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+        return session
+
+    def __load_listing(self, page_link):
+        """Return the listing page's products, waiting until they are rendered."""
+        if self.driver is None:
+            page_source = self._session().get(page_link, timeout=self.wait_timeout).text
+        else:
+            _ = self.driver.get(page_link)
+            try:
+                WebDriverWait(self.driver, self.wait_timeout).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "li.product-item")))
+            except TimeoutException:
+                pass  # Past the last page no products ever appear
+            page_source = self.driver.page_source
+        return BeautifulSoup(page_source, 'lxml', parse_only=PRODUCT_ITEMS).find_all(
+            "li", {"class": "product-item"})
+
+    def __parse_discount_dates(self, page_source):
+        """(start, end) from the promo block; None if the page has no promo block at all."""
+        product_page_obj = BeautifulSoup(page_source, 'lxml', parse_only=PROMO_DATE)
          
         start = None 
         end = None 
          
+        promo = product_page_obj.find("span", attrs={'data-testid' : "tag-promo-expiration-date"})
+        if promo is None:
+            return None
         try: 
-            date = product_page_obj.find("span", attrs={'data-testid' : "tag-promo-expiration-date"}).text 
+            date = promo.text 
  
             parts = date.lower().split("do") 
             end = parts[-1].strip() 
@@ -104,6 +177,29 @@ class MaxiScraper(ScraperBase):
             start = "" 
             end = "" 
         return start, end 
+
+    def __get_discount_dates(self, url):
+        """Runs on a worker thread: fetch a product page over HTTP.
+
+        None if the fetch failed or the HTML has no promo block (not rendered
+        server-side); the browser has to load those pages.
+        """
+        try:
+            response = self._session().get(url, timeout=self.wait_timeout)
+            response.raise_for_status()
+        except requests.RequestException:
+            return None
+        return self.__parse_discount_dates(response.text)
+
+    def __get_discount_dates_browser(self, url):
+        """Fallback for product pages whose promo block the HTTP fetch didn't get."""
+        _ = self.driver.get(url)
+        try:
+            WebDriverWait(self.driver, self.wait_timeout).until(EC.presence_of_element_located(
+                (By.CSS_SELECTOR, "span[data-testid='tag-promo-expiration-date']")))
+        except TimeoutException:
+            return "", ""
+        return self.__parse_discount_dates(self.driver.page_source) or ("", "")
      
     def __post_object(self, html): 
          
@@ -165,65 +261,185 @@ class MaxiScraper(ScraperBase):
          
         return product_obj 
  
-    def scrape(self, file_name): 
- 
+    def __load_checkpoint(self, checkpoint_file):
+        if not os.path.exists(checkpoint_file):
+            return None
+        with open(checkpoint_file) as f:
+            return json.load(f)
+
+    def __save_checkpoint(self, checkpoint_file, checkpoint):
+        # Write-then-rename, so a crash never leaves a half-written checkpoint
+        tmp_file = checkpoint_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_file, checkpoint_file)
+
+    def __flush_page(self, link, entry, writer, csv_file, products, checkpoint, checkpoint_file):
+        """Write one listing page's rows once its discount dates are in."""
+        page_num, rows, pending_dates = entry
+        for product_obj, future in pending_dates:
+            dates = future.result()
+            # A rendered promo block without a readable date has none; only pages
+            # without a promo block in their HTML need the browser
+            if dates is None and self.driver is not None:
+                dates = self.__get_discount_dates_browser(product_obj['original_url'])
+            start, end = dates or ("", "")
+            product_obj['discount_start'] = start
+            product_obj['discount_end'] = end
+
+        writer.writerows(rows)
+        csv_file.flush()
+        for product_obj in rows:
+            products[product_obj['product_hash']] = product_obj
+
+        checkpoint["next_page"][link] = page_num + 1
+        self.__save_checkpoint(checkpoint_file, checkpoint)
+
+    def scrape(self, file_name, checkpoint_file=None): 
+        """
+        Scrape every category into `file_name`.
+
+        If `checkpoint_file` (default: <file_name>.checkpoint.json) exists, the
+        previous run is resumed and rows are appended; otherwise the CSV starts
+        fresh. The checkpoint is removed once every category is done.
+        """
+        checkpoint_file = checkpoint_file or file_name + ".checkpoint.json"
+        checkpoint = self.__load_checkpoint(checkpoint_file)
+
+        seen = set()
+        if checkpoint is None:
+            checkpoint = {"next_page": {}, "done": []}
+            with open(file_name, "w", newline="", encoding="utf-8") as f:
+                csv.DictWriter(f, CSV_COLUMNS).writeheader()
+        else:
+            with open(file_name, newline="", encoding="utf-8") as f:
+                seen.update(row["product_hash"] for row in csv.DictReader(f))
+            print(f"Resuming: {len(seen)} products already saved")
+
         products = {} 
+        csv_file = open(file_name, "a", newline="", encoding="utf-8")
+        writer = csv.DictWriter(csv_file, CSV_COLUMNS, restval="", extrasaction="ignore")
          
-        for link in tqdm(self.links_to_scrape): 
-             
-            page_num = 1 
-            while True: 
-                 
-                page_link = self.__link_builder(link, page_num) 
-                page_num += 1 
-                _ = self.driver.get(page_link) 
- 
-                time.sleep(3) 
-                page_object = BeautifulSoup(self.driver.page_source, 'lxml') 
-                 
-                page_products = page_object.findAll("li", {"class":"product-item"}) 
-                     
-                if len(page_products) < 1: 
-                    break 
+        with csv_file, ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for link in tqdm(self.links_to_scrape): 
+                if link in checkpoint["done"]:
+                    continue
+
+                # Listing pages whose discount dates are still being fetched
+                pending_pages = deque()
+                page_num = checkpoint["next_page"].get(link, 1)
+                while True: 
                      
-                for product in page_products: 
-                    product_obj = self.__post_object(product) 
-                    if product_obj is not None and product_obj['product_hash'] not in products: 
+                    page_link = self.__link_builder(link, page_num) 
+                    page_products = self.__load_listing(page_link)
                          
+                    if len(page_products) < 1: 
+                        break 
+
+                    rows = []
+                    pending_dates = []
+                    for product in page_products: 
+                        product_obj = self.__post_object(product) 
+                        if product_obj is None or product_obj['product_hash'] in seen:
+                            continue
+                        seen.add(product_obj['product_hash'])
+
                         if product_obj['discount']: 
-                            start, end = self.__get_discount_dates(product_obj['original_url']) 
-                            product_obj['discount_start'] = start 
-                            product_obj['discount_end'] = end 
-                         
+                            pending_dates.append((product_obj, pool.submit(
+                                self.__get_discount_dates, product_obj['original_url'])))
+                             
                         product_obj['category'] = page_link.split("/c")[0].split("/")[-1].replace("-", " ") 
-                         
-                        products[product_obj['product_hash']] = product_obj 
+                        rows.append(product_obj)
+
+                    pending_pages.append((page_num, rows, pending_dates))
+                    page_num += 1
+
+                    # Save every page at the front of the queue whose dates are all in
+                    while pending_pages and all(f.done() for _, f in pending_pages[0][2]):
+                        self.__flush_page(link, pending_pages.popleft(), writer, csv_file,
+                                          products, checkpoint, checkpoint_file)
  
-                print("Scraped for link -> ", link) 
-                print("Page processed: {}\n".format(page_num)) 
-                pd.DataFrame(products.values()).to_csv(file_name, index=False)  
+                    print("Scraped for link -> ", link) 
+                    print("Page processed: {}\n".format(page_num - 1)) 
+
+                while pending_pages:
+                    self.__flush_page(link, pending_pages.popleft(), writer, csv_file,
+                                      products, checkpoint, checkpoint_file)
+                checkpoint["done"].append(link)
+                self.__save_checkpoint(checkpoint_file, checkpoint)
              
+        os.remove(checkpoint_file)
  
         # Close driver 
-        self._driver_stop() 
+        if self.driver is not None:
+            self._driver_stop() 
  
         return products 
      
     def scrape_product_page_image(self, url): 
         _ = self.driver.get(url) 
          
-        time.sleep(2) 
-        product_page_obj = BeautifulSoup(self.driver.page_source, 'lxml') 
-         
-         
         try: 
+            WebDriverWait(self.driver, self.wait_timeout).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "div#main-content img")))
+            product_page_obj = BeautifulSoup(self.driver.page_source, 'lxml') 
             img = product_page_obj.find("div", attrs={'id' : "main-content"}).img 
  
             return img.get("src") 
         except Exception as e: 
             print("IMG error " + str(e)) 
             return "" 
- 
 
-scraper = MaxiScraper(headless=False) 
-scraper.scrape("maxi_products.csv")
\ No newline at end of file
+
+def benchmark_scrape(latency=0.2, workers=8, use_browser=False):
+    """
+    Scrape the local fixture site (maxi_fixture.py) and compare with the old
+    serial scraper, which slept 3 s per listing page and per discounted
+    product page and rewrote the whole CSV after every listing page.
+
+    use_browser=True drives Chrome for the listing pages and the promo dates
+    (needs Chrome); otherwise everything is fetched over HTTP, and the
+    client-rendered promo dates stay empty.
+    """
+    import tempfile
+    from maxi_fixture import CATEGORY_PATH, start_fixture_server
+
+    server, base_url, site = start_fixture_server(latency=latency)
+    link = base_url + CATEGORY_PATH
+    pages = len(site.listing_pages)
+    # +1 listing page: the empty one that ends the loop
+    legacy_seconds = (pages + 1 + site.discounted) * (3 + latency)
+    print(f"Fixture: {len(site.products)} products on {pages} pages, "
+          f"{site.discounted} discounted, {latency * 1000:.0f} ms latency")
+
+    results = {}
+    for label, pool_size in (("1 worker", 1), (f"{workers} workers", workers)):
+        scraper = MaxiScraper(home_link=base_url, links_to_scrape=[link],
+                              workers=pool_size, use_browser=use_browser)
+        with tempfile.TemporaryDirectory() as tmp:
+            file_name = os.path.join(tmp, "products.csv")
+            started = time.perf_counter()
+            products = scraper.scrape(file_name)
+            elapsed = time.perf_counter() - started
+            csv_bytes = os.path.getsize(file_name)
+        dated = sum(1 for p in products.values() if p['discount_start'])
+        results[label] = (elapsed, len(products), dated, csv_bytes)
+    server.shutdown()
+
+    print(f"\n{'old serial scraper':>20}: ~{legacy_seconds:.1f}s in fixed sleeps alone")
+    for label, (elapsed, count, dated, csv_bytes) in results.items():
+        print(f"{label:>20}: {elapsed:.2f}s, {count} products, {dated} with discount dates")
+    # Rewriting the CSV after each page writes 1/P, 2/P, ... P/P of the final file
+    print(f"{'CSV bytes written':>20}: {csv_bytes:,} appended vs "
+          f"~{csv_bytes * (pages + 1) // 2:,} rewriting after every page")
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--benchmark" in sys.argv:
+        benchmark_scrape()
+    else:
+        scraper = MaxiScraper(headless=False)
+        scraper.scrape("maxi_products.csv")
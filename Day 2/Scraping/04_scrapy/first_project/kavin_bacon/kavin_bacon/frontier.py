@@ -0,0 +1,214 @@
+# Compact BFS frontier for the Kevin Bacon spider
+#
+# Every article title is interned to an integer ID the first time it is seen.
+# IDs are handed out in discovery order, and BFS visits pages in discovery
+# order, so the queue is simply "the next ID not yet popped" - no separate
+# queue or "enqueued" set is needed.
+#
+#   titles:   ID -> title  (and title -> ID for de-duplication)
+#   parents:  array('I'), parent ID per node
+#   depths:   array('B'), BFS depth per node
+#
+# A node has been visited once the head has passed it, so no separate
+# visited set is kept either.
+#
+# SQLiteFrontier keeps the same structure on disk so a crawl can be paused
+# and resumed, and grow past RAM.
+
+import os
+import sqlite3
+import tempfile
+from array import array
+
+NO_PARENT = 0xFFFFFFFF
+
+
+class MemoryFrontier:
+    """In-memory frontier: interned titles, parent pointers and BFS depths."""
+
+    def __init__(self):
+        self.ids = {}
+        self.titles = []
+        self.parents = array('I')
+        self.depths = array('B')
+        self.head = 0
+
+    def __len__(self):
+        return len(self.titles)
+
+    def add(self, title, parent=None, depth=0):
+        """Intern a title; returns its ID if it is new, else None."""
+        key = title.encode('utf-8')
+        if key in self.ids:
+            return None
+        node = len(self.titles)
+        self.ids[key] = node
+        self.titles.append(key)
+        self.parents.append(NO_PARENT if parent is None else parent)
+        self.depths.append(min(depth, 255))
+        return node
+
+    def pop(self):
+        """Return (node, title, depth) for the next node in BFS order, or None."""
+        if self.head >= len(self.titles):
+            return None
+        node = self.head
+        self.head += 1
+        return node, self.titles[node].decode('utf-8'), self.depths[node]
+
+    def rewind(self, to):
+        """Move the head back, e.g. to re-request pages that were in flight."""
+        self.head = min(self.head, to)
+
+    def node_id(self, title):
+        return self.ids.get(title.encode('utf-8'))
+
+    def path_to(self, node):
+        """Titles from the start node to `node`, following parent pointers."""
+        path = []
+        while node != NO_PARENT:
+            path.append(self.titles[node].decode('utf-8'))
+            node = self.parents[node]
+        return list(reversed(path))
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteFrontier:
+    """On-disk frontier with the same API; survives restarts.
+
+    Writes are committed every `commit_every` additions (and on close), so a
+    crash loses at most that many discoveries. Re-opening the same file picks
+    the crawl up at the first node that was not popped yet.
+    """
+
+    def __init__(self, path, commit_every=1000):
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS nodes (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL UNIQUE,
+                parent INTEGER,
+                depth INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+        ''')
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'head'").fetchone()
+        self.head = row[0] if row else 0
+        self.size = self.db.execute('SELECT COUNT(*) FROM nodes').fetchone()[0]
+        self.commit_every = commit_every
+        self.pending = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, title, parent=None, depth=0):
+        cursor = self.db.execute(
+            'INSERT OR IGNORE INTO nodes (id, title, parent, depth) VALUES (?, ?, ?, ?)',
+            (self.size, title, parent, depth))
+        if cursor.rowcount == 0:
+            return None
+        node = self.size
+        self.size += 1
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.commit()
+        return node
+
+    def pop(self):
+        row = self.db.execute('SELECT title, depth FROM nodes WHERE id = ?', (self.head,)).fetchone()
+        if row is None:
+            return None
+        node = self.head
+        self.head += 1
+        return node, row[0], row[1]
+
+    def node_id(self, title):
+        row = self.db.execute('SELECT id FROM nodes WHERE title = ?', (title,)).fetchone()
+        return row[0] if row else None
+
+    def path_to(self, node):
+        path = []
+        while node is not None:
+            title, node = self.db.execute(
+                'SELECT title, parent FROM nodes WHERE id = ?', (node,)).fetchone()
+            path.append(title)
+        return list(reversed(path))
+
+    def rewind(self, to):
+        """Move the head back, e.g. to re-request pages that were in flight at shutdown."""
+        self.head = min(self.head, to)
+
+    def commit(self):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('head', ?)", (self.head,))
+        self.db.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+
+def pop_level(frontier):
+    """Pop every node of the next BFS depth level as a list of (node, title, depth)."""
+    level = []
+    while True:
+        entry = frontier.pop()
+        if entry is None:
+            return level
+        if level and entry[2] != level[0][2]:
+            frontier.rewind(entry[0])
+            return level
+        level.append(entry)
+
+
+def memory_report(count=1_000_000):
+    """Compare memory per million URLs: the old spider containers vs both frontiers."""
+    import tracemalloc
+
+    titles = [f'Synthetic_article_number_{i}' for i in range(count)]
+
+    tracemalloc.start()
+    # What KevinBaconSpider used to keep per URL
+    paths, enqueued = {}, set()
+    for i, title in enumerate(titles):
+        url = f'https://en.wikipedia.org/wiki/{title}'
+        enqueued.add(url)
+        paths[url] = {'prev': f'https://en.wikipedia.org/wiki/{titles[i // 2]}',
+                      'title': title.replace('_', ' ')}
+    old_bytes = tracemalloc.get_traced_memory()[0]
+    del paths, enqueued
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    frontier = MemoryFrontier()
+    for i, title in enumerate(titles):
+        frontier.add(title, parent=i // 2 if i else None, depth=i.bit_length())
+    new_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'frontier.db')
+        frontier = SQLiteFrontier(path, commit_every=100_000)
+        for i, title in enumerate(titles):
+            frontier.add(title, parent=i // 2 if i else None, depth=i.bit_length())
+        frontier.close()
+        disk_bytes = os.path.getsize(path)
+
+    scale = 1_000_000 / count
+    print(f"Old containers: {old_bytes * scale / 1e6:7.1f} MB RAM per million URLs "
+          f"({old_bytes / count:.0f} B/URL)")
+    print(f"MemoryFrontier: {new_bytes * scale / 1e6:7.1f} MB RAM per million URLs "
+          f"({new_bytes / count:.0f} B/URL)")
+    print(f"SQLiteFrontier: {disk_bytes * scale / 1e6:7.1f} MB on disk per million URLs "
+          f"({disk_bytes / count:.0f} B/URL)")
+
+
+if __name__ == '__main__':
+    memory_report()
@@ -0,0 +1,138 @@
+# Offline harness for the Kevin Bacon spider
+#
+# Builds a synthetic random link graph, serves it from a local stand-in that
+# mimics Wikipedia's article and "What links here" pages, and runs the spider
+# against it in both modes, comparing pages fetched and wall time.
+#
+# Run from the project directory with:
+# python -m kavin_bacon.graph_harness
+
+import random
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from scrapy import signals
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.reactor import install_reactor
+
+from kavin_bacon.frontier import MemoryFrontier, pop_level
+
+TARGET = 'Kevin_Bacon'
+
+
+def build_graph(pages=20000, out_degree=10, seed=1):
+    """Random directed link graph: page key -> list of linked page keys."""
+    rng = random.Random(seed)
+    keys = [f'Page_{i}' for i in range(pages - 1)] + [TARGET]
+    return {key: rng.sample(keys, out_degree) for key in keys}
+
+
+def shortest_distance(graph, start):
+    """Reference answer: plain BFS over the in-memory graph."""
+    frontier = MemoryFrontier()
+    frontier.add(start)
+    while True:
+        level = pop_level(frontier)
+        if not level:
+            return None
+        for node, key, depth in level:
+            if key == TARGET:
+                return depth
+            for link in graph[key]:
+                frontier.add(link, parent=node, depth=depth + 1)
+
+
+def start_wiki_stand_in(graph, latency=0.005):
+    """Serve /wiki/<key> and /wiki/Special:WhatLinksHere/<key> for the graph."""
+    backlinks = defaultdict(list)
+    for source, targets in graph.items():
+        for target in targets:
+            backlinks[target].append(source)
+
+    class WikiHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            time.sleep(latency)
+            if path.startswith('/wiki/Special:WhatLinksHere/'):
+                key = path.rsplit('/', 1)[1]
+                items = ''.join(f'<li><a href="/wiki/{s}">{s}</a></li>'
+                                for s in backlinks.get(key, [])[:500])
+                body = f'<ul id="mw-whatlinkshere-list">{items}</ul>'
+            elif path.startswith('/wiki/') and path[6:] in graph:
+                key = path[6:]
+                links = ''.join(f'<p><a href="/wiki/{t}">{t}</a></p>' for t in graph[key])
+                body = (f'<h1 id="firstHeading">{key.replace("_", " ")}</h1>'
+                        f'<div id="mw-content-text">{links}</div>')
+            else:
+                self.send_error(404)
+                return
+            data = f'<html><body>{body}</body></html>'.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), WikiHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def compare_modes(pages=20000, out_degree=10, start='Page_0', latency=0.005):
+    """Run bfs and bidirectional mode against the stand-in and print a comparison."""
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    from twisted.internet import defer, reactor
+    from kavin_bacon.spiders.kevin_bacon_spider import KevinBaconSpider
+
+    graph = build_graph(pages, out_degree)
+    print(f"Synthetic graph: {pages} pages, {out_degree} links each; "
+          f"true distance {start} -> {TARGET}: {shortest_distance(graph, start)}")
+    server, base_url = start_wiki_stand_in(graph, latency)
+    runner = CrawlerRunner({
+        'ROBOTSTXT_OBEY': False,
+        'LOG_LEVEL': 'WARNING',
+        'CONCURRENT_REQUESTS': 16,
+        'TELNETCONSOLE_ENABLED': False,
+    })
+    results = {}
+
+    @defer.inlineCallbacks
+    def run_all():
+        for mode in ('bfs', 'bidirectional'):
+            crawler = runner.create_crawler(KevinBaconSpider)
+            items = []
+
+            def collect(item):
+                items.append(item)
+
+            # Signal handlers are weakly referenced; `collect` lives until the crawl ends
+            crawler.signals.connect(collect, signal=signals.item_scraped)
+            started = time.perf_counter()
+            yield runner.crawl(crawler, start_url=start, mode=mode, base_url=base_url)
+            results[mode] = {
+                'pages_fetched': crawler.stats.get_value('downloader/request_count'),
+                'seconds': round(time.perf_counter() - started, 2),
+                'degrees': items[0]['degrees'] if items else None,
+            }
+        reactor.stop()
+
+    run_all()
+    reactor.run()
+    server.shutdown()
+
+    for mode, result in results.items():
+        print(f"{mode:>14}: {result}")
+    return results
+
+
+if __name__ == '__main__':
+    compare_modes()
@@ -0,0 +1,253 @@
+# Offline link-graph index for Bacon-number queries
+#
+# Crawled pages (or a local dump) are ingested as "source<TAB>target" link
+# lines and compiled into CSR (compressed sparse row) adjacency arrays:
+#
+#   offsets[i] .. offsets[i + 1]   slice of `targets` holding page i's links
+#
+# The arrays are written with np.save and memory-mapped at load time, so
+# opening even a very large index is instant and only touched pages are read.
+# The reverse graph is stored the same way; one BFS backward from Kevin Bacon
+# gives every page its next hop toward him, after which a query is just a
+# walk along those pointers.
+#
+# Build an index from a spider run (see -a record_links=links.tsv) with:
+# python -m kavin_bacon.link_index build links.tsv graph_index/
+# and query it with:
+# python -m kavin_bacon.link_index query graph_index/ Albert_Einstein
+#
+# `python -m kavin_bacon.link_index benchmark` times a 200k-page synthetic index.
+
+import os
+import sys
+from urllib.parse import unquote
+
+import numpy as np
+
+TARGET = 'Kevin_Bacon'
+
+
+class LinkIndexBuilder:
+    """Collects links, interning page titles to int32 IDs."""
+
+    def __init__(self):
+        self.ids = {}
+        self.titles = []
+        self.sources = []
+        self.targets = []
+
+    def intern(self, title):
+        node = self.ids.get(title)
+        if node is None:
+            node = self.ids[title] = len(self.titles)
+            self.titles.append(title)
+        return node
+
+    def add_page(self, title, links):
+        """Add one crawled page and the titles it links to."""
+        source = self.intern(title)
+        for link in links:
+            self.sources.append(source)
+            self.targets.append(self.intern(link))
+
+    def add_dump(self, path):
+        """Add every "source<TAB>target" line from a link dump file."""
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                source, _, target = line.rstrip('\n').partition('\t')
+                if target:
+                    self.sources.append(self.intern(source))
+                    self.targets.append(self.intern(target))
+
+    def build(self, directory):
+        """Write forward and reverse CSR arrays plus the title table."""
+        os.makedirs(directory, exist_ok=True)
+        sources = np.array(self.sources, dtype=np.int32)
+        targets = np.array(self.targets, dtype=np.int32)
+        for prefix, rows, cols in (('out', sources, targets), ('in', targets, sources)):
+            offsets, adjacency = to_csr(rows, cols, len(self.titles))
+            np.save(os.path.join(directory, f'{prefix}_offsets.npy'), offsets)
+            np.save(os.path.join(directory, f'{prefix}_targets.npy'), adjacency)
+        with open(os.path.join(directory, 'titles.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.titles))
+
+
+def to_csr(rows, cols, num_nodes):
+    """Sort (row, col) edges by row, dropping duplicates, into offsets/targets arrays."""
+    edges = np.unique(np.stack([rows, cols], axis=1), axis=0) if len(rows) else \
+        np.empty((0, 2), dtype=np.int32)
+    counts = np.bincount(edges[:, 0], minlength=num_nodes)
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    if offsets[-1] < np.iinfo(np.int32).max:
+        offsets = offsets.astype(np.int32)
+    return offsets, np.ascontiguousarray(edges[:, 1], dtype=np.int32)
+
+
+def expand(offsets, targets, frontier):
+    """All (source, neighbor) pairs for a frontier of node IDs, without a Python loop."""
+    starts = offsets[frontier]
+    counts = offsets[frontier + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return frontier[:0], frontier[:0]
+    # Position of each edge inside its row, added to that row's start offset
+    row_base = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    neighbors = targets[row_base + np.arange(total)]
+    return np.repeat(frontier, counts), neighbors
+
+
+def bfs_parents(offsets, targets, roots, num_nodes, stop_at=None):
+    """Level-synchronous BFS from `roots`; returns (parent, depth) arrays (-1 = unreached)."""
+    parent = np.full(num_nodes, -1, dtype=np.int32)
+    depth = np.full(num_nodes, -1, dtype=np.int32)
+    frontier = np.asarray(roots, dtype=np.int32)
+    parent[frontier] = frontier
+    depth[frontier] = 0
+    level = 0
+    while len(frontier) and (stop_at is None or depth[stop_at] < 0):
+        sources, neighbors = expand(offsets, targets, frontier)
+        fresh = parent[neighbors] < 0
+        neighbors, first = np.unique(neighbors[fresh], return_index=True)
+        level += 1
+        parent[neighbors] = sources[fresh][first]
+        depth[neighbors] = level
+        frontier = neighbors
+    return parent, depth
+
+
+class LinkIndex:
+    """Memory-mapped CSR link graph with Bacon-number queries."""
+
+    def __init__(self, directory):
+        load = lambda name: np.load(os.path.join(directory, name), mmap_mode='r')
+        self.out_offsets = load('out_offsets.npy')
+        self.out_targets = load('out_targets.npy')
+        self.in_offsets = load('in_offsets.npy')
+        self.in_targets = load('in_targets.npy')
+        with open(os.path.join(directory, 'titles.txt'), encoding='utf-8') as f:
+            self.titles = f.read().split('\n')
+        self.ids = {title: node for node, title in enumerate(self.titles)}
+        self._toward_target = None
+
+    def __len__(self):
+        return len(self.titles)
+
+    def toward_target(self):
+        """Next hop toward Kevin Bacon for every page, from one reverse BFS (cached)."""
+        if self._toward_target is None:
+            target = self.ids.get(TARGET)
+            if target is None:
+                self._toward_target = (np.full(len(self), -1, dtype=np.int32),) * 2
+            else:
+                self._toward_target = bfs_parents(self.in_offsets, self.in_targets,
+                                                  [target], len(self))
+        return self._toward_target
+
+    def query(self, start, max_depth=6):
+        """Bacon path from `start` in the spider's output format."""
+        return self.batch_query([start], max_depth)[0]
+
+    def batch_query(self, starts, max_depth=6):
+        """Answer many start pages at once against the shared reverse BFS tree."""
+        next_hop, distance = self.toward_target()
+        results = []
+        for start in starts:
+            node = self.ids.get(start.replace(' ', '_'))
+            if node is None or distance[node] < 0 or distance[node] > max_depth:
+                results.append({
+                    'path': [],
+                    'degrees': -1,
+                    'success': False,
+                    'message': f"Could not find a path from '{start}' to 'Kevin Bacon' "
+                               f"within {max_depth} steps."
+                })
+                continue
+            path = [node]
+            while self.titles[node] != TARGET:
+                node = int(next_hop[node])
+                path.append(node)
+            results.append({
+                'path': self.reconstruct_path(path),
+                'degrees': len(path) - 1,
+                'success': True
+            })
+        return results
+
+    def shortest_path(self, start, target):
+        """Forward BFS between any two pages, returned as page titles."""
+        source, goal = self.ids[start], self.ids[target]
+        parent, _ = bfs_parents(self.out_offsets, self.out_targets, [source], len(self), goal)
+        if parent[goal] < 0:
+            return []
+        path = [goal]
+        while path[-1] != source:
+            path.append(int(parent[path[-1]]))
+        return self.reconstruct_path(reversed(path))
+
+    def reconstruct_path(self, nodes):
+        """Same output as KevinBaconSpider.reconstruct_path: readable page titles."""
+        return [unquote(self.titles[node].replace('_', ' ')) for node in nodes]
+
+
+def benchmark_index(pages=200_000, out_degree=10, queries=1000):
+    """Build an index over a synthetic graph and time loading and batch queries."""
+    import tempfile
+    import time
+
+    from kavin_bacon.graph_harness import build_graph, shortest_distance
+
+    graph = build_graph(pages, out_degree)
+    builder = LinkIndexBuilder()
+    started = time.perf_counter()
+    for key, links in graph.items():
+        builder.add_page(key, links)
+    with tempfile.TemporaryDirectory() as directory:
+        builder.build(directory)
+        build_seconds = time.perf_counter() - started
+        size = sum(os.path.getsize(os.path.join(directory, name))
+                   for name in os.listdir(directory))
+
+        started = time.perf_counter()
+        index = LinkIndex(directory)
+        load_seconds = time.perf_counter() - started
+
+        starts = [f'Page_{i}' for i in range(0, pages - 1, max(1, pages // queries))][:queries]
+        started = time.perf_counter()
+        results = index.batch_query(starts, max_depth=255)
+        query_seconds = time.perf_counter() - started
+
+        # Spot-check against a plain BFS over the dict graph
+        for start, result in list(zip(starts, results))[:5]:
+            assert result['degrees'] == shortest_distance(graph, start), start
+
+    print(f"Index: {pages:,} pages, {pages * out_degree:,} links, "
+          f"{size / 1e6:.1f} MB on disk, built in {build_seconds:.2f}s")
+    print(f"Load (mmap): {load_seconds * 1000:.1f} ms")
+    print(f"{len(starts)} queries: {query_seconds * 1000:.1f} ms total "
+          f"({query_seconds / len(starts) * 1e6:.0f} us/query incl. the shared reverse BFS)")
+    print(f"Example: {results[0]}")
+
+
+def main(argv):
+    if len(argv) >= 3 and argv[0] == 'build':
+        builder = LinkIndexBuilder()
+        for dump in argv[1:-1]:
+            builder.add_dump(dump)
+        builder.build(argv[-1])
+        print(f"Indexed {len(builder.titles)} pages and {len(builder.sources)} links "
+              f"into {argv[-1]}")
+    elif len(argv) >= 3 and argv[0] == 'query':
+        index = LinkIndex(argv[1])
+        for result in index.batch_query(argv[2:]):
+            print(result)
+    elif argv == ['benchmark']:
+        benchmark_index()
+    else:
+        print("usage: python -m kavin_bacon.link_index build DUMP... DIR\n"
+              "       python -m kavin_bacon.link_index query DIR TITLE...\n"
+              "       python -m kavin_bacon.link_index benchmark")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -7,6 +7,12 @@
 #     https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 #     https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import os
+import sys
+
+# The shared HTTP cache (http_cache.py) and throttle (adaptive_throttle.py) live in Day 2/Scraping
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..")))
+
 BOT_NAME = "kavin_bacon"
 
 SPIDER_MODULES = ["kavin_bacon.spiders"]
@@ -50,9 +56,22 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    "kavin_bacon.middlewares.KavinBaconDownloaderMiddleware": 543,
-#}
+DOWNLOADER_MIDDLEWARES = {
+    # "kavin_bacon.middlewares.KavinBaconDownloaderMiddleware": 543,
+    # Ahead of RetryMiddleware (550), so it sees 429s before they are retried
+    "adaptive_throttle.AdaptiveThrottleMiddleware": 560,
+    # Below HttpCompressionMiddleware (590), so it caches decoded bodies
+    "http_cache.HTTPCacheMiddleware": 580,
+}
+
+# Per-domain AIMD tuning of concurrency and delay (replaces AutoThrottle)
+ADAPTIVE_THROTTLE_ENABLED = True
+ADAPTIVE_THROTTLE_START_CONCURRENCY = 2
+ADAPTIVE_THROTTLE_MAX_CONCURRENCY = 32
+ADAPTIVE_THROTTLE_MAX_DELAY = 60
+# No concurrency is added while latency is above this multiple of the best seen
+ADAPTIVE_THROTTLE_LATENCY_FACTOR = 3.0
+#ADAPTIVE_THROTTLE_DEBUG = False
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
@@ -87,6 +106,15 @@ ROBOTSTXT_OBEY = True
 #HTTPCACHE_IGNORE_HTTP_CODES = []
 #HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
 
+# Shared on-disk response cache, also used by the requests-based scripts.
+# Off until a path is set, e.g. scrapy crawl <spider> -s SHARED_HTTPCACHE_PATH=http_cache.db
+#SHARED_HTTPCACHE_PATH = "http_cache.db"
+#SHARED_HTTPCACHE_MAX_MB = 256
+# Seconds a page stays fresh when the server sends no Cache-Control/Expires
+#SHARED_HTTPCACHE_TTL = 3600
+# The same for 404 and 410 answers, which may turn into pages any time
+#SHARED_HTTPCACHE_ERROR_TTL = 60
+
 # Set settings whose default value is deprecated to a future-proof value
 REQUEST_FINGERPRINTER_IMPLEMENTATION = "2.7"
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
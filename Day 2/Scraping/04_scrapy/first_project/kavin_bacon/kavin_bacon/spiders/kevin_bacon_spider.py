@@ -1,10 +1,11 @@
 import scrapy
 import re
 from urllib.parse import urljoin, urlparse, unquote
-from collections import deque
 import json
 import logging
 
+from kavin_bacon.frontier import MemoryFrontier, SQLiteFrontier, pop_level
+
 class KevinBaconSpider(scrapy.Spider):
     name = 'kevin_bacon'
     allowed_domains = ['en.wikipedia.org']
@@ -12,6 +13,7 @@ class KevinBaconSpider(scrapy.Spider):
     # Target URL - Kevin Bacon's Wikipedia page
     target_url = 'https://en.wikipedia.org/wiki/Kevin_Bacon'
     target_title = 'Kevin Bacon'
+    target_key = 'Kevin_Bacon'
     
     # Regexp to filter out non-article links
     article_pattern = re.compile(r'^/wiki/[^:]*$')
@@ -24,37 +26,82 @@ class KevinBaconSpider(scrapy.Spider):
     ]
     skip_regex = re.compile('|'.join(skip_patterns))
     
-    # Queue for BFS traversal
-    queue = deque()
-    
-    # Sets to track visited and enqueued pages
-    visited = set()
-    enqueued = set()
+    # Prefix of every article URL; the frontier stores only what follows it
+    wiki_prefix = 'https://en.wikipedia.org/wiki/'
     
-    # Storage for paths
-    paths = {}
+    # Backlinks page used by bidirectional mode to walk backward from the target
+    whatlinkshere_path = 'Special:WhatLinksHere/'
+    backlinks_limit = 500
     
-    def __init__(self, start_url=None, max_depth=6, *args, **kwargs):
+    def __init__(self, start_url=None, max_depth=6, frontier_path=None, max_in_flight=32,
+                 mode='bfs', base_url='https://en.wikipedia.org', record_links=None,
+                 *args, **kwargs):
         super().__init__(*args, **kwargs)
         
+        # Allow pointing the spider at a local stand-in for offline testing
+        self.base_url = base_url.rstrip('/')
+        if self.base_url != 'https://en.wikipedia.org':
+            self.allowed_domains = [urlparse(self.base_url).hostname]
+            self.wiki_prefix = f'{self.base_url}/wiki/'
+            self.target_url = self.wiki_prefix + self.target_key
+        
         # Set starting URL
         if not start_url:
-            self.start_url = 'https://en.wikipedia.org/wiki/Special:Random'
+            self.start_url = f'{self.base_url}/wiki/Special:Random'
         else:
-            if not start_url.startswith('https://en.wikipedia.org/'):
-                self.start_url = f'https://en.wikipedia.org/wiki/{start_url.replace(" ", "_")}'
+            if not start_url.startswith(self.base_url + '/'):
+                self.start_url = f'{self.wiki_prefix}{start_url.replace(" ", "_")}'
             else:
                 self.start_url = start_url
         
+        # 'bfs' expands forward only; 'bidirectional' also expands backward
+        # from Kevin Bacon via "What links here" and meets in the middle
+        if mode not in ('bfs', 'bidirectional'):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.mode = mode
+        self.backward = MemoryFrontier()
+        self.level_outstanding = 0
+        
         # Set max depth
         self.max_depth = int(max_depth)
         
         # Start title placeholder
         self.start_title = None
+        self.found = False
+        
+        # Per-instance BFS frontier: interned titles, parent pointers, BFS depths.
+        # With frontier_path the crawl state lives in SQLite and can be resumed.
+        if frontier_path:
+            self.frontier = SQLiteFrontier(frontier_path)
+        else:
+            self.frontier = MemoryFrontier()
+        
+        # Only this many requests are handed to Scrapy at once; the rest of the
+        # queue stays in the (compact or on-disk) frontier
+        self.max_in_flight = int(max_in_flight)
+        self.in_flight = set()
+        
+        # Optionally dump every crawled "page<TAB>link" pair for the offline
+        # link index (kavin_bacon/link_index.py)
+        self.link_dump = open(record_links, 'a', encoding='utf-8') if record_links else None
         
         # Set start URLs
         self.start_urls = [self.start_url]
     
+    async def start(self):
+        # Scrapy >= 2.13 calls start() and no longer falls back to start_requests()
+        for request in self.start_requests():
+            yield request
+    
+    def start_requests(self):
+        """Start from start_url, or resume a saved frontier."""
+        if len(self.frontier):
+            print(f"Resuming crawl with {len(self.frontier)} known pages")
+            yield from self.bfs_crawl()
+        else:
+            for url in self.start_urls:
+                yield scrapy.Request(url, dont_filter=True)
+    
     def parse(self, response):
         """Initial parser for the starting page"""
         # Get page title
@@ -66,97 +113,220 @@ class KevinBaconSpider(scrapy.Spider):
         # Check if already at Kevin Bacon
         if response.url == self.target_url:
             print("Starting page is already Kevin Bacon!")
+            self.found = True
             return {
                 'path': [title],
                 'degrees': 0,
                 'success': True
             }
         
-        # Initialize path tracking
-        self.paths[response.url] = {'prev': None, 'title': title}
-        self.visited.add(response.url)
+        # Initialize path tracking (the start page is node 0)
+        node = self.frontier.add(self.page_key(response.url), parent=None, depth=0)
+        self.frontier.pop()
         
-        # Get links from first page
-        links = self.extract_article_links(response)
+        if self.mode == 'bidirectional':
+            self.backward.add(self.target_key, parent=None, depth=0)
+            yield from self.expand_forward(response, node, 0)
+            yield from self.bidirectional_step()
+            return
         
-        # Add links to queue
-        for link in links:
-            if link not in self.visited and link not in self.enqueued:
-                self.queue.append((link, 1))  # (url, depth)
-                self.enqueued.add(link)
-                self.paths[link] = {
-                    'prev': response.url, 
-                    'title': self.get_title_from_url(link)
-                }
+        # Add links from first page to the frontier
+        self.enqueue_links(response, node, 0)
         
         # Start BFS
         yield from self.bfs_crawl()
     
     def bfs_crawl(self):
         """Breadth-first search crawler"""
-        while self.queue:
-            url, depth = self.queue.popleft()
+        while not self.found and len(self.in_flight) < self.max_in_flight:
+            entry = self.frontier.pop()
+            if entry is None:
+                return
+            node, key, depth = entry
             
             # Check depth limit
             if depth > self.max_depth:
                 continue
             
             # Check if target found
-            if url == self.target_url:
-                path = self.reconstruct_path(url)
-                print(f"Found Kevin Bacon in {depth} steps!")
-                print(f"Path: {' -> '.join(path)}")
-                
-                yield {
-                    'path': path,
-                    'degrees': depth,
-                    'success': True
-                }
+            if key == self.target_key:
+                yield self.found_result(node, depth)
                 return
             
             # Request the page
+            self.in_flight.add(node)
             yield scrapy.Request(
-                url=url,
+                url=self.wiki_prefix + key,
                 callback=self.parse_page,
-                meta={'depth': depth}
+                errback=self.request_failed,
+                meta={'bfs_depth': depth, 'node': node}
             )
     
     def parse_page(self, response):
         """Parse subsequent pages"""
-        depth = response.meta['depth']
-        self.visited.add(response.url)
+        depth = response.meta['bfs_depth']
+        node = response.meta['node']
+        self.in_flight.discard(node)
         
         # Check if target found
         if response.url == self.target_url:
-            path = self.reconstruct_path(response.url)
-            print(f"Found Kevin Bacon in {depth} steps!")
-            print(f"Path: {' -> '.join(path)}")
-            
-            yield {
-                'path': path,
-                'degrees': depth,
-                'success': True
-            }
+            yield self.found_result(node, depth)
             return
         
-        # Get links
+        # Add new links to the frontier
+        self.enqueue_links(response, node, depth)
+        
+        # Continue BFS
+        yield from self.bfs_crawl()
+    
+    def request_failed(self, failure):
+        """Free the in-flight slot of a failed request and keep crawling"""
+        self.in_flight.discard(failure.request.meta['node'])
+        yield from self.bfs_crawl()
+    
+    def enqueue_links(self, response, node, depth):
+        """Intern every new article link with `node` as its parent"""
+        if depth + 1 > self.max_depth and not self.link_dump:
+            return
         links = self.extract_article_links(response)
+        self.record_links(response, links)
+        if depth + 1 > self.max_depth:
+            return
+        for link in links:
+            self.frontier.add(self.page_key(link), parent=node, depth=depth + 1)
+    
+    def record_links(self, response, links):
+        """Append a page's outgoing links to the link dump, if one is open"""
+        if self.link_dump:
+            source = self.page_key(response.url)
+            self.link_dump.writelines(f'{source}\t{self.page_key(link)}\n' for link in links)
+    
+    def bidirectional_step(self):
+        """Expand one whole BFS level of the smaller frontier"""
+        if self.found:
+            return
+        forward_depth = self.next_depth(self.frontier)
+        backward_depth = self.next_depth(self.backward)
         
-        # Add new links to queue
+        # Any path found from here on would be longer than max_depth
+        if (forward_depth or 0) + (backward_depth or 0) >= self.max_depth:
+            return
+        
+        # Prioritize the frontier with fewer unexpanded pages
+        candidates = [f for f, d in ((self.frontier, forward_depth), (self.backward, backward_depth))
+                      if d is not None]
+        if not candidates:
+            return
+        frontier = min(candidates, key=lambda f: len(f) - f.head)
+        level = pop_level(frontier)
+        self.level_outstanding = len(level)
+        
+        for node, key, depth in level:
+            if frontier is self.frontier:
+                url, callback = self.wiki_prefix + key, self.parse_forward
+            else:
+                url = (f'{self.wiki_prefix}{self.whatlinkshere_path}{key}'
+                       f'?limit={self.backlinks_limit}')
+                callback = self.parse_backward
+            yield scrapy.Request(
+                url=url,
+                callback=callback,
+                errback=self.level_request_failed,
+                meta={'bfs_depth': depth, 'node': node},
+                dont_filter=True
+            )
+    
+    def next_depth(self, frontier):
+        """Depth of the next node to expand, or None if the frontier is exhausted"""
+        entry = frontier.pop()
+        if entry is None:
+            return None
+        frontier.rewind(entry[0])
+        return entry[2]
+    
+    def parse_forward(self, response):
+        """Bidirectional mode: expand an article's outgoing links"""
+        yield from self.expand_forward(response, response.meta['node'], response.meta['bfs_depth'])
+        yield from self.level_done()
+    
+    def parse_backward(self, response):
+        """Bidirectional mode: expand a "What links here" page toward the start"""
+        node, depth = response.meta['node'], response.meta['bfs_depth']
+        for link in self.extract_backlinks(response):
+            key = self.page_key(link)
+            source = self.backward.add(key, parent=node, depth=depth + 1)
+            if source is None:
+                continue
+            forward_node = self.frontier.node_id(key)
+            if forward_node is not None and not self.found:
+                yield self.meet(forward_node, source)
+                break
+        yield from self.level_done()
+    
+    def expand_forward(self, response, node, depth):
+        """Add an article's links to the forward frontier, yielding a result on a meet"""
+        links = self.extract_article_links(response)
+        self.record_links(response, links)
         for link in links:
-            if link not in self.visited and link not in self.enqueued:
-                self.queue.append((link, depth + 1))
-                self.enqueued.add(link)
-                
-                if link not in self.paths:
-                    title = self.get_title_from_url(link)
-                    self.paths[link] = {
-                        'prev': response.url, 
-                        'title': title
-                    }
+            key = self.page_key(link)
+            child = self.frontier.add(key, parent=node, depth=depth + 1)
+            if child is None:
+                continue
+            backward_node = self.backward.node_id(key)
+            if backward_node is not None and not self.found:
+                yield self.meet(child, backward_node)
+                return
+    
+    def level_request_failed(self, failure):
+        """Count a failed request toward the level so the search can go on"""
+        yield from self.level_done()
+    
+    def level_done(self):
+        self.level_outstanding -= 1
+        if self.level_outstanding == 0:
+            yield from self.bidirectional_step()
+    
+    def meet(self, forward_node, backward_node):
+        """Join the two half-paths where the frontiers touch"""
+        self.found = True
+        keys = self.frontier.path_to(forward_node) + list(reversed(
+            self.backward.path_to(backward_node)))[1:]
+        path = [self.get_title_from_url(self.wiki_prefix + key) for key in keys]
+        if self.start_title:
+            path[0] = self.start_title
+        print(f"Found Kevin Bacon in {len(path) - 1} steps!")
+        print(f"Path: {' -> '.join(path)}")
         
-        # Continue BFS
-        yield from self.bfs_crawl()
+        return {
+            'path': path,
+            'degrees': len(path) - 1,
+            'success': True
+        }
+    
+    def extract_backlinks(self, response):
+        """Extract article links from a "What links here" page"""
+        links = response.css('ul#mw-whatlinkshere-list > li > a::attr(href)').getall()
+        return [urljoin(self.base_url, link) for link in links
+                if self.article_pattern.match(link) and '#' not in link
+                and not self.skip_regex.search(link[6:])]
+    
+    def found_result(self, node, depth):
+        """Build the success item for a path ending at `node`"""
+        self.found = True
+        path = self.reconstruct_path(node)
+        print(f"Found Kevin Bacon in {depth} steps!")
+        print(f"Path: {' -> '.join(path)}")
+        
+        return {
+            'path': path,
+            'degrees': depth,
+            'success': True
+        }
+    
+    def page_key(self, url):
+        """Compact frontier key for an article URL: the part after /wiki/"""
+        path = urlparse(url).path
+        return path[6:] if path.startswith('/wiki/') else path
     
     def extract_article_links(self, response):
         """Extract article links from the page"""
@@ -174,7 +344,7 @@ class KevinBaconSpider(scrapy.Spider):
                     if self.skip_regex.search(page_name):
                         continue
                 
-                full_url = urljoin('https://en.wikipedia.org', link)
+                full_url = urljoin(self.base_url, link)
                 article_links.append(full_url)
         
         # Prioritize direct link to Kevin Bacon
@@ -203,24 +373,26 @@ class KevinBaconSpider(scrapy.Spider):
                 pass
         return "Unknown Page"
     
-    def reconstruct_path(self, target_url):
-        """Rebuild path from start to target"""
-        path = []
-        current = target_url
+    def reconstruct_path(self, node):
+        """Rebuild path (as page titles) from start to the given frontier node"""
+        keys = self.frontier.path_to(node)
+        path = [self.get_title_from_url(self.wiki_prefix + key) for key in keys]
         
-        while current is not None:
-            path_info = self.paths.get(current)
-            if not path_info:
-                break
-            
-            path.append(path_info['title'])
-            current = path_info['prev']
-        
-        return list(reversed(path))
+        # The start page title comes from its heading rather than its URL
+        if path and self.start_title:
+            path[0] = self.start_title
+        return path
     
     def closed(self, reason):
         """Handle spider closing"""
-        if reason == 'finished' and not any(url == self.target_url for url in self.visited):
+        # Pages that were requested but not parsed are fetched again on resume
+        if self.in_flight:
+            self.frontier.rewind(min(self.in_flight))
+        self.frontier.close()
+        if self.link_dump:
+            self.link_dump.close()
+        
+        if reason == 'finished' and not self.found:
             print(f"Could not find path to Kevin Bacon within {self.max_depth} steps!")
             
             # Get start title
@@ -238,5 +410,15 @@ class KevinBaconSpider(scrapy.Spider):
                 json.dump(result, f)
 
 
-# Run this file directly with:
-# scrapy runspider kevin_bacon_spider.py -a start_url="Albert_Einstein" -o results.json
\ No newline at end of file
+# Run from the project directory with:
+# scrapy crawl kevin_bacon -a start_url="Albert_Einstein" -o results.json
+#
+# Add -a mode=bidirectional to also search backward from Kevin Bacon through
+# "What links here" pages and meet in the middle.
+#
+# Add -a frontier_path=crawl.db to keep the frontier on disk; running the same
+# command again after stopping (Ctrl+C) resumes where the crawl left off.
+#
+# Add -a record_links=links.tsv to save every crawled link; build an offline
+# index from it with `python -m kavin_bacon.link_index build links.tsv graph_index/`
+# and answer Bacon-number queries without touching the network.
\ No newline at end of file
@@ -33,6 +33,32 @@ def clean_date(value):
     # Remove extra whitespace
     return value.strip()
 
+# Column-wise versions of the processors above, for batches of items held in
+# a pandas Series (see MaxiPipeline). Missing values come out as "".
+
+def clean_price_column(values):
+    """Vectorized clean_price"""
+    return (values.fillna('').astype(str)
+            .str.replace(r'[^\d,.]', '', regex=True)
+            .str.replace(',', '.', regex=False))
+
+def clean_text_column(values):
+    """Vectorized clean_text"""
+    return (values.fillna('').astype(str)
+            .str.replace(r'<[^>]*>', '', regex=True)
+            .str.replace(r'\s+', ' ', regex=True)
+            .str.strip())
+
+def clean_url_column(values):
+    """Vectorized clean_url"""
+    values = values.fillna('').astype(str)
+    relative = (values != '') & ~values.str.startswith('https://')
+    return values.mask(relative, 'https://www.maxi.rs' + values)
+
+def clean_date_column(values):
+    """Vectorized clean_date"""
+    return values.fillna('').astype(str).str.strip()
+
 class MaxiItem(Item):
     # Basic product information
     product_name = Field(
@@ -106,4 +132,9 @@ class MaxiItem(Item):
     discount_end = Field(
         input_processor=MapCompose(clean_date),
         output_processor=TakeFirst()
+    )
+    
+    # Incremental mode: 'insert', 'update' or 'delete'
+    change = Field(
+        output_processor=TakeFirst()
     )
\ No newline at end of file
@@ -3,6 +3,8 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import time
+
 from scrapy import signals
 
 # useful for handling different item types with a single interface
@@ -101,3 +103,66 @@ class MaxiDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+def benchmark_throttle(rate_limit=8, latency=0.2):
+    """Crawl the rate-limited local fixture with and without the middleware.
+
+    The fixture (maxi_fixture.py) serves the 277 products of
+    maxi_products.csv and answers 429 above `rate_limit` requests/second.
+    """
+    import os
+    import sys
+
+    from scrapy.utils.reactor import install_reactor
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    from scrapy.crawler import CrawlerRunner
+    from scrapy.utils.project import get_project_settings
+    from twisted.internet import defer, reactor
+
+    from maxi.spiders.maxi_scraper import MaxiSpider
+
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+    from maxi_fixture import start_fixture_server
+
+    base = get_project_settings()
+    base.set('ROBOTSTXT_OBEY', False)
+    base.set('LOG_LEVEL', 'WARNING')
+    configs = {
+        'Scrapy defaults': {'ADAPTIVE_THROTTLE_ENABLED': False},
+        'AutoThrottle': {'ADAPTIVE_THROTTLE_ENABLED': False, 'AUTOTHROTTLE_ENABLED': True,
+                         'AUTOTHROTTLE_START_DELAY': 0.1, 'AUTOTHROTTLE_TARGET_CONCURRENCY': 4},
+        'AdaptiveThrottle': {'ADAPTIVE_THROTTLE_ENABLED': True},
+    }
+
+    @defer.inlineCallbacks
+    def run_all():
+        for name, overrides in configs.items():
+            server, base_url, site = start_fixture_server(latency, rate_limit=rate_limit)
+            settings = base.copy()
+            settings.update(overrides)
+            crawler = CrawlerRunner(settings).create_crawler(MaxiSpider)
+            items = []
+
+            def collect(item):
+                items.append(item)
+
+            # Signal receivers are held weakly; `collect` lives until the crawl ends
+            crawler.signals.connect(collect, signal=signals.item_scraped)
+            started = time.perf_counter()
+            yield crawler.crawl(base_url=base_url, allowed_domains=['127.0.0.1'])
+            elapsed = time.perf_counter() - started
+            stats = crawler.stats.get_stats()
+            print(f"{name:>16}: {len(items):3d}/{len(site.products)} items in {elapsed:5.1f}s, "
+                  f"{server.limiter.rejected:3d} x 429, "
+                  f"{stats.get('retry/max_reached', 0)} requests given up")
+            server.shutdown()
+        reactor.stop()
+
+    print(f"Fixture: {rate_limit} requests/s allowed, {latency * 1000:.0f} ms latency")
+    run_all()
+    reactor.run()
+
+
+if __name__ == '__main__':
+    benchmark_throttle()
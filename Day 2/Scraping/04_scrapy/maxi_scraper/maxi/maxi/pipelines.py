@@ -7,7 +7,182 @@
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
 
+import logging
+import os
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = None
+
+from .items import (MaxiItem, clean_date_column, clean_price_column, clean_text_column,
+                    clean_url_column)
+
+# Column -> vectorized processor, mirroring the input processors on MaxiItem
+COLUMN_CLEANERS = {
+    'product_name': clean_text_column,
+    'brand_name': clean_text_column,
+    'price_per_unit': clean_text_column,
+    'old_price_per_unit': clean_text_column,
+    'quantity_measurement': clean_text_column,
+    'category': clean_text_column,
+    'original_url': clean_url_column,
+    'product_image': clean_url_column,
+    'price': clean_price_column,
+    'old_price': clean_price_column,
+    'discount_start': clean_date_column,
+    'discount_end': clean_date_column,
+}
+PRICE_COLUMNS = ('price', 'old_price')
+FLAG_COLUMNS = ('is_available', 'discount')
+COLUMNS = list(MaxiItem.fields)
+
+logger = logging.getLogger(__name__)
+
+if pa is not None:
+    SCHEMA = pa.schema([
+        (name, pa.float64() if name in PRICE_COLUMNS else
+         pa.bool_() if name in FLAG_COLUMNS else pa.string())
+        for name in COLUMNS
+    ])
+
+
+def clean_columns(columns):
+    """Turn buffered column lists into a typed, cleaned DataFrame."""
+    frame = pd.DataFrame(columns, columns=COLUMNS)
+    for name, cleaner in COLUMN_CLEANERS.items():
+        frame[name] = cleaner(frame[name])
+    for name in PRICE_COLUMNS:
+        frame[name] = pd.to_numeric(frame[name], errors='coerce')
+    for name in FLAG_COLUMNS:
+        frame[name] = frame[name].astype('boolean')
+    return frame
+
 
 class MaxiPipeline:
-    def process_item(self, item, spider):
+    """Buffers items into columns and writes them out in row groups.
+
+    Settings:
+        MAXI_OUTPUT          output path; unset means pass-through only
+        MAXI_OUTPUT_FORMAT   'parquet' (default) or 'arrow' (Arrow IPC file)
+        MAXI_ROW_GROUP_SIZE  rows per flushed row group (default 50000)
+
+    Cleaning runs once per row group over whole columns instead of once per
+    field per item, and the output keeps its types (float prices, boolean
+    flags), so loading it back needs no parsing. Without pyarrow the row
+    groups are appended to a CSV next to MAXI_OUTPUT, with a .csv suffix.
+    """
+
+    def __init__(self, output=None, output_format='parquet', row_group_size=50_000):
+        self.output = output
+        self.output_format = output_format
+        self.row_group_size = row_group_size
+        self.columns = {name: [] for name in COLUMNS}
+        self.buffered = 0
+        self.writer = None
+        self.rows_written = 0
+        if output and pa is None:
+            self.output = os.path.splitext(output)[0] + '.csv'
+            logger.warning('pyarrow is not installed; MaxiPipeline appends CSV to %s instead of %s',
+                           self.output, output)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            output=settings.get('MAXI_OUTPUT'),
+            output_format=settings.get('MAXI_OUTPUT_FORMAT', 'parquet'),
+            row_group_size=settings.getint('MAXI_ROW_GROUP_SIZE', 50_000),
+        )
+
+    def process_item(self, item):
+        if self.output:
+            adapter = ItemAdapter(item)
+            for name, values in self.columns.items():
+                values.append(adapter.get(name))
+            self.buffered += 1
+            if self.buffered >= self.row_group_size:
+                self.flush()
         return item
+
+    def flush(self):
+        if not self.buffered:
+            return
+        frame = clean_columns(self.columns)
+        if pa is None:
+            frame.to_csv(self.output, mode='a', index=False, header=self.rows_written == 0)
+        else:
+            table = pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False)
+            if self.writer is None:
+                if self.output_format == 'arrow':
+                    self.writer = pa.ipc.new_file(self.output, SCHEMA)
+                else:
+                    self.writer = pq.ParquetWriter(self.output, SCHEMA, compression='zstd')
+            self.writer.write_table(table)
+        self.rows_written += self.buffered
+        self.columns = {name: [] for name in COLUMNS}
+        self.buffered = 0
+
+    def close_spider(self):
+        if not self.output:
+            return
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+        logger.info('MaxiPipeline wrote %d rows to %s', self.rows_written, self.output)
+
+
+def synthetic_items(rows, csv_path):
+    """`rows` raw items shaped like maxi_products.csv, by repeating its rows."""
+    template = pd.read_csv(csv_path, dtype=str, keep_default_na=False).to_dict('records')
+    for i in range(rows):
+        item = dict(template[i % len(template)])
+        item['is_available'] = item['is_available'] == 'True'
+        item['discount'] = item['discount'] == 'True'
+        yield item
+
+
+def benchmark_loads(rows=1_000_000, row_group_size=50_000):
+    """Write `rows` items through the pipeline and compare pandas load times."""
+    import tempfile
+
+    csv_path = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'maxi_products.csv')
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        for output_format in ('parquet', 'arrow'):
+            path = os.path.join(tmp, f'products.{output_format}')
+            pipeline = MaxiPipeline(path, output_format, row_group_size)
+            started = time.perf_counter()
+            for item in synthetic_items(rows, csv_path):
+                pipeline.process_item(item)
+            pipeline.flush()
+            pipeline.writer.close()
+            print(f"Pipeline -> {output_format:>7}: {rows:,} items in "
+                  f"{time.perf_counter() - started:.2f}s")
+            paths[output_format] = path
+
+        # The old path: the CSV feed exporter's output, loaded with read_csv
+        paths['csv'] = os.path.join(tmp, 'products.csv')
+        pd.read_parquet(paths['parquet']).to_csv(paths['csv'], index=False)
+
+        loaders = {
+            'csv': lambda path: pd.read_csv(path),
+            'parquet': lambda path: pd.read_parquet(path),
+            'arrow': lambda path: pa.ipc.open_file(pa.memory_map(path)).read_all().to_pandas(),
+        }
+        print(f"\nLoading {rows:,} rows into pandas:")
+        for name, load in loaders.items():
+            started = time.perf_counter()
+            frame = load(paths[name])
+            elapsed = time.perf_counter() - started
+            print(f"{name:>8}: {elapsed:6.2f}s  {os.path.getsize(paths[name]) / 1e6:7.1f} MB  "
+                  f"price dtype {frame['price'].dtype}")
+            assert len(frame) == rows
+
+
+if __name__ == '__main__':
+    benchmark_loads()
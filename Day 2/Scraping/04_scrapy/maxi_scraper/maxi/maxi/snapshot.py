@@ -0,0 +1,177 @@
+# Incremental re-scrapes for the Maxi spiders
+#
+# The catalog is scraped several times a day and most products do not change
+# between runs. With `-a incremental=maxi_state.db` a spider keeps a compact
+# snapshot of the previous run, keyed by product_hash, and compares each
+# listing tile against it:
+#
+#   new product_hash           -> emitted with change='insert'
+#   content hash changed       -> emitted with change='update'
+#   content hash unchanged     -> not emitted, and no detail-page request
+#   not seen by the end of run -> emitted as {'change': 'delete', 'product_hash': ...}
+#   seen again in the same run -> skipped (pages can overlap while paginating)
+#
+# Deletes are only trusted when every listing page loaded: the spiders give
+# their listing requests the listing_failed errback, and a run with a failed
+# listing page emits no deletes and does not commit its snapshot.
+#
+# The content hash covers price, old price and availability, the fields
+# the listing tile shows. The snapshot stores 16 + 8 bytes per product plus
+# the number of the run that last saw it.
+#
+# Run from the project directory with:
+# scrapy crawl maxi -a incremental=maxi_state.db -o changes.jsonl
+
+import hashlib
+import sqlite3
+
+import scrapy
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+
+
+def content_hash(price, old_price, is_available):
+    """8-byte hash of the listing fields that matter for a re-scrape"""
+    key = f'{price or ""}\x1f{old_price or ""}\x1f{bool(is_available)}'.encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'big', signed=True)
+
+
+class ProductSnapshot:
+    """product_hash -> (content hash, last run seen), stored in SQLite."""
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS products (
+                product_hash BLOB PRIMARY KEY,
+                content_hash INTEGER NOT NULL,
+                run INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+        ''')
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'run'").fetchone()
+        self.run = (row[0] if row else 0) + 1
+        self.seen = set()  # product_hash keys already compared this run
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+
+    def compare(self, product_hash, content):
+        """'insert', 'update', 'unchanged', or 'duplicate' for a product already seen this run."""
+        key = bytes.fromhex(product_hash)
+        if key in self.seen:
+            return 'duplicate'
+        self.seen.add(key)
+        row = self.db.execute('SELECT content_hash FROM products WHERE product_hash = ?',
+                              (key,)).fetchone()
+        if row is None:
+            return 'insert'
+        # Seen this run even if its detail request fails, so it is not reported deleted
+        self.db.execute('UPDATE products SET run = ? WHERE product_hash = ?', (self.run, key))
+        return 'unchanged' if row[0] == content else 'update'
+
+    def record(self, product_hash, content):
+        self.db.execute('INSERT OR REPLACE INTO products VALUES (?, ?, ?)',
+                        (bytes.fromhex(product_hash), content, self.run))
+
+    def pop_deleted(self):
+        """Hashes of products this run never saw, removed from the snapshot."""
+        rows = self.db.execute('SELECT product_hash FROM products WHERE run < ?',
+                               (self.run,)).fetchall()
+        self.db.execute('DELETE FROM products WHERE run < ?', (self.run,))
+        return [row[0].hex() for row in rows]
+
+    def commit(self):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('run', ?)", (self.run,))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+class IncrementalMixin:
+    """Adds `-a incremental=<path>` to a Maxi spider; see the module comment."""
+
+    incremental = None
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.snapshot = ProductSnapshot(spider.incremental) if spider.incremental else None
+        spider.deletes_scheduled = False
+        crawler.signals.connect(spider.schedule_deletes, signal=signals.spider_idle)
+        crawler.signals.connect(spider.close_snapshot, signal=signals.spider_closed)
+        return spider
+
+    async def start(self):
+        # Scrapy >= 2.13 calls start() and no longer falls back to start_requests()
+        for request in self.start_requests():
+            yield request
+
+    def listing_change(self, product_hash, price, old_price, is_available):
+        """Classify a listing tile against the previous run.
+
+        Returns (change, content hash) with change one of 'insert', 'update',
+        'unchanged' or 'duplicate' (the tile already appeared this run), or
+        (None, None) when incremental mode is off.
+        """
+        if self.snapshot is None or not product_hash:
+            return None, None
+        content = content_hash(price, old_price, is_available)
+        change = self.snapshot.compare(product_hash, content)
+        self.crawler.stats.inc_value(f'incremental/{change}')
+        return change, content
+
+    def listing_failed(self, failure):
+        """Errback for listing requests: with a page missing, deletes can't be trusted"""
+        self.crawler.stats.inc_value('incremental/listing_failures')
+        request = getattr(failure, 'request', None)
+        self.logger.warning('Listing page %s failed: %s',
+                            request.url if request else '?', failure.getErrorMessage())
+
+    def skip_unchanged(self, discount):
+        """Account for an unchanged tile that is neither emitted nor re-fetched"""
+        if discount:
+            self.crawler.stats.inc_value('incremental/detail_requests_avoided')
+
+    def record_product(self, product_hash, content):
+        if self.snapshot is not None and content is not None:
+            self.snapshot.record(product_hash, content)
+
+    def delete_item(self, product_hash):
+        return {'change': 'delete', 'product_hash': product_hash}
+
+    def schedule_deletes(self):
+        """Once the crawl runs dry, emit deletes for products no longer listed"""
+        if self.snapshot is None or self.deletes_scheduled:
+            return
+        self.deletes_scheduled = True
+        failures = self.crawler.stats.get_value('incremental/listing_failures', 0)
+        if failures:
+            # Products on the missing pages would all look deleted; keep the old snapshot
+            self.logger.warning('%d listing pages failed: no deletes emitted and run %d not '
+                                'committed', failures, self.snapshot.run)
+            return
+        self.crawler.engine.crawl(scrapy.Request('data:,', callback=self.emit_deletes,
+                                                 dont_filter=True))
+        raise DontCloseSpider
+
+    def emit_deletes(self, response):
+        for product_hash in self.snapshot.pop_deleted():
+            self.crawler.stats.inc_value('incremental/delete')
+            yield self.delete_item(product_hash)
+        # Only a run that got this far counts; an interrupted one is retried in full
+        self.snapshot.commit()
+
+    def close_snapshot(self, spider, reason):
+        if self.snapshot is None:
+            return
+        stats = self.crawler.stats
+        self.logger.info(
+            'Incremental run %d: %d inserts, %d updates, %d deletes, %d unchanged, '
+            '%d detail requests avoided', self.snapshot.run,
+            stats.get_value('incremental/insert', 0), stats.get_value('incremental/update', 0),
+            stats.get_value('incremental/delete', 0), stats.get_value('incremental/unchanged', 0),
+            stats.get_value('incremental/detail_requests_avoided', 0))
+        self.snapshot.close()
@@ -1,9 +1,10 @@
 import scrapy
 import hashlib
 from scrapy.loader import ItemLoader
-from ..items import MaxiItem
+from ..snapshot import IncrementalMixin
+from ..items import MaxiItem, clean_price
 
-class MaxiSpider(scrapy.Spider):
+class MaxiSpider(IncrementalMixin, scrapy.Spider):
     name = 'maxi'
     allowed_domains = ['maxi.rs']
     base_url = 'https://www.maxi.rs'
@@ -19,6 +20,7 @@ class MaxiSpider(scrapy.Spider):
             yield scrapy.Request(
                 url=url,
                 callback=self.parse_category,
+                errback=self.listing_failed,
                 meta={'category': category.split('/')[-2].replace('-', ' ')}
             )
 
@@ -59,6 +61,17 @@ class MaxiSpider(scrapy.Spider):
             
             # Check for discount
             old_price = product.css('span[data-testid="product-block-old-price"]::text').get()
+            
+            # In incremental mode, unchanged products are skipped entirely
+            change, content = self.listing_change(
+                loader.get_output_value('product_hash'), loader.get_output_value('price'),
+                clean_price(old_price), is_available)
+            if change in ('unchanged', 'duplicate'):
+                self.skip_unchanged(bool(old_price))
+                continue
+            if change:
+                loader.add_value('change', change)
+            
             if old_price:
                 loader.add_value('discount', True)
                 loader.add_css('old_price', 'span[data-testid="product-block-old-price"]::text')
@@ -68,21 +81,23 @@ class MaxiSpider(scrapy.Spider):
                 yield scrapy.Request(
                     url=self.base_url + product_url,
                     callback=self.parse_discount_dates,
-                    meta={'loader': loader}
+                    meta={'loader': loader, 'content_hash': content}
                 )
             else:
                 loader.add_value('discount', False)
+                self.record_product(loader.get_output_value('product_hash'), content)
                 yield loader.load_item()
 
         # Handle pagination
         current_page = response.meta.get('page', 1)
         next_page = current_page + 1
-        next_page_url = f"{response.url}?page={next_page}"
+        next_page_url = response.urljoin(f"?page={next_page}")
         
         if products:
             yield scrapy.Request(
                 url=next_page_url,
                 callback=self.parse_category,
+                errback=self.listing_failed,
                 meta={
                     'category': response.meta['category'],
                     'page': next_page
@@ -99,4 +114,8 @@ class MaxiSpider(scrapy.Spider):
             loader.add_value('discount_end', parts[-1])
             loader.add_value('discount_start', parts[0].split()[1])
         
-        yield loader.load_item()
\ No newline at end of file
+        self.record_product(loader.get_output_value('product_hash'), response.meta['content_hash'])
+        yield loader.load_item()
+    
+    def delete_item(self, product_hash):
+        return MaxiItem(change='delete', product_hash=product_hash)
\ No newline at end of file
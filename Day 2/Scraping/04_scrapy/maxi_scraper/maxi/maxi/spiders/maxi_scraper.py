@@ -2,7 +2,10 @@ import scrapy
 import hashlib
 from datetime import datetime
 
-class MaxiSpider(scrapy.Spider):
+from ..snapshot import IncrementalMixin
+from ..listing_parser import parse_listing, iter_rows
+
+class MaxiSpider(IncrementalMixin, scrapy.Spider):
     name = 'maxi'
     allowed_domains = ['maxi.rs']
     base_url = 'https://www.maxi.rs'
@@ -19,39 +22,50 @@ class MaxiSpider(scrapy.Spider):
             yield scrapy.Request(
                 url=url,
                 callback=self.parse_category,
+                errback=self.listing_failed,
                 meta={'category': category.split('/')[-2].replace('-', ' ')}
             )
 
     def parse_category(self, response):
         """Parse products from category page"""
-        # Extract all products from the page
-        products = response.css('li.product-item')
+        # Extract all products from the page in one lxml pass (see listing_parser.py)
+        columns = parse_listing(response.text, self.base_url, response.meta['category'])
+        products = columns['product_name']
         
-        for product in products:
-            product_data = self.extract_product_data(product, response.meta['category'])
+        for product_data in iter_rows(columns):
+            # In incremental mode, unchanged products are skipped entirely
+            change, content = self.listing_change(
+                product_data['product_hash'], product_data['price'],
+                product_data['old_price'], product_data['is_available'])
+            if change in ('unchanged', 'duplicate'):
+                self.skip_unchanged(product_data['discount'])
+                continue
+            if change:
+                product_data['change'] = change
             
-            if product_data:
-                if product_data['discount']:
-                    # If product is discounted, get discount dates
-                    yield scrapy.Request(
-                        url=product_data['original_url'],
-                        callback=self.parse_discount_dates,
-                        meta={'product_data': product_data}
-                    )
-                else:
-                    yield product_data
+            if product_data['discount']:
+                # If product is discounted, get discount dates
+                yield scrapy.Request(
+                    url=product_data['original_url'],
+                    callback=self.parse_discount_dates,
+                    meta={'product_data': product_data, 'content_hash': content}
+                )
+            else:
+                self.record_product(product_data['product_hash'], content)
+                yield product_data
 
         # Check for next page
         # Maxi uses page parameter in URL
         current_page = response.meta.get('page', 1)
         next_page = current_page + 1
-        next_page_url = f"{response.url}?page={next_page}"
+        next_page_url = response.urljoin(f"?page={next_page}")
         
         # Check if there are more products (you might need to adjust this condition)
         if products:
             yield scrapy.Request(
                 url=next_page_url,
                 callback=self.parse_category,
+                errback=self.listing_failed,
                 meta={
                     'category': response.meta['category'],
                     'page': next_page
@@ -127,6 +141,7 @@ class MaxiSpider(scrapy.Spider):
         except Exception as e:
             self.logger.error(f"Error extracting discount dates: {e}")
         
+        self.record_product(product_data['product_hash'], response.meta.get('content_hash'))
         yield product_data
 
     def clean_price(self, price_text):
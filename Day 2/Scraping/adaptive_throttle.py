@@ -0,0 +1,208 @@
+# -----------------------------------------------------------------------------
+# SHARED ADAPTIVE THROTTLE
+# -----------------------------------------------------------------------------
+
+"""
+Per-domain AIMD throttling for the Scrapy projects, in place of AutoThrottle.
+
+AdaptiveThrottleMiddleware tunes each download slot's concurrency and delay
+from the responses it gets back: it ramps up while a domain answers quickly
+and backs off on 429/503 (honouring Retry-After) or download errors.
+
+Enable it in a project's settings.py, ahead of RetryMiddleware (550) so it
+sees 429s before they are retried:
+
+    DOWNLOADER_MIDDLEWARES = {"adaptive_throttle.AdaptiveThrottleMiddleware": 560}
+    ADAPTIVE_THROTTLE_ENABLED = True
+
+Settings: ADAPTIVE_THROTTLE_START_CONCURRENCY (2), _MAX_CONCURRENCY (32),
+_MAX_DELAY (60), _LATENCY_FACTOR (3.0) and _DEBUG; DOWNLOAD_DELAY is the
+lowest delay it goes down to.
+
+`python -m maxi.middlewares` in the maxi project compares it with Scrapy's
+defaults and AutoThrottle against the rate-limited Maxi fixture.
+"""
+
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+
+
+class DomainThrottle:
+    """AIMD state and counters for one download slot (normally one domain)."""
+
+    def __init__(self, concurrency, delay):
+        self.concurrency = concurrency
+        self.peak_concurrency = concurrency
+        self.delay = delay
+        self.round = 0  # good responses since the last step up
+        self.slow_start = True  # doubling instead of +1 until the first backoff
+        self.latency = None  # moving average of download latency
+        self.best_latency = None
+        self.last_backoff = 0.0
+        self.requests = 0
+        self.responses = 0
+        self.throttled = 0
+        self.errors = 0
+        self.bytes = 0
+        self.first_seen = None
+        self.last_seen = None
+
+
+class AdaptiveThrottleMiddleware:
+    """Tunes concurrency and download delay per domain, AIMD-style.
+
+    Each good response counts toward a "round" as long as the domain's
+    current concurrency. A full round first halves any download delay and,
+    once the delay is gone, adds one concurrent request (or doubles the
+    concurrency, until the domain first pushes back). A 429/503 or a
+    download error halves the concurrency and doubles the delay (to at least
+    the Retry-After the server asked for), at most once per round trip, so
+    a burst of rejections counts as one signal. While latency sits above
+    ADAPTIVE_THROTTLE_LATENCY_FACTOR times the best seen, the domain is
+    queueing requests and nothing is added.
+
+    Replaces AutoThrottle; don't enable both. Per-domain throughput is
+    logged and put into the crawl stats when the spider closes.
+    """
+
+    BACKOFF_CODES = (429, 503)
+    DELAY_STEP = 0.1  # first delay after a backoff from no delay
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_THROTTLE_ENABLED'):
+            raise NotConfigured
+        self.crawler = crawler
+        self.start_concurrency = settings.getint('ADAPTIVE_THROTTLE_START_CONCURRENCY', 2)
+        self.max_concurrency = settings.getint('ADAPTIVE_THROTTLE_MAX_CONCURRENCY', 32)
+        self.min_delay = settings.getfloat('DOWNLOAD_DELAY')
+        self.max_delay = settings.getfloat('ADAPTIVE_THROTTLE_MAX_DELAY', 60.0)
+        self.latency_factor = settings.getfloat('ADAPTIVE_THROTTLE_LATENCY_FACTOR', 3.0)
+        self.debug = settings.getbool('ADAPTIVE_THROTTLE_DEBUG')
+        self.domains = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        s = cls(crawler)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def process_request(self, request):
+        downloader = self.crawler.engine.downloader
+        key = downloader.get_slot_key(request)
+        state = self.domains.get(key)
+        if state is None:
+            state = self.domains[key] = DomainThrottle(self.start_concurrency, self.min_delay)
+            state.first_seen = time.monotonic()
+        state.requests += 1
+        # The slot only exists once its first request is queued, and is
+        # dropped again after a while without traffic
+        self.apply(key, state)
+        return None
+
+    def process_response(self, request, response):
+        state = self.domains.get(request.meta.get('download_slot'))
+        latency = request.meta.get('download_latency')
+        if state is None or latency is None or 'cached' in response.flags:
+            return response
+        state.responses += 1
+        state.bytes += len(response.body)
+        state.last_seen = time.monotonic()
+        if response.status in self.BACKOFF_CODES:
+            state.throttled += 1
+            self.back_off(state, self.retry_after(response))
+        else:
+            self.grow(state, latency)
+        self.apply(request.meta['download_slot'], state)
+        return response
+
+    def process_exception(self, request, exception):
+        state = self.domains.get(request.meta.get('download_slot'))
+        if state is None or isinstance(exception, IgnoreRequest):
+            return None
+        state.errors += 1
+        state.last_seen = time.monotonic()
+        self.back_off(state)
+        self.apply(request.meta['download_slot'], state)
+        return None
+
+    def grow(self, state, latency):
+        """Additive increase, once a full round of responses came back fine."""
+        if state.latency is None:
+            state.latency = state.best_latency = latency
+        state.latency = 0.7 * state.latency + 0.3 * latency
+        state.best_latency = min(state.best_latency, latency)
+        if state.latency > self.latency_factor * state.best_latency:
+            state.round = 0
+            return
+        state.round += 1
+        if state.round < state.concurrency:
+            return
+        state.round = 0
+        if state.delay > self.min_delay:
+            half = state.delay / 2
+            state.delay = half if half >= max(self.min_delay, self.DELAY_STEP / 4) else self.min_delay
+        elif state.concurrency < self.max_concurrency:
+            step = state.concurrency if state.slow_start else 1
+            state.concurrency = min(self.max_concurrency, state.concurrency + step)
+            state.peak_concurrency = max(state.peak_concurrency, state.concurrency)
+
+    def back_off(self, state, retry_after=0.0):
+        """Multiplicative decrease, once per round trip."""
+        now = time.monotonic()
+        if now - state.last_backoff < (state.latency or 0) + state.delay:
+            return
+        state.last_backoff = now
+        state.slow_start = False
+        state.round = 0
+        state.concurrency = max(1, state.concurrency // 2)
+        state.delay = min(self.max_delay, max(state.delay * 2, self.DELAY_STEP, retry_after))
+
+    @staticmethod
+    def retry_after(response):
+        """Seconds from a Retry-After header, in either delay-seconds or HTTP-date form."""
+        value = response.headers.get('Retry-After', b'').decode('latin-1').strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return 0.0
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+    def apply(self, key, state):
+        slot = self.crawler.engine.downloader.slots.get(key)
+        if slot is None:
+            return
+        if self.debug and (slot.concurrency, slot.delay) != (state.concurrency, state.delay):
+            self.crawler.spider.logger.debug(
+                'Throttle %s: concurrency %d -> %d, delay %.2f -> %.2fs',
+                key, slot.concurrency, state.concurrency, slot.delay, state.delay)
+        slot.concurrency = state.concurrency
+        slot.delay = state.delay
+
+    def spider_closed(self, spider):
+        stats = self.crawler.stats
+        for key, state in self.domains.items():
+            elapsed = (state.last_seen or state.first_seen) - state.first_seen
+            rate = state.responses / elapsed if elapsed > 0 else 0.0
+            prefix = f'adaptive_throttle/{key}'
+            stats.set_value(f'{prefix}/responses', state.responses)
+            stats.set_value(f'{prefix}/throttled', state.throttled)
+            stats.set_value(f'{prefix}/errors', state.errors)
+            stats.set_value(f'{prefix}/responses_per_second', round(rate, 2))
+            stats.set_value(f'{prefix}/bytes_per_second', round(state.bytes / elapsed if elapsed > 0 else 0.0))
+            stats.set_value(f'{prefix}/final_concurrency', state.concurrency)
+            stats.set_value(f'{prefix}/peak_concurrency', state.peak_concurrency)
+            stats.set_value(f'{prefix}/final_delay', round(state.delay, 3))
+            spider.logger.info(
+                'Throttle %s: %d responses in %.1fs (%.1f/s), %d throttled, %d errors, '
+                'concurrency %d (peak %d), delay %.2fs',
+                key, state.responses, elapsed, rate, state.throttled, state.errors,
+                state.concurrency, state.peak_concurrency, state.delay)
@@ -0,0 +1,452 @@
+# -----------------------------------------------------------------------------
+# SHARED ON-DISK HTTP CACHE
+# -----------------------------------------------------------------------------
+
+"""
+One HTTP response cache for the tutorial scrapers, the Scrapy projects and
+the REST clients, so repeated development runs stop refetching the same
+pages.
+
+Responses live in a single SQLite file, keyed on a request fingerprint
+(method, normalized URL and body, plus the request headers the response's
+Vary names), with zlib-compressed bodies. The file is bounded to
+`max_bytes` of compressed data and the least recently used entries are
+evicted first.
+
+An entry is fresh for its Cache-Control max-age (or Expires), or for `ttl`
+seconds when the server gives neither (`error_ttl` for 404 and 410). A
+stale entry with an ETag or Last-Modified is revalidated with If-None-Match
+/ If-Modified-Since, and a 304 answer serves the stored body again.
+Cache-Control: private responses are never stored, and responses to
+requests carrying Authorization or Cookie headers only when marked public.
+
+With requests, mount the cache as a transport adapter:
+
+    session = cached_session("http_cache.db")
+    session.get(url)
+
+With Scrapy, enable HTTPCacheMiddleware and set SHARED_HTTPCACHE_PATH
+(see the projects' settings.py).
+
+`python http_cache.py` fetches the local Maxi fixture cold, warm and
+revalidating, and prints the timings and hit/miss counts.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from hashlib import sha1
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+try:
+    from scrapy import signals
+    from scrapy.exceptions import NotConfigured
+    from scrapy.responsetypes import responsetypes
+except ImportError:  # Only the Scrapy middleware needs Scrapy
+    signals = None
+
+CACHEABLE_STATUS = {200, 203, 300, 301, 308, 404, 410}
+# "Not there" answers get error_ttl, as the page may appear any time
+ERROR_STATUS = {404, 410}
+# Request headers that make the response one caller's page
+CREDENTIAL_HEADERS = ("Authorization", "Cookie")
+# Bodies are stored decoded, so the transfer headers no longer apply
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def fingerprint(method, url, body=b""):
+    """Cache key: method, URL with sorted query and lowercased host, and body."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    url = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return sha1(b"\0".join([method.upper().encode(), url.encode(), body or b""])).hexdigest()
+
+
+def vary_key(key, names, request_headers):
+    """The fingerprint extended with the request's values for the headers a response varies on."""
+    values = [f"{name}:{request_headers.get(name, '')}" for name in names]
+    return sha1("\0".join([key] + values).encode("utf-8")).hexdigest()
+
+
+def vary_names(headers):
+    """Sorted, lowercased header names from a Vary header."""
+    return sorted({name.strip().lower() for name in headers.get("Vary", "").split(",") if name.strip()})
+
+
+def freshness_lifetime(headers, default):
+    """Seconds a response may be served without revalidating."""
+    cache_control = {}
+    for directive in headers.get("Cache-Control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        cache_control[name.lower()] = value.strip('"')
+    if "no-cache" in cache_control:
+        return 0
+    if cache_control.get("max-age", "").isdigit():
+        return int(cache_control["max-age"])
+    if "Expires" in headers and "Date" in headers:
+        try:
+            expires = parsedate_to_datetime(headers["Expires"])
+            date = parsedate_to_datetime(headers["Date"])
+            return max(0, int((expires - date).total_seconds()))
+        except (TypeError, ValueError):
+            return 0
+    return default
+
+
+class CachedResponse:
+    """A stored response, as handed back by HTTPCache.lookup()."""
+
+    def __init__(self, key, url, status, headers, body, expires):
+        self.key = key
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires = expires
+
+    @property
+    def fresh(self):
+        return time.time() < self.expires
+
+    def validators(self):
+        """Conditional request headers for revalidating this entry."""
+        headers = {}
+        if "ETag" in self.headers:
+            headers["If-None-Match"] = self.headers["ETag"]
+        if "Last-Modified" in self.headers:
+            headers["If-Modified-Since"] = self.headers["Last-Modified"]
+        return headers
+
+
+class HTTPCache:
+    """LRU-bounded, compressed response store in one SQLite file.
+
+    Safe to share between threads, and between processes through SQLite's
+    own locking. Counts hits, misses, revalidations, stores and evictions
+    in `stats`.
+    """
+
+    def __init__(self, path="http_cache.db", max_bytes=256 * 1024 * 1024, ttl=3600, error_ttl=60):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                  check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires REAL NOT NULL,
+                used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_used ON responses (used);
+            -- Request headers the last response for a fingerprint varied on
+            CREATE TABLE IF NOT EXISTS vary (key TEXT PRIMARY KEY, names TEXT NOT NULL);
+        """)
+
+    def _vary_key(self, key, request_headers):
+        row = self.db.execute("SELECT names FROM vary WHERE key = ?", (key,)).fetchone()
+        return vary_key(key, json.loads(row[0]), request_headers or {}) if row else key
+
+    def lookup(self, key, request_headers=None):
+        """The stored response for a fingerprint and the request's headers (fresh or not), or None."""
+        with self.lock:
+            key = self._vary_key(key, request_headers)
+            row = self.db.execute(
+                "SELECT url, status, headers, body, expires FROM responses WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE responses SET used = ? WHERE key = ?", (time.time(), key))
+        url, status, headers, body, expires = row
+        return CachedResponse(key, url, status, CaseInsensitiveDict(json.loads(headers)),
+                              zlib.decompress(body), expires)
+
+    def cacheable(self, method, status, headers, request_headers=None):
+        if method != "GET" or status not in CACHEABLE_STATUS:
+            return False
+        directives = {directive.split("=", 1)[0].strip()
+                      for directive in headers.get("Cache-Control", "").lower().split(",")}
+        if "no-store" in directives or "private" in directives:
+            return False
+        if request_headers and "public" not in directives and any(
+                name in request_headers for name in CREDENTIAL_HEADERS):
+            return False  # Someone's own page, not for the next caller of the URL
+        return headers.get("Vary", "").strip() != "*"
+
+    def count(self, event, n=1):
+        with self.lock:
+            self.stats[event] += n
+
+    def default_ttl(self, status):
+        return self.error_ttl if status in ERROR_STATUS else self.ttl
+
+    def store(self, key, url, status, headers, body, request_headers=None):
+        """Store a decoded response body, evicting old entries over max_bytes.
+
+        `request_headers` supplies the values for the headers the response
+        varies on; they become part of the key.
+        """
+        headers = {name: value for name, value in headers.items()
+                   if name.lower() not in DROPPED_HEADERS}
+        compressed = zlib.compress(body, 6)
+        now = time.time()
+        expires = now + freshness_lifetime(headers, self.default_ttl(status))
+        names = vary_names(CaseInsensitiveDict(headers))
+        with self.lock:
+            if names:
+                self.db.execute("INSERT OR REPLACE INTO vary VALUES (?, ?)", (key, json.dumps(names)))
+                key = vary_key(key, names, request_headers or {})
+            else:
+                self.db.execute("DELETE FROM vary WHERE key = ?", (key,))
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, status, json.dumps(headers), compressed, len(compressed), expires, now))
+            self.stats["stored"] += 1
+            self._evict()
+
+    def refresh(self, entry, headers):
+        """Extend a revalidated entry's lifetime after a 304."""
+        entry.headers.update({name: value for name, value in headers.items()
+                              if name.lower() not in DROPPED_HEADERS})
+        entry.expires = time.time() + freshness_lifetime(entry.headers, self.default_ttl(entry.status))
+        with self.lock:
+            self.db.execute("UPDATE responses SET headers = ?, expires = ? WHERE key = ?",
+                            (json.dumps(dict(entry.headers)), entry.expires, entry.key))
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop the least recently used entries until 90% of the budget is left
+        excess = total - int(self.max_bytes * 0.9)
+        victims = []
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY used"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self.db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.stats["evicted"] += len(victims)
+
+    def report(self):
+        """Counters plus the entry count, stored size and hit rate."""
+        with self.lock:
+            entries, size = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            stats = Counter(self.stats)
+        lookups = stats["hit"] + stats["revalidated"] + stats["miss"]
+        served = stats["hit"] + stats["revalidated"]
+        return dict(stats, entries=entries, bytes=size,
+                    hit_rate=round(served / lookups, 3) if lookups else 0.0)
+
+    def adapter(self, **kwargs):
+        """A requests transport adapter backed by this cache."""
+        return CachingAdapter(self, **kwargs)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class CachingAdapter(HTTPAdapter):
+    """requests transport adapter that answers GETs from an HTTPCache.
+
+    Takes the usual HTTPAdapter arguments (pool sizes, retries), which apply
+    to the requests that do reach the network.
+    """
+
+    def __init__(self, cache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def send(self, request, **kwargs):
+        if request.method != "GET":
+            return super().send(request, **kwargs)
+        key = fingerprint(request.method, request.url, request.body)
+        request_headers = CaseInsensitiveDict(request.headers)  # Before validators are added
+        entry = self.cache.lookup(key, request_headers)
+        if entry is not None and entry.fresh:
+            self.cache.count("hit")
+            return self.build_cached(request, entry)
+        if entry is not None:
+            request.headers.update(entry.validators())
+
+        response = super().send(request, **kwargs)
+        if entry is not None and response.status_code == 304:
+            self.cache.count("revalidated")
+            self.cache.refresh(entry, response.headers)
+            response.close()
+            return self.build_cached(request, entry)
+        self.cache.count("miss")
+        if self.cache.cacheable(request.method, response.status_code, response.headers,
+                                request_headers):
+            self.cache.store(key, request.url, response.status_code, response.headers,
+                             response.content, request_headers)
+        return response
+
+    def build_cached(self, request, entry):
+        response = requests.Response()
+        response.status_code = entry.status
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = entry.body
+        response.url = request.url
+        response.request = request
+        response.reason = "OK" if entry.status == 200 else ""
+        response.connection = self
+        response.from_cache = True
+        return response
+
+
+def cached_session(path="http_cache.db", **cache_options):
+    """A requests.Session whose GETs go through an HTTPCache at `path`."""
+    session = requests.Session()
+    adapter = HTTPCache(path, **cache_options).adapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class HTTPCacheMiddleware:
+    """Scrapy downloader middleware serving GETs from the shared HTTPCache.
+
+    Settings:
+        SHARED_HTTPCACHE_PATH     cache file; unset disables the middleware
+        SHARED_HTTPCACHE_MAX_MB   size bound of the stored bodies (default 256)
+        SHARED_HTTPCACHE_TTL      freshness when the server gives none (default 3600)
+        SHARED_HTTPCACHE_ERROR_TTL  the same for 404 and 410 (default 60)
+
+    Install it below HttpCompressionMiddleware (590), so it stores
+    decompressed bodies like the requests adapter does and both share the
+    same entries. Served responses are flagged 'cached'. Counts go to the
+    crawl stats as shared_httpcache/*.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        path = settings.get("SHARED_HTTPCACHE_PATH")
+        if not path:
+            raise NotConfigured
+        self.crawler = crawler
+        self.cache = HTTPCache(path, settings.getint("SHARED_HTTPCACHE_MAX_MB", 256) * 1024 * 1024,
+                               settings.getint("SHARED_HTTPCACHE_TTL", 3600),
+                               settings.getint("SHARED_HTTPCACHE_ERROR_TTL", 60))
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        s = cls(crawler)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def process_request(self, request):
+        if request.method != "GET" or request.meta.get("dont_cache"):
+            return None
+        key = fingerprint(request.method, request.url, request.body)
+        # The headers as looked up with; HttpCompressionMiddleware adds Accept-Encoding later
+        request_headers = request.meta["shared_httpcache_headers"] = request.headers.to_unicode_dict()
+        entry = self.cache.lookup(key, request_headers)
+        if entry is None:
+            return None
+        if entry.fresh:
+            self.count("hit")
+            return self.build_cached(request, entry)
+        request.meta["shared_httpcache_entry"] = entry
+        for name, value in entry.validators().items():
+            request.headers[name] = value
+        return None
+
+    def process_response(self, request, response):
+        if request.method != "GET" or "cached" in response.flags or request.meta.get("dont_cache"):
+            return response
+        entry = request.meta.pop("shared_httpcache_entry", None)
+        if entry is not None and response.status == 304:
+            self.count("revalidated")
+            self.cache.refresh(entry, self.header_dict(response.headers))
+            return self.build_cached(request, entry)
+        self.count("miss")
+        headers = self.header_dict(response.headers)
+        sent_headers = request.headers.to_unicode_dict()
+        request_headers = request.meta.pop("shared_httpcache_headers", None)
+        if request_headers is None:
+            request_headers = sent_headers
+        # Credentials are checked on the headers as sent: CookiesMiddleware (700) runs after lookup
+        if self.cache.cacheable(request.method, response.status, headers, sent_headers):
+            key = fingerprint(request.method, request.url, request.body)
+            self.cache.store(key, request.url, response.status, headers, response.body,
+                             request_headers)
+        return response
+
+    def count(self, event):
+        self.cache.count(event)
+        self.crawler.stats.inc_value(f"shared_httpcache/{event}")
+
+    @staticmethod
+    def header_dict(headers):
+        return dict(headers.to_unicode_dict())
+
+    def build_cached(self, request, entry):
+        headers = dict(entry.headers)
+        cls = responsetypes.from_args(headers=headers, url=entry.url, body=entry.body)
+        return cls(url=request.url, status=entry.status, headers=headers, body=entry.body,
+                   flags=["cached"], request=request)
+
+    def spider_closed(self, spider):
+        report = self.cache.report()
+        self.crawler.stats.set_value("shared_httpcache/hit_rate", report["hit_rate"])
+        spider.logger.info("Shared HTTP cache: %s", report)
+        self.cache.close()
+
+
+def benchmark_cache(latency=0.2):
+    """Fetch every fixture page cold, warm, and revalidating (ttl=0)."""
+    import os
+    import tempfile
+
+    from maxi_fixture import CATEGORY_PATH, start_fixture_server
+
+    server, base_url, site = start_fixture_server(latency)
+    urls = [f"{base_url}{CATEGORY_PATH}?pageNumber={page}"
+            for page in range(1, len(site.listing_pages) + 1)]
+    urls += [base_url + product["path"] for product in site.products[:60]]
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "http_cache.db")
+            for label in ("cold", "warm", "revalidate"):
+                session = cached_session(path)
+                if label == "revalidate":
+                    # Everything stale: each page costs a 304 round trip but no body
+                    session.get_adapter(base_url).cache.db.execute("UPDATE responses SET expires = 0")
+                started = time.perf_counter()
+                bodies = [session.get(url).content for url in urls]
+                elapsed = time.perf_counter() - started
+                cache = session.get_adapter(base_url).cache
+                print(f"{label:>10}: {len(urls)} pages in {elapsed:5.2f}s  {cache.report()}")
+                assert all(bodies)
+                cache.close()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    benchmark_cache()
@@ -0,0 +1,229 @@
+# -----------------------------------------------------------------------------
+# LOCAL MAXI FIXTURE SITE
+# -----------------------------------------------------------------------------
+
+"""
+A local stand-in for maxi.rs, used to benchmark the scrapers without hitting
+the real shop.
+
+The saved source.html is the real category page, but its products are
+rendered client-side, so it only contains the page shell. The fixture keeps
+that shell (same size, same markup around the results) and injects
+<li class="product-item"> blocks, built from the rows in maxi_products.csv,
+into the results section, using the data-testid attributes the scrapers
+read. Every `discount_every`-th product is put on sale. Product pages are
+client-rendered like the real ones: the promo expiration date is only
+inserted by a script, so a browser sees it but the raw HTML does not.
+
+    /online/<Category>/c/<code>?pageNumber=N   listing pages, `page_size` products each
+                                                (?page=N works too)
+    <product path>                              product pages
+
+Every page carries an ETag (a hash of its body) and an If-None-Match that
+still matches gets 304 Not Modified, so HTTP caches can revalidate.
+
+With `rate_limit` set, the server allows that many requests per second (a
+token bucket with a one-second burst) and answers the rest with
+429 Too Many Requests and a Retry-After header, like a shop behind a rate
+limiter would.
+
+Run it on its own with:
+python maxi_fixture.py
+"""
+
+import csv
+import hashlib
+import html
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE_HTML = os.path.join(HERE, "source.html")
+PRODUCTS_CSV = os.path.join(HERE, "maxi_products.csv")
+
+CATEGORY_PATH = "/online/Smrznuti-proizvodi/c/06"
+RESULTS_ANCHOR = 'data-testid="search-results-title"'
+
+
+def load_products(discount_every=4):
+    """Rows of maxi_products.csv, with every `discount_every`-th one on sale."""
+    with open(PRODUCTS_CSV, encoding="utf-8") as f:
+        products = list(csv.DictReader(f))
+    for i, product in enumerate(products):
+        product["path"] = urlparse(product["original_url"]).path
+        product["discount"] = bool(discount_every) and i % discount_every == 0 \
+            and product["is_available"] == "True"
+        if product["discount"]:
+            price = float(product["price"] or 0)
+            product["old_price"] = f"{price * 1.25:.2f}".replace(".", ",")
+            day = 1 + i % 20
+            product["promo"] = f"Od {day:02d}.10. do {day + 7:02d}.10."
+    return products
+
+
+def product_block(product):
+    """One listing entry in the markup MaxiScraper parses."""
+    e = lambda value: html.escape(value or "", quote=True)
+    parts = [
+        '<li class="product-item">',
+        f'<div data-testid="product-block-brand-name">{e(product["brand_name"])}</div>',
+        f'<div data-testid="product-block-product-name"><a href="{e(product["path"])}">'
+        f'{e(product["product_name"])}</a></div>',
+        f'<img data-testid="product-block-image" src="{e(product["product_image"])}"/>',
+        f'<div data-testid="product-block-supplementary-price-2">'
+        f'{e(product["quantity_measurement"])}</div>',
+    ]
+    if product["is_available"] == "True":
+        parts.append(f'<div data-testid="product-block-price-per-unit">'
+                     f'{e(product["price_per_unit"])}</div>')
+        parts.append(f'<div data-testid="product-block-price">'
+                     f'{e(product["price"])} RSD</div>')
+    else:
+        parts.append('<div data-testid="product-block-unavailable-text">Trenutno nedostupno</div>')
+    if product["discount"]:
+        parts.append(f'<span data-testid="product-block-old-price">{product["old_price"]} RSD</span>')
+        parts.append('<span data-testid="product-block-old-ppu">-</span>')
+    parts.append("</li>")
+    return "".join(parts)
+
+
+def product_page(product):
+    """A product page body whose promo block only appears once its script runs."""
+    promo = ""
+    if product["discount"]:
+        span = json.dumps('<span data-testid="tag-promo-expiration-date">'
+                          f'{html.escape(product["promo"])}</span>')
+        promo = (f'<div id="promo"></div>'
+                 f'<script>document.getElementById("promo").innerHTML = {span};</script>')
+    return f'<div><img src="{html.escape(product["product_image"], quote=True)}"/>{promo}</div>'
+
+
+class FixtureSite:
+    """Pre-rendered listing and product pages, keyed by path."""
+
+    def __init__(self, page_size=24, discount_every=4):
+        with open(SOURCE_HTML, encoding="utf-8") as f:
+            shell = f.read()
+        # Split the shell right after the results heading; products go there
+        anchor = shell.index(RESULTS_ANCHOR)
+        cut = shell.index("</h1>", anchor) + len("</h1>")
+        self.head, self.tail = shell[:cut], shell[cut:]
+
+        self.products = load_products(discount_every)
+        self.page_size = page_size
+        self.listing_pages = []
+        for start in range(0, len(self.products), page_size):
+            blocks = "".join(product_block(p) for p in self.products[start:start + page_size])
+            self.listing_pages.append(self.render(f"<ul>{blocks}</ul>"))
+        self.empty_page = self.render("")
+        self.product_pages = {}
+        for product in self.products:
+            self.product_pages[product["path"]] = self.render(product_page(product))
+
+    def render(self, fragment):
+        return (self.head + fragment + self.tail).encode("utf-8")
+
+    def page(self, url):
+        """Body for a request path (with query), or None for a 404."""
+        parsed = urlparse(url)
+        if parsed.path == CATEGORY_PATH:
+            # MaxiScraper pages with ?pageNumber=N, the Scrapy spiders with ?page=N
+            query = parse_qs(parsed.query)
+            page_num = int((query.get("pageNumber") or query.get("page") or ["1"])[0])
+            if 1 <= page_num <= len(self.listing_pages):
+                return self.listing_pages[page_num - 1]
+            return self.empty_page
+        return self.product_pages.get(parsed.path)
+
+    @property
+    def discounted(self):
+        return sum(1 for p in self.products if p["discount"])
+
+
+class RateLimiter:
+    """Token bucket: `rate` requests per second, bursts of up to `rate`."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+
+    def allow(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.allowed += 1
+                return True
+            self.rejected += 1
+            return False
+
+
+def start_fixture_server(latency=0.2, port=0, rate_limit=None, **site_options):
+    """Serve the fixture on a background thread; returns (server, base_url, site).
+
+    `latency` is added to every response to stand in for the real network.
+    `rate_limit` (requests per second) turns on 429 responses; the limiter
+    is available as `server.limiter` for its allowed/rejected counts.
+    """
+    site = FixtureSite(**site_options)
+    limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            if limiter is not None and not limiter.allow():
+                self.send_response(429)
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = site.page(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    server.daemon_threads = True
+    server.limiter = limiter
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", site
+
+
+if __name__ == "__main__":
+    server, base_url, site = start_fixture_server(latency=0, port=8765)
+    print(f"Fixture: {len(site.products)} products on {len(site.listing_pages)} pages, "
+          f"{site.discounted} discounted")
+    print(f"Open {base_url}{CATEGORY_PATH}?pageNumber=1 (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -14,17 +14,28 @@ handling and logging.
 """
 
 import socket
+import selectors
 import json
 import requests
 import threading
 import time
 import hmac
 import hashlib
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+import random
+import asyncio
+import itertools
+import concurrent.futures
+import contextlib
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional, Iterable, Iterator, AsyncIterator, NamedTuple, Tuple
 import logging
 from urllib.parse import urljoin
 
+import aiohttp
+from requests.adapters import HTTPAdapter
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -35,11 +46,62 @@ logging.basicConfig(
 # EXERCISE 1: BASIC HTTP CLIENT - SOLUTION
 # -----------------------------------------------------------------------------
 
+# Statuses worth retrying: rate limiting and transient server trouble
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class BatchResult(NamedTuple):
+    """One outcome from get_many()/post_many(); `index` is the input position."""
+    index: int
+    value: Any                        # processed response (JSON or text), None on failure
+    error: Optional[BaseException]    # the final error, None on success
+    attempts: int
+
+
+class RetryPolicy(NamedTuple):
+    """Retry settings for the batch methods of SimpleHTTPClient."""
+    retries: int = 3                  # extra attempts after the first one
+    backoff: float = 0.5              # base of the exponential backoff, in seconds
+    max_backoff: float = 30.0         # cap for any single wait, Retry-After included
+    timeout: float = 10.0             # per attempt, in seconds
+    
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, but never sooner than Retry-After."""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
 class SimpleHTTPClient:
-    def __init__(self):
+    def __init__(self, cache=None, pool_size: int = 10):
         # Use a session for connection pooling and cookie persistence
         self.session = requests.Session()
         
+        # Keep enough pooled connections for the batch methods' concurrency,
+        # optionally answering GETs from a shared on-disk response cache
+        # (HTTPCache from Day 2/Scraping/http_cache.py)
+        self.pool_size = pool_size
+        self.cache = cache
+        if cache is not None:
+            adapter = cache.adapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        else:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
         # Set default headers and timeouts
         self.session.headers.update({
             'User-Agent': 'SimpleHTTPClient/1.0',
@@ -134,17 +196,270 @@ class SimpleHTTPClient:
         except requests.exceptions.RequestException as e:
             logging.error(f"Request failed: {e}")
             raise
+    
+    def get_many(self, urls: Iterable[str], params: Optional[Dict] = None,
+                 concurrency: Optional[int] = None, **retry_options) -> Iterator['BatchResult']:
+        """
+        GET many URLs concurrently, yielding results as they complete.
+        
+        Args:
+            urls: The target URLs (any iterable; consumed lazily)
+            params: Optional query parameters sent with every request
+            concurrency: Requests in flight at once (defaults to pool_size)
+            **retry_options: retries, backoff, max_backoff, timeout (see RetryPolicy)
+        
+        Yields:
+            BatchResult(index, value, error, attempts) per URL, in completion
+            order; `index` is the URL's position in `urls`
+        """
+        jobs = (('GET', url, {'params': params}) for url in urls)
+        return self._run_batch(jobs, concurrency, RetryPolicy(**retry_options))
+    
+    def post_many(self, items: Iterable[Tuple[str, Dict]], headers: Optional[Dict] = None,
+                  concurrency: Optional[int] = None, **retry_options) -> Iterator['BatchResult']:
+        """
+        POST many (url, data) pairs concurrently, yielding results as they complete.
+        
+        Payloads are sent like post() sends them: JSON when headers say
+        'Content-Type: application/json', form data otherwise. Only 429/5xx
+        answers and connection failures are retried, so the endpoint should
+        tolerate a repeated POST.
+        """
+        jobs = (('POST', url, self._post_kwargs(data, headers)) for url, data in items)
+        return self._run_batch(jobs, concurrency, RetryPolicy(**retry_options))
+    
+    async def aget_many(self, urls: Iterable[str], params: Optional[Dict] = None,
+                        concurrency: Optional[int] = None,
+                        **retry_options) -> AsyncIterator['BatchResult']:
+        """Async version of get_many(), on aiohttp; use with `async for`.
+        
+        To stop early, break out inside contextlib.aclosing(...): requests
+        still in flight are cancelled as the generator closes.
+        """
+        jobs = (('GET', url, {'params': params}) for url in urls)
+        async with contextlib.aclosing(self._arun_batch(jobs, concurrency,
+                                                        RetryPolicy(**retry_options))) as results:
+            async for result in results:
+                yield result
+    
+    async def apost_many(self, items: Iterable[Tuple[str, Dict]], headers: Optional[Dict] = None,
+                         concurrency: Optional[int] = None,
+                         **retry_options) -> AsyncIterator['BatchResult']:
+        """Async version of post_many(), on aiohttp; use with `async for`."""
+        jobs = (('POST', url, self._post_kwargs(data, headers)) for url, data in items)
+        async with contextlib.aclosing(self._arun_batch(jobs, concurrency,
+                                                        RetryPolicy(**retry_options))) as results:
+            async for result in results:
+                yield result
+    
+    @staticmethod
+    def _post_kwargs(data: Dict, headers: Optional[Dict]) -> Dict:
+        if headers and headers.get('Content-Type') == 'application/json':
+            return {'json': data, 'headers': headers}
+        return {'data': data, 'headers': headers}
+    
+    def _run_batch(self, jobs, concurrency, policy):
+        """Keep up to `concurrency` jobs in flight on a thread pool."""
+        concurrency = concurrency or self.pool_size
+        jobs = enumerate(jobs)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            in_flight = set()
+            while True:
+                for index, (method, url, kwargs) in itertools.islice(jobs, concurrency - len(in_flight)):
+                    in_flight.add(executor.submit(self._send, index, method, url, kwargs, policy))
+                if not in_flight:
+                    return
+                done, in_flight = concurrent.futures.wait(
+                    in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+    
+    def _send(self, index, method, url, kwargs, policy) -> 'BatchResult':
+        """One request with retries; failures are returned, not raised."""
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            try:
+                response = self.session.request(method, url, timeout=policy.timeout, **kwargs)
+                if response.status_code not in RETRY_STATUSES or attempt > policy.retries:
+                    response.raise_for_status()
+                    if 'application/json' in response.headers.get('Content-Type', ''):
+                        return BatchResult(index, response.json(), None, attempt)
+                    return BatchResult(index, response.text, None, attempt)
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt > policy.retries:
+                    return BatchResult(index, None, e, attempt)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                return BatchResult(index, None, e, attempt)
+            time.sleep(policy.delay(attempt, retry_after))
+    
+    async def _arun_batch(self, jobs, concurrency, policy):
+        """Keep up to `concurrency` jobs in flight on one aiohttp session."""
+        concurrency = concurrency or self.pool_size
+        jobs = enumerate(jobs)
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        async with aiohttp.ClientSession(connector=connector,
+                                         headers=dict(self.session.headers)) as session:
+            in_flight = set()
+            try:
+                while True:
+                    for index, (method, url, kwargs) in itertools.islice(jobs, concurrency - len(in_flight)):
+                        in_flight.add(asyncio.ensure_future(
+                            self._asend(session, index, method, url, kwargs, policy)))
+                    if not in_flight:
+                        return
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+            finally:
+                # The caller stopped early (or failed): don't leave requests running
+                # against a session that is about to close
+                for task in in_flight:
+                    task.cancel()
+                await asyncio.gather(*in_flight, return_exceptions=True)
+    
+    async def _asend(self, session, index, method, url, kwargs, policy) -> 'BatchResult':
+        kwargs = {name: value for name, value in kwargs.items() if value is not None}
+        timeout = aiohttp.ClientTimeout(total=policy.timeout)
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            try:
+                async with session.request(method, url, timeout=timeout, **kwargs) as response:
+                    if response.status not in RETRY_STATUSES or attempt > policy.retries:
+                        response.raise_for_status()
+                        if 'application/json' in response.headers.get('Content-Type', ''):
+                            return BatchResult(index, await response.json(), None, attempt)
+                        return BatchResult(index, await response.text(), None, attempt)
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt > policy.retries:
+                    return BatchResult(index, None, e, attempt)
+            except (aiohttp.ClientError, ValueError) as e:
+                return BatchResult(index, None, e, attempt)
+            await asyncio.sleep(policy.delay(attempt, retry_after))
+
+
+def start_flaky_server(failure_rate: float = 0.2, latency: float = 0.02, seed: int = 0,
+                       port: int = 0):
+    """
+    Local stand-in for an unreliable API: GET /items/<n> returns JSON.
+    
+    `failure_rate` of the requests fail transiently, split evenly between
+    500, 503, 429 with 'Retry-After: 1' and a dropped connection. POST
+    echoes the size of the body it received.
+    
+    Returns:
+        tuple: (server, base_url); call server.shutdown() when finished
+    """
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    
+    class FlakyHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        
+        def respond(self, status, body=b'', headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def handle_one(self, body):
+            time.sleep(latency)
+            with rng_lock:
+                roll = rng.random()
+            if roll < failure_rate:
+                failure = int(roll / failure_rate * 4)
+                if failure == 0:
+                    self.respond(500)
+                elif failure == 1:
+                    self.respond(503)
+                elif failure == 2:
+                    self.respond(429, headers={"Retry-After": "1"})
+                else:
+                    self.close_connection = True  # Drop the connection without answering
+                return
+            self.respond(200, json.dumps(body).encode())
+        
+        def do_GET(self):
+            self.handle_one({"path": self.path})
+        
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.handle_one({"path": self.path, "received": len(self.rfile.read(length))})
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", port), FlakyHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def benchmark_batch_client(requests_count: int = 500, failure_rate: float = 0.2,
+                           latency: float = 0.02, concurrency: int = 32):
+    """Sequential get() vs get_many() vs aget_many() against the flaky server."""
+    server, base_url = start_flaky_server(failure_rate, latency)
+    urls = [f"{base_url}/items/{i}" for i in range(requests_count)]
+    client = SimpleHTTPClient(pool_size=concurrency)
+    print(f"{requests_count} GETs, {failure_rate:.0%} transient failures, "
+          f"{latency * 1000:.0f} ms latency")
+    try:
+        # get() logs every failure; keep the comparison readable
+        logging.disable(logging.ERROR)
+        started = time.perf_counter()
+        ok = 0
+        for url in urls:
+            try:
+                client.get(url)
+                ok += 1
+            except requests.exceptions.RequestException:
+                pass
+        logging.disable(logging.NOTSET)
+        print(f"{'sequential get()':>18}: {time.perf_counter() - started:6.2f}s  "
+              f"{ok}/{requests_count} ok, no retries")
+        
+        def report(name, results, elapsed):
+            assert sorted(result.index for result in results) == list(range(requests_count))
+            ok = sum(1 for result in results if result.error is None)
+            attempts = sum(result.attempts for result in results)
+            print(f"{name:>18}: {elapsed:6.2f}s  {ok}/{requests_count} ok, {attempts} attempts")
+        
+        started = time.perf_counter()
+        results = list(client.get_many(urls, concurrency=concurrency, backoff=0.1))
+        report("get_many()", results, time.perf_counter() - started)
+        
+        async def collect():
+            return [result async for result in
+                    client.aget_many(urls, concurrency=concurrency, backoff=0.1)]
+        
+        started = time.perf_counter()
+        results = asyncio.run(collect())
+        report("aget_many()", results, time.perf_counter() - started)
+    finally:
+        server.shutdown()
+
 
 # -----------------------------------------------------------------------------
 # EXERCISE 2: SIMPLE ECHO SERVER - SOLUTION
 # -----------------------------------------------------------------------------
 
 class EchoServer:
-    def __init__(self, host: str = 'localhost', port: int = 8000):
+    def __init__(self, host: str = 'localhost', port: int = 8000, backlog: int = 5):
         self.host = host
         self.port = port
+        self.backlog = backlog
         self.server_socket = None
         self.running = False
+        self.ready = threading.Event()  # Set once the server is listening
     
     def start(self):
         """
@@ -163,10 +478,12 @@ class EchoServer:
             # Allow address reuse
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             
-            # Bind and listen
+            # Bind and listen (port 0 picks a free port)
             self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(5)
+            self.port = self.server_socket.getsockname()[1]
+            self.server_socket.listen(self.backlog)
             self.running = True
+            self.ready.set()
             
             logging.info(f"Echo server listening on {self.host}:{self.port}")
             
@@ -174,7 +491,10 @@ class EchoServer:
                 try:
                     # Accept new connection
                     client_socket, address = self.server_socket.accept()
-                    logging.info(f"New connection from {address}")
+                    if not self.running:
+                        client_socket.close()  # The wake-up connection from stop()
+                        break
+                    logging.debug(f"New connection from {address}")
                     
                     # Handle client in separate thread
                     client_thread = threading.Thread(
@@ -191,6 +511,9 @@ class EchoServer:
         except Exception as e:
             logging.error(f"Server error: {e}")
             self.stop()
+        finally:
+            if self.server_socket:
+                self.server_socket.close()
     
     def handle_client(self, client_socket: socket.socket, address: tuple):
         """
@@ -215,4 +538,204 @@ class EchoServer:
             
         finally:
             client_socket.close()
-            logging.info(f"Connection closed for {address}")
+            logging.debug(f"Connection closed for {address}")
+    
+    def stop(self):
+        """Stop the echo server and wake up the accept loop."""
+        running, self.running = self.running, False
+        if not running or self.server_socket is None:
+            return
+        # Closing the listening socket does not unblock accept(); a
+        # connection does, and the loop then sees running is False
+        host = '127.0.0.1' if self.host in ('', '0.0.0.0') else self.host
+        try:
+            socket.create_connection((host, self.port), timeout=1).close()
+        except OSError:
+            self.server_socket.close()
+
+class SelectorEchoServer(EchoServer):
+    """
+    Echo server engine built on selectors (epoll/kqueue) instead of threads.
+    
+    One thread multiplexes every connection over non-blocking sockets. Each
+    connection reads with recv_into() into its own preallocated bytearray and
+    keeps a small output buffer for data the kernel did not accept yet; while
+    that buffer is non-empty the connection stops reading (backpressure).
+    
+    It exposes the same start()/stop() API as EchoServer.
+    """
+    
+    BUFFER_SIZE = 64 * 1024
+    
+    def __init__(self, host: str = 'localhost', port: int = 8000, backlog: int = 1024):
+        super().__init__(host, port, backlog)
+        self.selector = None
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+    
+    def start(self):
+        """
+        Start the echo server and run the event loop until stop() is called.
+        """
+        self.selector = selectors.DefaultSelector()
+        try:
+            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.server_socket.bind((self.host, self.port))
+            self.port = self.server_socket.getsockname()[1]
+            self.server_socket.listen(self.backlog)
+            self.server_socket.setblocking(False)
+            
+            self.selector.register(self.server_socket, selectors.EVENT_READ, None)
+            self.selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+            self.running = True
+            self.ready.set()
+            
+            logging.info(f"Selector echo server listening on {self.host}:{self.port}")
+            
+            while self.running:
+                for key, mask in self.selector.select():
+                    if key.fileobj is self.server_socket:
+                        self._accept()
+                    elif key.fileobj is self._wakeup_r:
+                        self._wakeup_r.recv(1)
+                    else:
+                        self._service(key, mask)
+                        
+        except Exception as e:
+            if self.running:
+                logging.error(f"Server error: {e}")
+        finally:
+            self._close_all()
+    
+    def _accept(self):
+        # Drain the accept queue; the listening socket is non-blocking
+        while True:
+            try:
+                client_socket, address = self.server_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            client_socket.setblocking(False)
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            buffer = bytearray(self.BUFFER_SIZE)
+            connection = {
+                "address": address,
+                "buffer": buffer,
+                "view": memoryview(buffer),
+                "pending": bytearray(),
+            }
+            self.selector.register(client_socket, selectors.EVENT_READ, connection)
+    
+    def _service(self, key: selectors.SelectorKey, mask: int):
+        client_socket, connection = key.fileobj, key.data
+        try:
+            if mask & selectors.EVENT_READ:
+                received = client_socket.recv_into(connection["buffer"])
+                if not received:
+                    self._close(client_socket)
+                    return
+                self._send(client_socket, connection, connection["view"][:received])
+            elif mask & selectors.EVENT_WRITE:
+                pending = connection["pending"]
+                sent = client_socket.send(pending)
+                del pending[:sent]
+                if not pending:
+                    self.selector.modify(client_socket, selectors.EVENT_READ, connection)
+        except (ConnectionError, OSError) as e:
+            logging.debug(f"Error handling client {connection['address']}: {e}")
+            self._close(client_socket)
+    
+    def _send(self, client_socket: socket.socket, connection: dict, data: memoryview):
+        try:
+            sent = client_socket.send(data)
+        except BlockingIOError:
+            sent = 0
+        if sent < len(data):
+            # Kernel buffer full: keep the rest and wait until writable
+            connection["pending"] += data[sent:]
+            self.selector.modify(client_socket, selectors.EVENT_WRITE, connection)
+    
+    def _close(self, client_socket: socket.socket):
+        self.selector.unregister(client_socket)
+        client_socket.close()
+    
+    def _close_all(self):
+        if self.selector is None:
+            return
+        for key in list(self.selector.get_map().values()):
+            if key.fileobj not in (self.server_socket, self._wakeup_r):
+                key.fileobj.close()
+        self.selector.close()
+        self.selector = None
+        self._wakeup_r.close()
+        if self.server_socket:
+            self.server_socket.close()
+    
+    def stop(self):
+        """Stop the echo server and wake up the event loop."""
+        self.running = False
+        try:
+            self._wakeup_w.send(b"\0")
+        except OSError:
+            pass
+        self._wakeup_w.close()
+
+def echo_load_test(server: EchoServer, clients: int = 1000, messages: int = 50,
+                   message_size: int = 512) -> Dict[str, float]:
+    """
+    Run a local load generator against an echo server engine.
+    
+    Opens `clients` concurrent connections from an asyncio event loop, then
+    each client sends `messages` messages and waits for every echo.
+    
+    Args:
+        server: An EchoServer or SelectorEchoServer (not yet started)
+        clients: Number of concurrent connections
+        messages: Round trips per connection
+        message_size: Payload size in bytes
+        
+    Returns:
+        Connections per second, echo throughput and latency percentiles
+    """
+    server_thread = threading.Thread(target=server.start, daemon=True)
+    server_thread.start()
+    server.ready.wait(5)
+    payload = b"x" * message_size
+    latencies: List[float] = []
+    
+    async def client(reader, writer):
+        for _ in range(messages):
+            start = time.perf_counter()
+            writer.write(payload)
+            await reader.readexactly(message_size)
+            latencies.append(time.perf_counter() - start)
+        writer.close()
+    
+    async def run():
+        connect_start = time.perf_counter()
+        connections = await asyncio.gather(*(
+            asyncio.open_connection(server.host, server.port) for _ in range(clients)))
+        connect_time = time.perf_counter() - connect_start
+        
+        echo_start = time.perf_counter()
+        await asyncio.gather(*(client(reader, writer) for reader, writer in connections))
+        return connect_time, time.perf_counter() - echo_start
+    
+    try:
+        connect_time, echo_time = asyncio.run(run())
+    finally:
+        server.stop()
+        server_thread.join()
+    
+    latencies.sort()
+    return {
+        "connections_per_s": round(clients / connect_time, 1),
+        "echo_mb_per_s": round(clients * messages * message_size * 2 / echo_time / 1e6, 2),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 3),
+    }
+
+def compare_echo_engines(clients: int = 1000, messages: int = 50, message_size: int = 512):
+    """Run the load generator against the threaded and selector engines."""
+    for name, engine in (("threaded", EchoServer), ("selector", SelectorEchoServer)):
+        server = engine(port=0, backlog=clients)
+        print(f"{name:>8}: {echo_load_test(server, clients, messages, message_size)}")
@@ -1,6 +1,8 @@
 import socket
 import time
 
+from tcp_framing import FrameReader, send_frame
+
 # First, let's define a simple echo server that repeats back what it receives
 def start_server():
     # Create a socket object
@@ -25,15 +27,16 @@ def start_server():
         client_socket, client_address = server_socket.accept()
         print(f"Connection from {client_address}")
         
-        # Receive and echo data
-        data = client_socket.recv(1024)
+        # Receive one whole message: a bare recv(1024) could return only part of it,
+        # so messages are length-prefixed (see tcp_framing.py)
+        data = bytes(FrameReader(client_socket).read_frame())
         print(f"Received: {data.decode('utf-8')}")
         
         # Add a small delay to simulate processing
         time.sleep(1)
         
         # Echo the data back
-        client_socket.send(data)
+        send_frame(client_socket, data)
         print("Sent data back to client")
         
         # Close the client connection
@@ -60,11 +63,11 @@ def start_client():
         
         # Send a message
         message = "Hello from the client!"
-        client_socket.send(message.encode('utf-8'))
+        send_frame(client_socket, message.encode('utf-8'))
         print(f"Sent: {message}")
         
         # Receive a response
-        data = client_socket.recv(1024)
+        data = bytes(FrameReader(client_socket).read_frame())
         print(f"Received: {data.decode('utf-8')}")
         
     finally:
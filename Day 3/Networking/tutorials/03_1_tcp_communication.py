@@ -1,40 +1,43 @@
 import socket
-import time
-import random
 
+from tcp_framing import FrameReader
 
-def create_tcp_client():
-    """Create a simple TCP client."""
+
+def create_tcp_server():
+    """Create a simple TCP server that receives framed messages."""
     # Create a TCP socket
-    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     
-    # Connect to server
+    # Bind and listen
     server_address = ('localhost', 12345)
-    print(f"Connecting to {server_address}")
-    client_socket.connect(server_address)
+    server_socket.bind(server_address)
+    server_socket.listen(5)
+    print(f"TCP Server listening on {server_address}")
     
     try:
-        # Send data in chunks to demonstrate ordered delivery
-        message = "This is a test message showing TCP reliable delivery mechanisms in action."
-        chunk_size = 16
+        client_socket, client_address = server_socket.accept()
+        print(f"Connection from {client_address}")
         
-        for i in range(0, len(message), chunk_size):
-            chunk = message[i:i+chunk_size]
-            client_socket.send(chunk.encode('utf-8'))
-            print(f"Sent chunk: {chunk}")
+        with client_socket:
+            # A single recv(1024) may return part of a message or several at once,
+            # so every chunk is length-prefixed and FrameReader reassembles them
+            chunks = []
+            for frame in FrameReader(client_socket):
+                chunk = bytes(frame).decode('utf-8')
+                chunks.append(chunk)
+                print(f"Received chunk: {chunk}")
             
-            # Wait for acknowledgment
-            ack = client_socket.recv(1024)
-            print(f"Received: {ack.decode('utf-8')}")
-            time.sleep(0.5)  # Pause between sends to make it clearer
+            # TCP delivered every chunk, in order, without per-chunk acks
+            print(f"Reassembled message: {''.join(chunks)}")
             
     finally:
         # Clean up
-        client_socket.close()
+        server_socket.close()
 
 # For educational purposes, call the demonstration function
 create_tcp_server()
 
 # Note: To actually run the TCP server and client, you would need separate processes:
-# In one terminal: python -c "from 03_tcp_communication import create_tcp_server; create_tcp_server()"
-# In another: python -c "from 03_tcp_communication import create_tcp_client; create_tcp_client()"
\ No newline at end of file
+# In one terminal: python 03_1_tcp_communication.py
+# In another: python 03_2_tcp_communication.py
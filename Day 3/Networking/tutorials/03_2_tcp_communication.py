@@ -1,6 +1,6 @@
 import socket
-import time
-import random
+
+from tcp_framing import send_frames
 
 
 def create_tcp_client():
@@ -17,17 +17,14 @@ def create_tcp_client():
         # Send data in chunks to demonstrate ordered delivery
         message = "This is a test message showing TCP reliable delivery mechanisms in action."
         chunk_size = 16
+        chunks = [message[i:i+chunk_size] for i in range(0, len(message), chunk_size)]
         
-        for i in range(0, len(message), chunk_size):
-            chunk = message[i:i+chunk_size]
-            client_socket.send(chunk.encode('utf-8'))
+        # Each chunk is length-prefixed, so they can all be pipelined at once:
+        # TCP already guarantees delivery and order, no application ack needed
+        send_frames(client_socket, [chunk.encode('utf-8') for chunk in chunks])
+        for chunk in chunks:
             print(f"Sent chunk: {chunk}")
             
-            # Wait for acknowledgment
-            ack = client_socket.recv(1024)
-            print(f"Received: {ack.decode('utf-8')}")
-            time.sleep(0.5)  # Pause between sends to make it clearer
-            
     finally:
         # Clean up
         client_socket.close()
@@ -36,5 +33,5 @@ def create_tcp_client():
 create_tcp_client()
 
 # Note: To actually run the TCP server and client, you would need separate processes:
-# In one terminal: python -c "from 03_tcp_communication import create_tcp_server; create_tcp_server()"
-# In another: python -c "from 03_tcp_communication import create_tcp_client; create_tcp_client()"
\ No newline at end of file
+# In one terminal: python 03_1_tcp_communication.py
+# In another: python 03_2_tcp_communication.py
\ No newline at end of file
@@ -1,8 +1,33 @@
 import requests
 import json
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import gzip
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, ThreadingHTTPServer, BaseHTTPRequestHandler
 import urllib.parse
 
+# Content served by the demo server
+HOME_PAGE_HTML = """
+            <!DOCTYPE html>
+            <html>
+            <head>
+                <title>Python HTTP Server Demo</title>
+            </head>
+            <body>
+                <h1>Hello from Python HTTP Server!</h1>
+                <p>This is a simple demonstration of a Python HTTP server.</p>
+            </body>
+            </html>
+            """
+
+API_DATA = {
+    "message": "This is data from the API",
+    "items": ["apple", "banana", "orange"],
+    "count": 3
+}
+
 # Create a simple HTTP server
 class SimpleHTTPRequestHandler(BaseHTTPRequestHandler):
     """
@@ -16,54 +41,50 @@ class SimpleHTTPRequestHandler(BaseHTTPRequestHandler):
         
         if path == '/':
             # Serve a basic HTML page
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            
-            html = """
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Python HTTP Server Demo</title>
-            </head>
-            <body>
-                <h1>Hello from Python HTTP Server!</h1>
-                <p>This is a simple demonstration of a Python HTTP server.</p>
-            </body>
-            </html>
-            """
-            
-            self.wfile.write(html.encode('utf-8'))
+            self.send_body(200, 'text/html', HOME_PAGE_HTML.encode('utf-8'))
             
         elif path == '/api/data':
             # Serve some JSON data
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            
-            data = {
-                "message": "This is data from the API",
-                "items": ["apple", "banana", "orange"],
-                "count": 3
-            }
-            
-            self.wfile.write(json.dumps(data).encode('utf-8'))
+            self.send_body(200, 'application/json', json.dumps(API_DATA).encode('utf-8'))
             
         else:
             # Handle 404 Not Found
-            self.send_response(404)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
-            self.wfile.write('Resource not found'.encode('utf-8'))
+            self.send_body(404, 'text/plain', 'Resource not found'.encode('utf-8'))
+    
+    def send_body(self, status, content_type, body):
+        """Send a complete response; Content-Length lets keep-alive clients reuse the connection."""
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def read_body(self):
+        """
+        Read the whole request body, whatever the path.
+        
+        On a kept-alive connection an unread body would be parsed as the next
+        request. A body without a usable Content-Length can't be skipped, so
+        the connection is closed after this response instead.
+        """
+        self.body_read = True
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            content_length = -1
+        if content_length < 0 or 'Transfer-Encoding' in self.headers:
+            self.close_connection = True
+            return b''
+        return self.rfile.read(content_length)
     
     def do_POST(self):
         """Handle POST requests."""
         path = self.path
+        # Read the body first, so it is consumed even for paths that ignore it
+        body = self.read_body()
         
         if path == '/api/submit':
-            # Get the content length to read the body
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length).decode('utf-8')
+            post_data = body.decode('utf-8')
             
             # Try to parse as JSON
             try:
@@ -74,34 +95,132 @@ class SimpleHTTPRequestHandler(BaseHTTPRequestHandler):
                     "data": json_data
                 }
                 
-                self.send_response(201)  # Created
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(response_data).encode('utf-8'))
+                # 201 Created
+                self.send_body(201, 'application/json', json.dumps(response_data).encode('utf-8'))
                 
             except json.JSONDecodeError:
                 # Not valid JSON
-                self.send_response(400)  # Bad Request
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                
                 error_response = {
                     "status": "error",
                     "message": "Invalid JSON data"
                 }
                 
-                self.wfile.write(json.dumps(error_response).encode('utf-8'))
+                # 400 Bad Request
+                self.send_body(400, 'application/json', json.dumps(error_response).encode('utf-8'))
         else:
             # Endpoint not found
-            self.send_response(404)
-            self.send_header('Content-type', 'text/plain')
+            self.send_body(404, 'text/plain', 'Resource not found'.encode('utf-8'))
+
+class StaticResponse:
+    """A response encoded once at startup: raw and gzip bytes, each with its own ETag."""
+    
+    def __init__(self, content_type, body):
+        self.content_type = content_type
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=9)
+        tag = hashlib.sha1(body).hexdigest()[:16]
+        # Different representations need different strong validators
+        self.etag = f'"{tag}"'
+        self.gzip_etag = f'"{tag}-gzip"'
+
+# Precomputed responses for the paths whose content never changes
+STATIC_RESPONSES = {
+    '/': StaticResponse('text/html', HOME_PAGE_HTML.encode('utf-8')),
+    '/api/data': StaticResponse('application/json', json.dumps(API_DATA).encode('utf-8')),
+}
+
+def accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header allows gzip (a q-value above 0, directly or via '*')."""
+    qualities = {}
+    for token in accept_encoding.split(','):
+        coding, _, params = token.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    if 'gzip' in qualities:
+        return qualities['gzip'] > 0
+    return qualities.get('*', 0) > 0
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header (a list of ETags or '*') with an ETag."""
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return _opaque_tag(etag) in {_opaque_tag(tag) for tag in if_none_match.split(',')}
+
+def _opaque_tag(tag):
+    """An ETag without surrounding whitespace and its W/ (weak) prefix."""
+    return tag.strip().removeprefix('W/')
+
+class FastHTTPRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Production-mode handler: HTTP/1.1 keep-alive and precomputed static responses.
+    
+    Static paths are served from STATIC_RESPONSES without rebuilding or
+    re-encoding anything. Clients that send a matching If-None-Match get a
+    304 with no body, and clients that accept gzip get the compressed bytes.
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    
+    def do_GET(self):
+        """Handle GET requests, serving static paths from the cache."""
+        static = STATIC_RESPONSES.get(self.path.split('?', 1)[0])
+        if static is None:
+            return super().do_GET()
+        
+        use_gzip = accepts_gzip(self.headers.get('Accept-Encoding', ''))
+        etag = static.gzip_etag if use_gzip else static.etag
+        if etag_matches(self.headers.get('If-None-Match'), etag):
+            # A 304 never has a body; it repeats the headers a cache keys on
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Vary', 'Accept-Encoding')
             self.end_headers()
-            self.wfile.write('Resource not found'.encode('utf-8'))
+            return
+        
+        body = static.gzip_body if use_gzip else static.body
+        self.send_response(200)
+        self.send_header('Content-type', static.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_POST(self):
+        """Handle POST requests; close the connection if a handler left the body unread."""
+        self.body_read = False
+        super().do_POST()
+        if not self.body_read:
+            self.close_connection = True  # Its bytes would be read as the next request
+    
+    def log_message(self, format, *args):
+        pass  # Per-request logging to stderr would dominate the cost
 
-def run_http_server(port=8000):
-    """Run a simple HTTP server on the specified port."""
+def run_http_server(port=8000, production=False):
+    """Run a simple HTTP server on the specified port.
+    
+    With production=True, use a ThreadingHTTPServer and FastHTTPRequestHandler.
+    """
     server_address = ('', port)
-    httpd = HTTPServer(server_address, SimpleHTTPRequestHandler)
+    if production:
+        httpd = ThreadingHTTPServer(server_address, FastHTTPRequestHandler)
+        httpd.daemon_threads = True
+    else:
+        httpd = HTTPServer(server_address, SimpleHTTPRequestHandler)
     print(f"Starting HTTP server on port {port}...")
     try:
         httpd.serve_forever()
@@ -109,11 +228,46 @@ def run_http_server(port=8000):
         print("Shutting down server...")
         httpd.server_close()
 
+class QuietHTTPRequestHandler(SimpleHTTPRequestHandler):
+    """The original handler without stderr logging, for a fair load test."""
+    def log_message(self, format, *args):
+        pass
+
+def load_test(clients=8, requests_per_client=500, path='/api/data'):
+    """Measure requests per second for the basic and production server modes."""
+    print("HTTP SERVER LOAD TEST")
+    print("---------------------")
+    modes = [
+        ("basic", HTTPServer, QuietHTTPRequestHandler, {}),
+        ("production", ThreadingHTTPServer, FastHTTPRequestHandler, {}),
+        ("production+etag", ThreadingHTTPServer, FastHTTPRequestHandler,
+         {'If-None-Match': STATIC_RESPONSES[path].gzip_etag}),  # requests accepts gzip
+    ]
+    for name, server_class, handler_class, headers in modes:
+        httpd = server_class(('127.0.0.1', 0), handler_class)
+        url = f"http://127.0.0.1:{httpd.server_address[1]}{path}"
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        
+        def client(_):
+            with requests.Session() as session:
+                for _ in range(requests_per_client):
+                    session.get(url, headers=headers)
+        
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(client, range(clients)))
+        elapsed = time.perf_counter() - start
+        httpd.shutdown()
+        httpd.server_close()
+        print(f"{name:>16}: {clients * requests_per_client / elapsed:,.0f} requests/s")
+
 if __name__ == "__main__":
     # For demonstration, call the function that showcases HTTP requests
 
     # To run the HTTP server (uncomment to use):
     run_http_server(8000)
+    # run_http_server(8000, production=True)
+    # load_test()
     # 
     # You can then access:
     # - http://localhost:8000/ for HTML page
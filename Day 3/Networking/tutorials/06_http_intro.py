@@ -2,13 +2,18 @@ import requests
 import json
 import time
 import os
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit, parse_qs
 import base64
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from requests.adapters import HTTPAdapter
 
 class RESTApiClient:
     """A generic REST API client implementation."""
     
-    def __init__(self, base_url, auth=None, headers=None):
+    def __init__(self, base_url, auth=None, headers=None, pool_size=10, cache=None):
         """
         Initialize the REST API client.
         
@@ -16,6 +21,10 @@ class RESTApiClient:
             base_url (str): The base URL for the API
             auth (tuple, optional): Basic auth credentials (username, password)
             headers (dict, optional): Default headers to send with each request
+            pool_size (int): Keep-alive connections kept open per host
+            cache (HTTPCache, optional): Shared on-disk response cache from
+                Day 2/Scraping/http_cache.py; GETs are answered from it and
+                revalidated with ETag/Last-Modified once stale
         """
         self.base_url = base_url
         self.auth = auth
@@ -34,6 +43,17 @@ class RESTApiClient:
         self.session = requests.Session()
         self.session.headers.update(self.headers)
         
+        # Size the connection pool so concurrent requests reuse keep-alive
+        # connections instead of opening (and discarding) new ones
+        self.pool_size = pool_size
+        self.cache = cache
+        if cache is not None:
+            adapter = cache.adapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        else:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
         if auth:
             self.session.auth = auth
     
@@ -111,7 +131,8 @@ class RESTApiClient:
         except ValueError:
             return {"status": "success", "message": "Resource deleted", "content": response.text}
     
-    def handle_pagination(self, endpoint, params=None, results_key='results', next_page_key='next'):
+    def handle_pagination(self, endpoint, params=None, results_key='results', next_page_key='next',
+                          rate_limit=0.1):
         """
         Handle paginated API responses.
         
@@ -120,6 +141,7 @@ class RESTApiClient:
             params (dict, optional): Query parameters
             results_key (str): The JSON key containing results in each response
             next_page_key (str): The JSON key containing the next page URL
+            rate_limit (float): Seconds to wait between page requests
             
         Returns:
             list: Combined results from all pages
@@ -143,9 +165,82 @@ class RESTApiClient:
             params = None
             
             # Optional rate limiting
-            time.sleep(0.1)
+            if rate_limit:
+                time.sleep(rate_limit)
         
         return all_results
+    
+    def iter_pages_concurrent(self, endpoint, params=None, results_key='results',
+                              page_param='page', first_page=1, page_size=None,
+                              offset_param=None, limit_param='limit', max_pages=None,
+                              window=None, timeout=30):
+        """
+        Prefetch numbered (or offset-based) pages concurrently, yielding results in order.
+        
+        Up to `window` page requests are in flight at once over the pooled
+        session. Results are still yielded item by item in page order, so this
+        is a drop-in replacement for iterating over handle_pagination().
+        Fetching stops at the first empty page (or after `max_pages`).
+        
+        Args:
+            endpoint (str): The API endpoint
+            params (dict, optional): Extra query parameters sent with every page
+            results_key (str): The JSON key containing results in each response
+            page_param (str): Query parameter holding the page number
+            first_page (int): Number of the first page (usually 0 or 1)
+            page_size (int, optional): Items per page; required for offset mode
+            offset_param (str, optional): Use offset pagination with this parameter
+                (e.g. 'offset'); page i is requested at offset i * page_size
+            limit_param (str): Query parameter holding page_size, in either mode
+            max_pages (int, optional): Stop after this many pages
+            window (int, optional): Pages in flight at once (defaults to pool_size)
+            timeout (float): Seconds to wait for each page
+            
+        Yields:
+            Each result item, in page order
+        """
+        if offset_param and not page_size:
+            raise ValueError("offset pagination (offset_param) needs a page_size")
+        url = urljoin(self.base_url, endpoint)
+        window = window or self.pool_size
+        
+        def page_params(index):
+            query = dict(params or {})
+            if offset_param:
+                query[offset_param] = index * page_size
+                query[limit_param] = page_size
+            else:
+                query[page_param] = first_page + index
+                if page_size:
+                    query[limit_param] = page_size
+            return query
+        
+        def fetch(index):
+            response = self.session.get(url, params=page_params(index), timeout=timeout)
+            if response.status_code == 404:
+                return []  # Past the last page
+            response.raise_for_status()
+            return response.json().get(results_key, [])
+        
+        with ThreadPoolExecutor(max_workers=window) as executor:
+            in_flight = deque()
+            next_index = 0
+            try:
+                while True:
+                    # Keep the prefetch window full
+                    while len(in_flight) < window and (max_pages is None or next_index < max_pages):
+                        in_flight.append(executor.submit(fetch, next_index))
+                        next_index += 1
+                    if not in_flight:
+                        return
+                    results = in_flight.popleft().result()
+                    if not results:
+                        return
+                    yield from results
+            finally:
+                # Drop prefetched pages past the end (or if the caller stopped early)
+                for future in in_flight:
+                    future.cancel()
 
 
 # Example usage of the generic REST API client
@@ -212,4 +307,79 @@ def demonstrate_generic_rest_client():
         print(f"   Error: {e}")
 
 
-demonstrate_generic_rest_client()
\ No newline at end of file
+# Local stand-in for a paginated API
+def start_paginated_test_server(total_pages=10000, page_size=10, latency=0.002, port=0):
+    """
+    Serve /items?page=N (1-based) with `page_size` results per page and a `next` link.
+    
+    /items?offset=N&limit=M serves M results starting at item N instead.
+    
+    Returns:
+        tuple: (server, base_url); call server.shutdown() when finished
+    """
+    class PaginatedHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        
+        def do_GET(self):
+            query = parse_qs(urlsplit(self.path).query)
+            time.sleep(latency)
+            if 'offset' in query:
+                start = int(query['offset'][0])
+                stop = min(start + int(query.get('limit', [page_size])[0]), total_pages * page_size)
+                results = [{"id": i, "name": f"item {i}"} for i in range(start, stop)]
+                next_url = None
+            else:
+                page = int(query.get('page', ['1'])[0])
+                if page > total_pages:
+                    results, next_url = [], None
+                else:
+                    start = (page - 1) * page_size
+                    results = [{"id": i, "name": f"item {i}"} for i in range(start, start + page_size)]
+                    next_url = f"{base_url}/items?page={page + 1}" if page < total_pages else None
+            body = json.dumps({"results": results, "next": next_url}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", port), PaginatedHandler)
+    server.daemon_threads = True
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, base_url
+
+def benchmark_pagination(total_pages=10000, latency=0.002, window=16):
+    """Compare sequential next-link pagination with concurrent prefetching."""
+    print("PAGINATION BENCHMARK")
+    print("--------------------")
+    server, base_url = start_paginated_test_server(total_pages, latency=latency)
+    client = RESTApiClient(base_url + "/", pool_size=window)
+    try:
+        start = time.perf_counter()
+        sequential = client.handle_pagination("items", rate_limit=0)
+        sequential_time = time.perf_counter() - start
+        print(f"Sequential:  {len(sequential)} items in {sequential_time:.2f}s")
+        
+        start = time.perf_counter()
+        concurrent = list(client.iter_pages_concurrent("items", window=window))
+        concurrent_time = time.perf_counter() - start
+        print(f"Concurrent:  {len(concurrent)} items in {concurrent_time:.2f}s "
+              f"(window={window}, {sequential_time / concurrent_time:.1f}x faster)")
+        
+        assert concurrent == sequential, "Concurrent pages came back out of order"
+        
+        by_offset = list(client.iter_pages_concurrent("items", offset_param='offset',
+                                                      page_size=10, window=window))
+        assert by_offset == sequential, "Offset pages don't match the numbered pages"
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    demonstrate_generic_rest_client()
+    # benchmark_pagination()
\ No newline at end of file
@@ -1,10 +1,16 @@
+import os
 import time
+import re
+import html
+import json
 import threading
 import concurrent.futures
 import asyncio
 import aiohttp
 import requests
 from functools import wraps
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 # Timing decorator to measure execution time
 def timing_decorator(func):
@@ -55,18 +61,23 @@ def download_sites_threading(sites):
         return list(executor.map(download_site, sites))
 
 # 3. Multiprocessing approach
+# Worker functions must live at module level so they can be pickled and sent
+# to the child processes (a nested closure cannot be).
+def download_site_in_process(site):
+    """Download one site; runs inside a worker process."""
+    print(f"Downloading {site} in process {os.getpid()}")
+    response = requests.get(site)
+    return f"{site}: {len(response.text)} bytes"
+
 @timing_decorator
-def download_sites_multiprocessing(sites):
+def download_sites_multiprocessing(sites, max_workers=5):
     """Download sites using multiple processes."""
     print("\nMultiprocessing Approach:")
     
-    def download_site(site):
-        print(f"Downloading {site} in process {os.getpid()}")
-        response = requests.get(site)
-        return f"{site}: {len(response.text)} bytes"
-    
-    with concurrent.futures.ProcessPoolExecutor(max_workers=5) as executor:
-        return list(executor.map(download_site, sites))
+    # Send sites in batches so each process handles several per round trip
+    chunksize = max(1, len(sites) // max_workers)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(download_site_in_process, sites, chunksize=chunksize))
 
 # 4. Asyncio approach
 @async_timing_decorator
@@ -90,9 +101,10 @@ def compare_approaches():
     print("CONCURRENCY APPROACHES BENCHMARK")
     print("--------------------------------")
     
-    # List of sites to download (using httpbin for testing)
+    # Sites are served by a local stand-in with 1 second of latency per request
+    server, base_url = start_test_http_server(latency=1.0)
     sites = [
-        f"https://httpbin.org/delay/1?site={i}" for i in range(10)
+        f"{base_url}/delay?site={i}" for i in range(10)
     ]
     
     # 1. Synchronous approach
@@ -107,6 +119,8 @@ def compare_approaches():
     # 4. Asyncio approach
     asyncio_results = asyncio.run(download_sites_async(sites))
     
+    server.shutdown()
+    
     # Summary
     print("\nSUMMARY:")
     print("- Synchronous: Sequential, blocks during I/O, simple but slow")
@@ -114,6 +128,147 @@ def compare_approaches():
     print("- Multiprocessing: Good for CPU-bound tasks, higher memory usage")
     print("- Asyncio: Excellent for I/O-bound tasks, single-threaded cooperative multitasking")
 
+# Local stand-in HTTP server so benchmarks do not depend on the network
+def start_test_http_server(latency=0.05, payload_size=10_000, port=0):
+    """Start a threaded HTTP server that answers every GET after `latency` seconds.
+
+    Returns (server, base_url); call server.shutdown() when finished.
+    """
+    payload = b"x" * payload_size
+    
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # Avoid delayed-ACK stalls on keep-alive
+        
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        def log_message(self, format, *args):
+            pass  # Keep benchmark output clean
+    
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandInHandler)
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+# Benchmark workers: each returns (bytes, latency) for a single request
+_process_session = None
+
+def timed_fetch(session, url):
+    """Fetch a URL with a requests session and time it."""
+    start = time.perf_counter()
+    response = session.get(url)
+    return len(response.content), time.perf_counter() - start
+
+def timed_fetch_batch(urls):
+    """Fetch a batch of URLs in a worker process, reusing one session per process."""
+    global _process_session
+    if _process_session is None:
+        _process_session = requests.Session()
+    return [timed_fetch(_process_session, url) for url in urls]
+
+def run_sync_strategy(urls, workers):
+    with requests.Session() as session:
+        return [timed_fetch(session, url) for url in urls]
+
+def run_thread_strategy(urls, workers):
+    local = threading.local()
+    
+    def fetch(url):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return timed_fetch(local.session, url)
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fetch, urls))
+
+def run_process_strategy(urls, workers):
+    # One batch per process keeps pickling overhead to a single round trip each
+    size = -(-len(urls) // workers)
+    batches = [urls[i:i + size] for i in range(0, len(urls), size)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        return [item for batch in executor.map(timed_fetch_batch, batches) for item in batch]
+
+def run_async_strategy(urls, workers):
+    async def fetch(session, limit, url):
+        async with limit:
+            start = time.perf_counter()
+            async with session.get(url) as response:
+                body = await response.read()
+            return len(body), time.perf_counter() - start
+    
+    async def run():
+        limit = asyncio.Semaphore(workers)
+        connector = aiohttp.TCPConnector(limit=workers)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            return await asyncio.gather(*(fetch(session, limit, url) for url in urls))
+    
+    return asyncio.run(run())
+
+STRATEGIES = {
+    "sync": run_sync_strategy,
+    "thread": run_thread_strategy,
+    "process": run_process_strategy,
+    "asyncio": run_async_strategy,
+}
+
+def current_rss_mb():
+    """Resident set size of this process in MB (falls back to peak RSS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def benchmark_strategies(requests_count=200, latency=0.05, payload_size=10_000,
+                         workers=20, strategies=None):
+    """Run each concurrency strategy against a local stand-in server.
+
+    Returns a JSON string with throughput, p50/p99 latency and RSS per strategy.
+    """
+    server, base_url = start_test_http_server(latency, payload_size)
+    urls = [f"{base_url}/item/{i}" for i in range(requests_count)]
+    report = {
+        "config": {"requests": requests_count, "latency_s": latency,
+                   "payload_bytes": payload_size, "workers": workers},
+        "results": {},
+    }
+    try:
+        for name in strategies or STRATEGIES:
+            rss_before = current_rss_mb()
+            start = time.perf_counter()
+            samples = STRATEGIES[name](urls, workers)
+            elapsed = time.perf_counter() - start
+            latencies = sorted(sample[1] for sample in samples)
+            report["results"][name] = {
+                "requests_per_s": round(len(samples) / elapsed, 1),
+                "mb_per_s": round(sum(sample[0] for sample in samples) / elapsed / 1e6, 2),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                "rss_mb": round(current_rss_mb(), 1),
+                "rss_delta_mb": round(current_rss_mb() - rss_before, 1),
+            }
+            if name == "process":
+                import resource
+                # Worker processes have their own memory; report their peak RSS
+                children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+                report["results"][name]["worker_peak_rss_mb"] = round(children / 1e3, 1)
+    finally:
+        server.shutdown()
+    return json.dumps(report, indent=2)
+
 # Practical example: Async HTTP server
 async def handle_client(reader, writer):
     """Handle a client connection asynchronously."""
@@ -151,11 +306,12 @@ async def run_async_server():
         await server.serve_forever()
 
 # Real-world example: Async website crawler
-async def fetch_url(session, url):
+async def fetch_url(session, url, verbose=True):
     """Fetch a URL asynchronously."""
     try:
-        async with session.get(url, timeout=10) as response:
-            print(f"Fetched {url}, status: {response.status}")
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+            if verbose:
+                print(f"Fetched {url}, status: {response.status}")
             if response.status == 200:
                 return await response.text()
             return None
@@ -163,10 +319,11 @@ async def fetch_url(session, url):
         print(f"Error fetching {url}: {e}")
         return None
 
-async def parse_links(html, base_url):
-    """Parse HTML content to extract links (simplified)."""
-    # This is a very simplified link extractor
-    # In a real-world scenario, you would use a proper HTML parser
+def parse_links_by_line(html, base_url):
+    """Original line-splitting extractor (kept for the benchmark below).
+
+    Builds a list of every line and only finds the first href per line.
+    """
     links = []
     if html:
         for line in html.split('\n'):
@@ -183,46 +340,246 @@ async def parse_links(html, base_url):
                         links.append(link)
     return links
 
-async def crawl_website(start_url, max_depth=2, max_urls=20):
-    """Crawl a website asynchronously to a certain depth."""
-    print(f"Starting async crawl of {start_url} with depth {max_depth}")
+class LinkExtractor:
+    """Incremental link extractor that can be fed a page chunk by chunk.
+
+    A compiled bytes regex scans each raw chunk in place; only the matched URLs
+    are decoded. At most a short tail is carried over to the next chunk, so the
+    full page is never held in memory as one decoded string.
+    """
+
+    HREF_RE = re.compile(rb"""href\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+    MAX_CARRY = 2048  # longest href we expect to span a chunk boundary
+
+    def __init__(self, base_url, encoding='utf-8'):
+        self.base_url = base_url
+        self.encoding = encoding
+        self.links = []
+        self._carry = b''
+
+    def feed(self, chunk):
+        """Scan a bytes-like chunk for href attributes."""
+        buf = self._carry + chunk if self._carry else memoryview(chunk)
+        end = 0
+        for match in self.HREF_RE.finditer(buf):
+            self._add(match.group(1) if match.group(1) is not None else match.group(2))
+            end = match.end()
+        self._carry = bytes(buf[max(end, len(buf) - self.MAX_CARRY):])
+
+    def close(self):
+        self._carry = b''
+
+    def _add(self, raw):
+        link = html.unescape(raw.decode(self.encoding, errors='replace'))
+        # Handle relative URLs
+        if link.startswith('/'):
+            link = f"{self.base_url}{link}"
+        # Only add http/https links
+        if link.startswith(('http://', 'https://')):
+            self.links.append(link)
+
+async def parse_links(html, base_url):
+    """Parse HTML content to extract links."""
+    if not html:
+        return []
+    extractor = LinkExtractor(base_url)
+    extractor.feed(html.encode('utf-8'))
+    extractor.close()
+    return extractor.links
+
+async def fetch_links(session, url, base_url, extract=True, verbose=True):
+    """Stream a page and extract its links without building the page string.
+
+    Returns (bytes_read, links), or (None, []) if the fetch failed.
+    """
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+            if verbose:
+                print(f"Fetched {url}, status: {response.status}")
+            if response.status != 200:
+                return None, []
+            extractor = LinkExtractor(base_url, response.charset or 'utf-8') if extract else None
+            size = 0
+            async for chunk in response.content.iter_chunked(16 * 1024):
+                size += len(chunk)
+                if extractor:
+                    extractor.feed(chunk)
+            if not extractor:
+                return size, []
+            extractor.close()
+            return size, extractor.links
+    except Exception as e:
+        print(f"Error fetching {url}: {e}")
+        return None, []
+
+def benchmark_link_extractors(path=None, repeat=5):
+    """Compare the line-splitting and streaming extractors on a saved page."""
+    import tracemalloc
+    
+    if path is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', '..', '..', 'Day 2', 'Scraping', 'source.html')
+    with open(path, 'rb') as f:
+        raw = f.read()
+    size_mb = len(raw) / 1e6
+    base_url = "https://www.maxi.ca"
+    
+    def old_extractor():
+        # The old path needs the whole page decoded into one string
+        return parse_links_by_line(raw.decode('utf-8', errors='replace'), base_url)
+    
+    def new_extractor():
+        extractor = LinkExtractor(base_url)
+        view = memoryview(raw)
+        for i in range(0, len(raw), 16 * 1024):
+            extractor.feed(view[i:i + 16 * 1024])
+        extractor.close()
+        return extractor.links
+    
+    print("\nLINK EXTRACTOR BENCHMARK")
+    print("------------------------")
+    print(f"Input: {path} ({size_mb:.2f} MB)")
+    for name, extractor in (("line-split", old_extractor), ("streaming", new_extractor)):
+        start_time = time.perf_counter()
+        for _ in range(repeat):
+            links = extractor()
+        elapsed = (time.perf_counter() - start_time) / repeat
+        
+        tracemalloc.start()
+        extractor()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:>10}: {len(links):5d} links, {size_mb / elapsed:6.1f} MB/s, "
+              f"peak memory {peak / 1e6:.2f} MB")
+
+class CrawlFrontier:
+    """Deduplicating BFS frontier with per-host politeness limits.
+
+    Every URL is admitted at most once (checked when it is discovered, not
+    when it is popped), so duplicates never pile up in the queue.
+    """
+
+    def __init__(self, max_urls, per_host_limit=2):
+        self.max_urls = max_urls
+        self.per_host_limit = per_host_limit
+        self.seen = set()
+        self.host_slots = {}
+
+    def admit(self, url):
+        """Return True if the URL is new and the crawl budget allows it."""
+        if url in self.seen or len(self.seen) >= self.max_urls:
+            return False
+        self.seen.add(url)
+        return True
+
+    def host_slot(self, url):
+        """Semaphore limiting concurrent requests to the URL's host."""
+        host = urlsplit(url).netloc
+        slot = self.host_slots.get(host)
+        if slot is None:
+            slot = self.host_slots[host] = asyncio.Semaphore(self.per_host_limit)
+        return slot
+
+async def crawl_website(start_url, max_depth=2, max_urls=20, concurrency=10,
+                        per_host_limit=2, verbose=True):
+    """Crawl a website asynchronously to a certain depth.
+
+    N worker tasks share one asyncio.Queue. Each depth level is drained
+    completely (queue.join()) before the next one is enqueued, so pages are
+    visited in BFS order even though fetches within a level run concurrently.
+    """
+    if verbose:
+        print(f"Starting async crawl of {start_url} with depth {max_depth}")
     
     # Extract base URL
     url_parts = start_url.split('/')
     base_url = f"{url_parts[0]}//{url_parts[2]}"
     
-    # Track visited URLs and discovered URLs
-    visited = set()
-    to_visit = [(start_url, 0)]  # (url, depth)
+    frontier = CrawlFrontier(max_urls, per_host_limit)
+    frontier.admit(start_url)
+    queue = asyncio.Queue()
     results = {}
-    
-    async with aiohttp.ClientSession() as session:
-        while to_visit and len(visited) < max_urls:
-            # Get next URL to visit
-            url, depth = to_visit.pop(0)
-            
-            # Skip if already visited or exceeds depth
-            if url in visited or depth > max_depth:
-                continue
-            
-            print(f"Crawling {url} (depth {depth})")
-            visited.add(url)
-            
-            # Fetch the URL
-            html = await fetch_url(session, url)
-            if html:
-                results[url] = len(html)
-                
-                # If not at max depth, find links to visit next
-                if depth < max_depth:
-                    links = await parse_links(html, base_url)
+    next_level = []
+    
+    async def worker(session):
+        while True:
+            url, depth = await queue.get()
+            try:
+                # Only parse links if not at max depth
+                async with frontier.host_slot(url):
+                    size, links = await fetch_links(session, url, base_url,
+                                                    extract=depth < max_depth,
+                                                    verbose=verbose)
+                if size is not None:
+                    results[url] = size
                     for link in links:
-                        if link not in visited:
-                            to_visit.append((link, depth + 1))
+                        if frontier.admit(link):
+                            next_level.append(link)
+            finally:
+                queue.task_done()
     
-    print(f"Crawl complete. Visited {len(visited)} URLs.")
+    async with aiohttp.ClientSession() as session:
+        workers = [asyncio.create_task(worker(session)) for _ in range(concurrency)]
+        try:
+            level = [start_url]
+            for depth in range(max_depth + 1):
+                if not level:
+                    break
+                if verbose:
+                    print(f"Crawling depth {depth}: {len(level)} URLs")
+                for url in level:
+                    queue.put_nowait((url, depth))
+                await queue.join()
+                level, next_level = next_level, []
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    
+    if verbose:
+        print(f"Crawl complete. Visited {len(results)} URLs.")
     return results
 
+# Local stand-in site for benchmarking the crawler
+async def start_crawl_test_server(pages=1000, fanout=10, latency=0.01, port=0):
+    """Serve a synthetic site where /page/n links to pages n*fanout+1..n*fanout+fanout."""
+    from aiohttp import web
+    
+    async def page(request):
+        n = int(request.match_info['n'])
+        await asyncio.sleep(latency)
+        children = range(n * fanout + 1, min(n * fanout + fanout, pages - 1) + 1)
+        links = ''.join(f'<a href="/page/{c}">page {c}</a> <a href="/page/0">home</a>\n'
+                        for c in children)
+        return web.Response(text=f"<html><body><h1>Page {n}</h1>\n{links}</body></html>",
+                            content_type='text/html')
+    
+    app = web.Application()
+    app.router.add_get('/page/{n}', page)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+async def benchmark_crawler(pages=2000, fanout=10, latency=0.01, concurrency=(1, 10, 50)):
+    """Crawl the local stand-in site and report pages per second."""
+    print("\nCRAWLER BENCHMARK")
+    print("-----------------")
+    runner, base = await start_crawl_test_server(pages, fanout, latency)
+    try:
+        for workers in concurrency:
+            start_time = time.perf_counter()
+            results = await crawl_website(f"{base}/page/0", max_depth=10, max_urls=pages,
+                                          concurrency=workers, per_host_limit=workers,
+                                          verbose=False)
+            elapsed = time.perf_counter() - start_time
+            print(f"{workers:>4} workers: {len(results)} pages in {elapsed:.2f}s "
+                  f"({len(results) / elapsed:.0f} pages/s)")
+    finally:
+        await runner.cleanup()
+
 # Example of a real-world async task: Parallel API queries
 async def fetch_api_data(session, api_url, params=None):
     """Fetch data from an API asynchronously."""
@@ -303,11 +660,12 @@ async def async_web_scraper_demo():
 # Main function to demonstrate different approaches
 def main():
     """Main function to demonstrate concurrency approaches."""
-    import os  # Import here for the multiprocessing example
-    
     # Compare different approaches
     compare_approaches()
     
+    print("\nTo get a JSON report of throughput, latency and RSS per strategy, uncomment the following line:")
+    # print(benchmark_strategies())
+    
     # Run async demo if requested
     print("\nTo run the async web scraper demo, uncomment the following line:")
     # asyncio.run(async_web_scraper_demo())
@@ -315,6 +673,12 @@ def main():
     print("\nTo run the async crawler, uncomment the following line:")
     # asyncio.run(crawl_website("https://example.com", max_depth=1, max_urls=5))
     
+    print("\nTo benchmark the crawler against a local stand-in site, uncomment the following line:")
+    # asyncio.run(benchmark_crawler())
+    
+    print("\nTo benchmark the link extractors on the saved Maxi page, uncomment the following line:")
+    # benchmark_link_extractors()
+    
     print("\nTo run the parallel API queries demo, uncomment the following line:")
     # asyncio.run(parallel_api_queries())
     
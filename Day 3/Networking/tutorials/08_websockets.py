@@ -1,9 +1,11 @@
 import asyncio
 import websockets
+import websockets.exceptions
 import json
 import time
 import datetime
 import random
+import struct
 import signal
 import sys
 
@@ -14,8 +16,8 @@ async def websocket_server(websocket, path):
     print(f"Client {client_id} connected from {websocket.remote_address}")
     
     try:
-        # Register the client
-        CLIENTS[client_id] = websocket
+        # Register the client with the broadcast hub
+        HUB.register(client_id, websocket)
         
         # Send welcome message
         await websocket.send(json.dumps({
@@ -37,6 +39,16 @@ async def websocket_server(websocket, path):
                 data = json.loads(message)
                 print(f"Received from client {client_id}: {data}")
                 
+                # Delta subscription: stop full snapshots for those topics
+                if data.get("type") == "subscribe":
+                    topics = set(data.get("topics", [])) & set(DELTA_TOPICS)
+                    DELTAS.subscribe(client_id, websocket, topics,
+                                     symbols=data.get("symbols"),
+                                     binary=data.get("binary", False))
+                    if client_id in HUB.clients:
+                        HUB.clients[client_id].muted_topics = topics
+                    continue
+                
                 # Echo the message back with a timestamp
                 await websocket.send(json.dumps({
                     "type": "echo",
@@ -63,8 +75,8 @@ async def websocket_server(websocket, path):
         print(f"Client {client_id} disconnected: {e}")
     finally:
         # Unregister the client
-        if client_id in CLIENTS:
-            del CLIENTS[client_id]
+        await HUB.unregister(client_id)
+        DELTAS.unsubscribe(client_id)
         
         # Broadcast disconnection
         await broadcast({
@@ -73,26 +85,239 @@ async def websocket_server(websocket, path):
             "timestamp": datetime.datetime.now().isoformat()
         })
 
-async def broadcast(message, exclude=None):
+class ClientChannel:
+    """Bounded send queue for one client, drained by its own writer task."""
+
+    def __init__(self, hub, client_id, websocket, queue_size, policy):
+        self.hub = hub
+        self.client_id = client_id
+        self.websocket = websocket
+        self.policy = policy
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.muted_topics = set()  # Topics this client receives as deltas instead
+        self.dropped = 0
+        self.writer = asyncio.create_task(self._drain())
+
+    def offer(self, message):
+        """Queue a message without ever blocking the broadcaster."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            if self.policy == "disconnect":
+                self.hub.spawn(self.hub.unregister(self.client_id, close=True))
+                return
+            # drop_oldest: stale updates are worth less than the newest one
+            self.queue.get_nowait()
+            self.queue.put_nowait(message)
+            self.dropped += 1
+
+    async def _drain(self):
+        try:
+            while True:
+                message = await self.queue.get()
+                await self.websocket.send(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception as e:
+            # Anything else would end this writer silently and leave the
+            # client registered, with its queue filling up forever
+            print(f"Send to client {self.client_id} failed: {e!r}")
+            self.hub.spawn(self.websocket.close(code=1011, reason="Send failed"))
+        if self.hub.clients.get(self.client_id) is self:
+            del self.hub.clients[self.client_id]
+
+class BroadcastHub:
+    """Fan-out hub: serialize each message once, then enqueue it per client.
+
+    A slow client only fills its own queue; once full, the hub either drops
+    that client's oldest message or disconnects it, depending on `policy`.
+    """
+
+    def __init__(self, queue_size=100, policy="drop_oldest"):
+        if policy not in ("drop_oldest", "disconnect"):
+            raise ValueError(f"Unknown slow-client policy: {policy}")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.clients = {}
+        self.tasks = set()  # Background tasks, referenced until done so they aren't collected
+
+    def spawn(self, coro):
+        """Run a coroutine in the background, keeping a reference to its task."""
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def register(self, client_id, websocket):
+        channel = ClientChannel(self, client_id, websocket, self.queue_size, self.policy)
+        self.clients[client_id] = channel
+        return channel
+
+    async def unregister(self, client_id, close=False):
+        channel = self.clients.pop(client_id, None)
+        if channel is None:
+            return
+        channel.writer.cancel()
+        if close:
+            await channel.websocket.close(code=1008, reason="Client too slow")
+
+    def publish(self, message, exclude=None, topic=None):
+        """Serialize once and enqueue for every client; returns the client count."""
+        channels = [c for cid, c in self.clients.items()
+                    if cid != exclude and topic not in c.muted_topics]
+        if not channels:
+            return 0
+        if not isinstance(message, str):
+            message = json.dumps(message)
+        
+        for channel in channels:
+            channel.offer(message)
+        return len(channels)
+
+async def broadcast(message, exclude=None, topic=None):
     """Broadcast a message to all connected clients except the excluded one."""
+    HUB.publish(message, exclude=exclude, topic=topic)
+
+async def broadcast_sequential(message, clients, exclude=None):
+    """Original broadcast: awaits each send in turn (kept for the load test)."""
     if not isinstance(message, str):
         message = json.dumps(message)
     
-    disconnected_clients = []
-    for client_id, websocket in CLIENTS.items():
+    for client_id, websocket in clients.items():
         if client_id != exclude:
             try:
                 await websocket.send(message)
             except websockets.exceptions.ConnectionClosed:
-                disconnected_clients.append(client_id)
-    
-    # Clean up disconnected clients
-    for client_id in disconnected_clients:
-        if client_id in CLIENTS:
-            del CLIENTS[client_id]
+                pass
+
+# Hub tracking connected clients
+HUB = BroadcastHub()
+
+# Delta-encoded subscriptions for dashboard and stock updates
+DELTA_TOPICS = ("dashboard", "stocks")
+DELTA_HEADER = struct.Struct("!BdH")  # topic index, timestamp, field count
+DELTA_FIELD = struct.Struct("!Hd")    # field id, value (float64, as JSON would carry it)
+
+class DeltaSubscriber:
+    """One client's subscription state.
+
+    Changed fields are merged into `pending`; the writer task sends whatever
+    has accumulated since its last send, so a client that falls behind gets
+    one coalesced delta with the latest values instead of a backlog of ticks.
+    """
+
+    def __init__(self, publisher, client_id, websocket, topics, symbols=None, binary=False):
+        self.publisher = publisher
+        self.client_id = client_id
+        self.websocket = websocket
+        self.topics = set(topics)
+        self.symbols = set(symbols) if symbols else None
+        self.binary = binary
+        self.pending = {}
+        self.known_fields = {topic: set() for topic in DELTA_TOPICS}
+        self.ready = asyncio.Event()
+        self.writer = asyncio.create_task(self._drain())
+
+    def merge(self, topic, changes):
+        if topic not in self.topics:
+            return
+        if topic == "stocks" and self.symbols is not None:
+            changes = {k: v for k, v in changes.items() if k in self.symbols}
+        if changes:
+            self.pending.setdefault(topic, {}).update(changes)
+            self.ready.set()
+
+    async def _drain(self):
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                pending, self.pending = self.pending, {}
+                for topic, changes in pending.items():
+                    for frame in self.encode(topic, changes):
+                        await self.websocket.send(frame)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception as e:
+            print(f"Delta send to client {self.client_id} failed: {e!r}")
+        if self.publisher.subscribers.get(self.client_id) is self:
+            del self.publisher.subscribers[self.client_id]
+
+    def encode(self, topic, changes):
+        """Yield the frames for one delta (a schema frame first if needed)."""
+        now = time.time()
+        if not self.binary:
+            yield json.dumps({"type": "delta", "topic": topic, "ts": round(now, 3),
+                              "d": changes}, separators=(",", ":"))
+            return
+        
+        field_ids = self.publisher.field_ids[topic]
+        known = self.known_fields[topic]
+        new_fields = {name: field_ids[name] for name in changes if name not in known}
+        if new_fields:
+            # Tell the client which numeric ids its new fields stand for; only
+            # fields it receives are listed, so a symbol filter keeps this small
+            known.update(new_fields)
+            yield json.dumps({"type": "schema", "topic": topic, "fields": new_fields},
+                             separators=(",", ":"))
+        frame = bytearray(DELTA_HEADER.pack(DELTA_TOPICS.index(topic), now, len(changes)))
+        for name, value in changes.items():
+            frame += DELTA_FIELD.pack(field_ids[name], value)
+        yield bytes(frame)
+
+class DeltaPublisher:
+    """Tracks the latest value of every field and fans out only changes."""
+
+    def __init__(self):
+        self.state = {topic: {} for topic in DELTA_TOPICS}
+        self.field_ids = {topic: {} for topic in DELTA_TOPICS}
+        self.subscribers = {}
+
+    def subscribe(self, client_id, websocket, topics, symbols=None, binary=False):
+        self.unsubscribe(client_id)
+        subscriber = DeltaSubscriber(self, client_id, websocket, topics, symbols, binary)
+        self.subscribers[client_id] = subscriber
+        # Start the client off with the current snapshot of what it asked for
+        for topic, values in self.state.items():
+            subscriber.merge(topic, dict(values))
+        return subscriber
+
+    def unsubscribe(self, client_id):
+        subscriber = self.subscribers.pop(client_id, None)
+        if subscriber is not None:
+            subscriber.writer.cancel()
+
+    def update(self, topic, values):
+        """Diff `values` against the last state once and merge into every subscriber."""
+        state = self.state[topic]
+        field_ids = self.field_ids[topic]
+        changes = {}
+        for name, value in values.items():
+            if state.get(name) != value:
+                state[name] = value
+                changes[name] = value
+                if name not in field_ids:
+                    field_ids[name] = len(field_ids)
+        if changes:
+            for subscriber in self.subscribers.values():
+                subscriber.merge(topic, changes)
+        return changes
+
+def decode_binary_delta(frame, field_names):
+    """Client-side decoder for a binary delta frame.
+
+    `field_names` maps the topic's field ids to names: each schema frame's
+    "fields" maps newly seen names to their ids.
+    """
+    topic_index, timestamp, count = DELTA_HEADER.unpack_from(frame)
+    changes = {}
+    for i in range(count):
+        field_id, value = DELTA_FIELD.unpack_from(frame, DELTA_HEADER.size + i * DELTA_FIELD.size)
+        changes[field_names[field_id]] = value
+    return DELTA_TOPICS[topic_index], timestamp, changes
 
-# Dictionary to track connected clients
-CLIENTS = {}
+# Subscription state for delta clients
+DELTAS = DeltaPublisher()
 
 # Data simulation for a dashboard example
 async def generate_dashboard_data():
@@ -111,43 +336,207 @@ async def generate_dashboard_data():
             }
         }
         
-        # Broadcast to all clients
-        await broadcast(data)
+        # Broadcast full snapshots to legacy clients, changes to subscribers
+        await broadcast(data, topic="dashboard")
+        DELTAS.update("dashboard", data["metrics"])
         
         # Wait before sending next update
         await asyncio.sleep(5)
 
 # Stock price simulator
-async def generate_stock_prices():
-    """Generate simulated stock price data and broadcast to clients."""
-    # Starting prices for some stocks
-    stocks = {
+def initial_stock_prices():
+    """Starting prices for some stocks."""
+    return {
         "AAPL": 150.0,
         "MSFT": 300.0,
         "GOOG": 2500.0,
         "AMZN": 3000.0,
         "TSLA": 800.0
     }
+
+def next_stock_update(stocks):
+    """Apply one tick of random price changes and build the update message."""
+    # Update each stock with a small random change
+    for symbol in stocks:
+        # Random percentage change (-2% to +2%)
+        change_pct = random.uniform(-2, 2)
+        stocks[symbol] *= (1 + change_pct / 100)
+    
+    # Create the update message
+    return {
+        "type": "stock_update",
+        "timestamp": datetime.datetime.now().isoformat(),
+        "stocks": {symbol: round(price, 2) for symbol, price in stocks.items()}
+    }
+
+async def generate_stock_prices(interval=3):
+    """Generate simulated stock price data and broadcast to clients."""
+    stocks = initial_stock_prices()
     
     while True:
-        # Update each stock with a small random change
-        for symbol in stocks:
-            # Random percentage change (-2% to +2%)
-            change_pct = random.uniform(-2, 2)
-            stocks[symbol] *= (1 + change_pct / 100)
-        
-        # Create the update message
-        data = {
-            "type": "stock_update",
-            "timestamp": datetime.datetime.now().isoformat(),
-            "stocks": {symbol: round(price, 2) for symbol, price in stocks.items()}
-        }
-        
-        # Broadcast to all clients
-        await broadcast(data)
+        # Broadcast full snapshots to legacy clients, changes to subscribers
+        data = next_stock_update(stocks)
+        await broadcast(data, topic="stocks")
+        DELTAS.update("stocks", data["stocks"])
         
         # Wait before sending next update
-        await asyncio.sleep(3)
+        await asyncio.sleep(interval)
+
+# Fan-out load test with simulated clients
+class SimulatedClient:
+    """Stand-in for a websocket that records when each message arrives."""
+
+    def __init__(self, sent_at, latencies, delay=0.0):
+        self.sent_at = sent_at
+        self.latencies = latencies
+        self.delay = delay
+
+    async def send(self, message):
+        if self.delay:
+            await asyncio.sleep(self.delay)  # Simulate a slow consumer
+        self.latencies.append(time.perf_counter() - self.sent_at[message])
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+async def fanout_load_test(num_clients=5000, ticks=20, interval=0.05,
+                           slow_fraction=0.01, slow_delay=0.1, sequential_ticks=3):
+    """Measure end-to-end fan-out latency of stock ticks for both broadcasters.
+
+    The sequential broadcaster only runs `sequential_ticks` ticks, since every
+    tick waits for all slow clients in turn.
+    """
+    print("\nFAN-OUT LOAD TEST")
+    print("-----------------")
+    print(f"{num_clients} clients, {int(num_clients * slow_fraction)} slow "
+          f"({slow_delay * 1000:.0f} ms per send), {ticks} ticks every {interval * 1000:.0f} ms")
+    
+    def make_clients(sent_at, fast, slow):
+        num_slow = int(num_clients * slow_fraction)
+        return {i: SimulatedClient(sent_at, slow if i < num_slow else fast,
+                                   slow_delay if i < num_slow else 0.0)
+                for i in range(num_clients)}
+    
+    def report(name, fast, slow, elapsed):
+        fast.sort()
+        print(f"{name:>10}: {len(fast) + len(slow)} deliveries in {elapsed:.2f}s, "
+              f"fast-client p50 {fast[len(fast) // 2] * 1000:.2f} ms, "
+              f"p99 {fast[int(len(fast) * 0.99)] * 1000:.2f} ms")
+    
+    # Sequential broadcast: every tick waits for every client in turn
+    sent_at, fast, slow = {}, [], []
+    clients = make_clients(sent_at, fast, slow)
+    stocks = initial_stock_prices()
+    start = time.perf_counter()
+    for _ in range(sequential_ticks):
+        message = json.dumps(next_stock_update(stocks))
+        sent_at[message] = time.perf_counter()
+        await broadcast_sequential(message, clients)
+        await asyncio.sleep(interval)
+    report("sequential", fast, slow, time.perf_counter() - start)
+    
+    # Hub broadcast: one serialization, per-client queues and writers
+    sent_at, fast, slow = {}, [], []
+    hub = BroadcastHub(queue_size=2)
+    for client_id, client in make_clients(sent_at, fast, slow).items():
+        hub.register(client_id, client)
+    stocks = initial_stock_prices()
+    start = time.perf_counter()
+    for _ in range(ticks):
+        message = json.dumps(next_stock_update(stocks))
+        sent_at[message] = time.perf_counter()
+        hub.publish(message)
+        await asyncio.sleep(interval)
+    # Wait for the fast clients' writers to finish the last tick
+    expected = ticks * (num_clients - int(num_clients * slow_fraction))
+    while len(fast) < expected:
+        await asyncio.sleep(0.001)
+    report("hub", fast, slow, time.perf_counter() - start)
+    dropped = sum(channel.dropped for channel in hub.clients.values())
+    print(f"{'':>10}  {dropped} stale ticks dropped for slow clients")
+    for client_id in list(hub.clients):
+        await hub.unregister(client_id)
+
+# Snapshot vs delta bandwidth and CPU measurement
+class ByteCountingClient:
+    """Stand-in for a websocket that only counts bytes sent to it."""
+
+    def __init__(self):
+        self.bytes = 0
+        self.frames = 0
+
+    async def send(self, message):
+        self.bytes += len(message) if isinstance(message, bytes) else len(message.encode())
+        self.frames += 1
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+async def delta_bandwidth_benchmark(num_clients=200, num_symbols=500, symbols_per_client=100,
+                                    change_fraction=0.1, ticks=50, tick_interval=3):
+    """Compare bytes/s and CPU per tick for full snapshots vs JSON and binary deltas."""
+    print("\nSNAPSHOT VS DELTA BENCHMARK")
+    print("---------------------------")
+    print(f"{num_clients} clients x {symbols_per_client} of {num_symbols} symbols, "
+          f"{change_fraction:.0%} of prices change per tick, {ticks} ticks")
+    
+    rng = random.Random(42)
+    symbols = [f"SYM{i:03d}" for i in range(num_symbols)]
+    subscriptions = [rng.sample(symbols, symbols_per_client) for _ in range(num_clients)]
+    
+    def price_ticks():
+        prices = {symbol: round(rng.uniform(10, 1000), 2) for symbol in symbols}
+        yield dict(prices)
+        for _ in range(ticks - 1):
+            for symbol in rng.sample(symbols, int(num_symbols * change_fraction)):
+                prices[symbol] = round(prices[symbol] * (1 + rng.uniform(-2, 2) / 100), 2)
+            yield dict(prices)
+    
+    async def settle(channels):
+        # Let every writer task send what it has queued
+        while any(c.pending or c.ready.is_set() for c in channels):
+            await asyncio.sleep(0)
+    
+    async def run_snapshot():
+        hub = BroadcastHub(queue_size=ticks)
+        clients = [ByteCountingClient() for _ in range(num_clients)]
+        for i, client in enumerate(clients):
+            hub.register(i, client)
+        cpu = time.process_time()
+        for prices in price_ticks():
+            hub.publish({"type": "stock_update",
+                         "timestamp": datetime.datetime.now().isoformat(),
+                         "stocks": prices})
+            while any(not c.queue.empty() for c in hub.clients.values()):
+                await asyncio.sleep(0)
+        cpu = time.process_time() - cpu
+        for i in range(num_clients):
+            await hub.unregister(i)
+        return clients, cpu
+    
+    async def run_delta(binary):
+        publisher = DeltaPublisher()
+        clients = [ByteCountingClient() for _ in range(num_clients)]
+        for i, client in enumerate(clients):
+            publisher.subscribe(i, client, {"stocks"}, subscriptions[i], binary)
+        cpu = time.process_time()
+        for prices in price_ticks():
+            publisher.update("stocks", prices)
+            await settle(publisher.subscribers.values())
+        cpu = time.process_time() - cpu
+        for i in range(num_clients):
+            publisher.unsubscribe(i)
+        return clients, cpu
+    
+    for name, run in (("snapshot", run_snapshot()),
+                      ("json delta", run_delta(False)),
+                      ("bin delta", run_delta(True))):
+        rng.seed(42)
+        clients, cpu = await run
+        total = sum(client.bytes for client in clients)
+        print(f"{name:>10}: {total / ticks / 1e3:9.1f} KB/tick, "
+              f"{total / (ticks * tick_interval) / 1e3:8.1f} KB/s at one tick per {tick_interval}s, "
+              f"{cpu / ticks * 1000:6.2f} ms CPU/tick")
 
 # WebSocket client example
 async def websocket_client(uri):
@@ -435,6 +824,8 @@ def main():
     # Uncomment one of these to run the demonstration
     # asyncio.run(start_server())
     # asyncio.run(websocket_client('ws://localhost:8765'))
+    # asyncio.run(fanout_load_test())
+    # asyncio.run(delta_bandwidth_benchmark())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
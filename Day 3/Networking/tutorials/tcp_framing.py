@@ -0,0 +1,225 @@
+"""
+Length-prefixed message framing over TCP.
+
+TCP is a byte stream: one send() on one side does not mean one recv() on the
+other. A single recv(1024) may return half a message, or two messages glued
+together. Framing fixes this by putting a 4-byte big-endian length in front
+of every message:
+
+    +----------------+---------------------------+
+    | length (4 B)   | payload (length bytes)    |
+    +----------------+---------------------------+
+
+The receiver reads the length, then exactly that many bytes. Because every
+message carries its own boundary, the sender can pipeline many messages
+without waiting for an acknowledgment after each one.
+
+Sync API:   send_frame(), send_frames(), FrameReader
+Async API:  write_frame(), write_frames(), read_frame()
+"""
+
+import asyncio
+import random
+import socket
+import struct
+import threading
+import time
+
+HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 64 * 1024 * 1024  # Refuse absurd lengths from a corrupt stream
+
+# -----------------------------------------------------------------------------
+# SYNC FLAVOR
+# -----------------------------------------------------------------------------
+
+def send_frame(sock, payload):
+    """Send one framed message (header and payload in a single syscall)."""
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+def send_frames(sock, payloads, batch_size=256 * 1024):
+    """Send many framed messages back to back, with no per-message ack.
+
+    Small frames are coalesced into one buffer so each sendall() moves at
+    least `batch_size` bytes; large payloads are sent without copying.
+    """
+    batch = bytearray()
+    for payload in payloads:
+        batch += HEADER.pack(len(payload))
+        if len(payload) >= batch_size:
+            sock.sendall(batch)
+            sock.sendall(payload)
+            batch.clear()
+            continue
+        batch += payload
+        if len(batch) >= batch_size:
+            sock.sendall(batch)
+            batch.clear()
+    if batch:
+        sock.sendall(batch)
+
+class FrameReader:
+    """Read framed messages with recv_into() over one reusable buffer.
+
+    read_frame() returns a memoryview into the internal buffer; it is only
+    valid until the next call. Copy it with bytes() if you need to keep it.
+    """
+
+    def __init__(self, sock, buffer_size=1024 * 1024):
+        self.sock = sock
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # First unread byte
+        self.end = 0    # One past the last received byte
+
+    def _fill(self, needed):
+        """Receive until at least `needed` unread bytes are buffered."""
+        if self.start + needed > len(self.buffer):
+            # Move the unread tail to the front, growing for oversized frames
+            unread = self.end - self.start
+            if needed > len(self.buffer):
+                new_buffer = bytearray(needed)
+                new_buffer[:unread] = self.view[self.start:self.end]
+                self.buffer = new_buffer
+                self.view = memoryview(new_buffer)
+            else:
+                self.view[:unread] = self.view[self.start:self.end]
+            self.start, self.end = 0, unread
+
+        while self.end - self.start < needed:
+            received = self.sock.recv_into(self.view[self.end:])
+            if not received:
+                if self.end == self.start:
+                    return False  # Clean close between frames
+                raise ConnectionError("Connection closed in the middle of a frame")
+            self.end += received
+        return True
+
+    def read_frame(self):
+        """Return the next payload as a memoryview, or None at end of stream."""
+        if not self._fill(HEADER.size):
+            return None
+        (length,) = HEADER.unpack_from(self.buffer, self.start)
+        if length > MAX_FRAME_SIZE:
+            raise ValueError(f"Frame of {length} bytes exceeds MAX_FRAME_SIZE")
+        self.start += HEADER.size
+        if not self._fill(length):
+            raise ConnectionError("Connection closed in the middle of a frame")
+        frame = self.view[self.start:self.start + length]
+        self.start += length
+        return frame
+
+    def __iter__(self):
+        while True:
+            frame = self.read_frame()
+            if frame is None:
+                return
+            yield frame
+
+# -----------------------------------------------------------------------------
+# ASYNCIO FLAVOR
+# -----------------------------------------------------------------------------
+
+def write_frame(writer, payload):
+    """Queue one framed message on an asyncio StreamWriter."""
+    writer.writelines((HEADER.pack(len(payload)), payload))
+
+async def write_frames(writer, payloads, drain_every=1024 * 1024):
+    """Pipeline many framed messages, draining only every `drain_every` bytes."""
+    pending = 0
+    for payload in payloads:
+        writer.writelines((HEADER.pack(len(payload)), payload))
+        pending += HEADER.size + len(payload)
+        if pending >= drain_every:
+            await writer.drain()
+            pending = 0
+    await writer.drain()
+
+async def read_frame(reader):
+    """Return the next payload as bytes, or None at end of stream."""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ConnectionError("Connection closed in the middle of a frame") from e
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame of {length} bytes exceeds MAX_FRAME_SIZE")
+    return await reader.readexactly(length)
+
+# -----------------------------------------------------------------------------
+# BENCHMARK
+# -----------------------------------------------------------------------------
+
+def mixed_size_frames(total_bytes, max_size=64 * 1024, seed=42):
+    """Yield memoryview slices of mixed sizes (mostly small, some large)."""
+    rng = random.Random(seed)
+    source = memoryview(bytes(rng.getrandbits(8) for _ in range(max_size)))
+    sent = 0
+    while sent < total_bytes:
+        # Log-uniform sizes: plenty of tiny records and the odd bulk one
+        size = min(max_size, int(2 ** rng.uniform(4, 16)))
+        yield source[:size]
+        sent += size
+
+def benchmark_sync(total_bytes):
+    server = socket.create_server(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+    stats = {}
+
+    def receive():
+        conn, _ = server.accept()
+        with conn:
+            frames = received = 0
+            for frame in FrameReader(conn):
+                frames += 1
+                received += len(frame)
+            stats.update(frames=frames, bytes=received)
+
+    receiver = threading.Thread(target=receive)
+    receiver.start()
+    start = time.perf_counter()
+    with socket.create_connection(("127.0.0.1", port)) as client:
+        send_frames(client, mixed_size_frames(total_bytes))
+    receiver.join()
+    server.close()
+    return stats, time.perf_counter() - start
+
+def benchmark_async(total_bytes):
+    stats = {}
+
+    async def handle(reader, writer):
+        frames = received = 0
+        while (frame := await read_frame(reader)) is not None:
+            frames += 1
+            received += len(frame)
+        stats.update(frames=frames, bytes=received)
+        writer.close()
+        done.set()
+
+    async def run():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        await write_frames(writer, mixed_size_frames(total_bytes))
+        writer.close()
+        await done.wait()
+        server.close()
+
+    done = asyncio.Event()
+    start = time.perf_counter()
+    asyncio.run(run())
+    return stats, time.perf_counter() - start
+
+def benchmark_framing(total_bytes=1024 ** 3):
+    """Push `total_bytes` of mixed-size frames over loopback (default 1 GB)."""
+    print("FRAMING BENCHMARK")
+    print("-----------------")
+    for name, bench in (("sync", benchmark_sync), ("asyncio", benchmark_async)):
+        stats, elapsed = bench(total_bytes)
+        print(f"{name:>8}: {stats['frames']:,} frames, {stats['bytes'] / 1e9:.2f} GB "
+              f"in {elapsed:.2f}s -> {stats['bytes'] / elapsed / 1e6:,.0f} MB/s, "
+              f"{stats['frames'] / elapsed:,.0f} frames/s")
+
+if __name__ == "__main__":
+    benchmark_framing()
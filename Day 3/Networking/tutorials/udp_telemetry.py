@@ -0,0 +1,340 @@
+"""
+Batched UDP telemetry transport with sequence numbers and reassembly.
+
+04_2_udp_communication.py sends one reading per datagram and waits for a
+reply each time. For sensor-style telemetry that wastes most of every packet
+on headers and most of the time on round trips. This module:
+
+1. Packs many small readings into each datagram, up to an MTU budget
+2. Tags every datagram with a sequence number
+3. Reassembles datagrams in order on the receiver with a sliding window
+4. Optionally asks for lost datagrams again (selective retransmission, NACKs)
+
+Wire format (network byte order):
+
+    DATA  | type=1 (B) | seq (I) | count (H) | count x reading (H d f) |
+    NACK  | type=2 (B) | count (H) | count x seq (I) |
+    SYNC  | type=3 (B) | next_seq (I) |
+
+A reading is (sensor_id: uint16, timestamp: float64, value: float32).
+Sequence numbers wrap around modulo 2**32; the receiver compares them with
+serial-number arithmetic (RFC 1982) and counts internally without wrapping.
+
+Python has no sendmmsg()/recvmmsg(), so batching happens at two other
+levels: many readings per datagram, and the receiver draining every queued
+datagram with recv_into() per wakeup instead of one select() per datagram.
+"""
+
+import random
+import select
+import socket
+import struct
+import threading
+import time
+
+DATA, NACK, SYNC = 1, 2, 3
+
+DATA_HEADER = struct.Struct("!BIH")
+NACK_HEADER = struct.Struct("!BH")
+SYNC_PACKET = struct.Struct("!BI")
+READING = struct.Struct("!Hdf")
+SEQ = struct.Struct("!I")
+SEQ_MODULO = 1 << 32
+
+DEFAULT_MTU_PAYLOAD = 1400  # Stay below a 1500-byte Ethernet MTU after IP/UDP headers
+
+# -----------------------------------------------------------------------------
+# SENDER
+# -----------------------------------------------------------------------------
+
+class TelemetrySender:
+    """Buffers readings and sends them as sequenced, MTU-sized datagrams."""
+
+    def __init__(self, address, mtu_payload=DEFAULT_MTU_PAYLOAD, window=4096,
+                 retransmit=True, sock=None):
+        self.address = address
+        self.sock = sock or socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.retransmit = retransmit
+        self.window = window
+        self.readings_per_datagram = max(1, (mtu_payload - DATA_HEADER.size) // READING.size)
+        self.buffer = bytearray()
+        self.count = 0
+        self.next_seq = 0
+        self.sent = {}  # seq -> datagram, kept for retransmission
+        self.stats = {"datagrams": 0, "retransmitted": 0}
+
+    def send(self, sensor_id, value, timestamp=None):
+        """Queue one reading; a datagram goes out whenever the MTU budget is full."""
+        self.buffer += READING.pack(sensor_id, time.time() if timestamp is None else timestamp, value)
+        self.count += 1
+        if self.count >= self.readings_per_datagram:
+            self.flush()
+
+    def flush(self):
+        """Send whatever readings are buffered as one datagram."""
+        if not self.count:
+            return
+        datagram = DATA_HEADER.pack(DATA, self.next_seq, self.count) + self.buffer
+        self.sock.sendto(datagram, self.address)
+        if self.retransmit:
+            self.sent[self.next_seq] = datagram
+            self.sent.pop((self.next_seq - self.window) % SEQ_MODULO, None)
+        self.stats["datagrams"] += 1
+        self.next_seq = (self.next_seq + 1) % SEQ_MODULO
+        self.buffer.clear()
+        self.count = 0
+
+    def sync(self):
+        """Tell the receiver the next sequence number, so it can spot tail losses."""
+        self.flush()
+        self.sock.sendto(SYNC_PACKET.pack(SYNC, self.next_seq), self.address)
+
+    def service(self, timeout=0.0):
+        """Answer any NACKs waiting on the socket by resending those datagrams."""
+        while select.select([self.sock], [], [], timeout)[0]:
+            timeout = 0.0
+            packet, _ = self.sock.recvfrom(65535)
+            if packet[0] != NACK:
+                continue
+            (_, count) = NACK_HEADER.unpack_from(packet)
+            for i in range(count):
+                (seq,) = SEQ.unpack_from(packet, NACK_HEADER.size + i * SEQ.size)
+                datagram = self.sent.get(seq)
+                if datagram is not None:
+                    self.sock.sendto(datagram, self.address)
+                    self.stats["retransmitted"] += 1
+
+    def close(self):
+        self.sync()
+        self.sock.close()
+
+# -----------------------------------------------------------------------------
+# RECEIVER
+# -----------------------------------------------------------------------------
+
+class TelemetryReceiver:
+    """Reassembles sequenced datagrams in order using a sliding window.
+
+    Out-of-order datagrams wait in `pending` until the gap before them fills.
+    A gap is given up on (counted as lost) once the first datagram waiting
+    behind it has waited `give_up_after` seconds, or the gap spans more than
+    `window` datagrams. With `retransmit` on, gaps are NACKed to the sender
+    every `nack_interval` seconds until then.
+
+    `next_seq` and `highest_seq` count on past 2**32; unwrap() maps a
+    sequence number from the wire onto that count.
+    """
+
+    def __init__(self, bind_address=("127.0.0.1", 0), window=4096, retransmit=True,
+                 nack_interval=0.01, give_up_after=None, recv_buffer=4 * 1024 * 1024):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer)
+        self.sock.bind(bind_address)
+        self.sock.setblocking(False)
+        self.address = self.sock.getsockname()
+        self.window = window
+        self.retransmit = retransmit
+        self.nack_interval = nack_interval
+        self.give_up_after = give_up_after if give_up_after is not None else (
+            0.5 if retransmit else 0.02)
+        self.packet = bytearray(65535)
+        self.view = memoryview(self.packet)
+        self.next_seq = 0
+        self.highest_seq = -1  # Highest sequence number known to exist
+        self.pending = {}      # seq -> (arrival time, list of readings)
+        self.sync_time = 0.0
+        self.last_nack = 0.0
+        self.sender = None
+        self.stats = {"datagrams": 0, "delivered": 0, "lost": 0, "duplicates": 0, "nacks": 0}
+
+    def unwrap(self, seq):
+        """The unwrapped sequence number closest to next_seq for a 32-bit `seq`."""
+        distance = (seq - self.next_seq) % SEQ_MODULO
+        if distance >= SEQ_MODULO // 2:
+            distance -= SEQ_MODULO  # Behind next_seq: an old datagram
+        return self.next_seq + distance
+
+    def poll(self, timeout=0.1):
+        """Wait up to `timeout`, drain every queued datagram and return in-order readings."""
+        delivered = []
+        if select.select([self.sock], [], [], timeout)[0]:
+            while True:
+                try:
+                    size, self.sender = self.sock.recvfrom_into(self.packet)
+                except BlockingIOError:
+                    break
+                self._handle(self.view[:size])
+        self._advance(delivered)
+        return delivered
+
+    def _handle(self, packet):
+        kind = packet[0]
+        if kind == SYNC:
+            (_, next_seq) = SYNC_PACKET.unpack_from(packet)
+            next_seq = self.unwrap(next_seq)
+            if next_seq - 1 > self.highest_seq:
+                self.highest_seq = next_seq - 1
+                self.sync_time = time.monotonic()
+            return
+        if kind != DATA:
+            return
+        (_, seq, count) = DATA_HEADER.unpack_from(packet)
+        seq = self.unwrap(seq)
+        if seq < self.next_seq or seq in self.pending:
+            self.stats["duplicates"] += 1
+            return
+        self.stats["datagrams"] += 1
+        self.pending[seq] = (time.monotonic(), list(READING.iter_unpack(packet[DATA_HEADER.size:])))
+        self.highest_seq = max(self.highest_seq, seq)
+
+    def _advance(self, delivered):
+        now = time.monotonic()
+        while True:
+            # Deliver the contiguous run starting at next_seq
+            while self.next_seq in self.pending:
+                _, readings = self.pending.pop(self.next_seq)
+                delivered.extend(readings)
+                self.stats["delivered"] += len(readings)
+                self.next_seq += 1
+            if self.next_seq > self.highest_seq:
+                return
+
+            # There is a gap at next_seq; age it by whatever is waiting behind it
+            too_old = now - self._waiting_since() > self.give_up_after
+            too_wide = self.highest_seq - self.next_seq >= self.window
+            if not (too_old or too_wide):
+                break
+            self.stats["lost"] += 1
+            self.next_seq += 1
+
+        if self.retransmit and self.sender and now - self.last_nack >= self.nack_interval:
+            self._send_nack()
+            self.last_nack = now
+
+    def _waiting_since(self):
+        for seq in range(self.next_seq + 1, self.highest_seq + 1):
+            if seq in self.pending:
+                return self.pending[seq][0]
+        return self.sync_time
+
+    def _send_nack(self):
+        missing = [seq for seq in range(self.next_seq, self.highest_seq + 1)
+                   if seq not in self.pending]
+        # Keep the NACK itself inside one datagram
+        missing = missing[:(DEFAULT_MTU_PAYLOAD - NACK_HEADER.size) // SEQ.size]
+        if missing:
+            packet = NACK_HEADER.pack(NACK, len(missing)) + b"".join(SEQ.pack(s % SEQ_MODULO) for s in missing)
+            self.sock.sendto(packet, self.sender)
+            self.stats["nacks"] += 1
+
+    def close(self):
+        self.sock.close()
+
+# -----------------------------------------------------------------------------
+# BENCHMARK
+# -----------------------------------------------------------------------------
+
+class LossySocket:
+    """Wraps a UDP socket and drops a fraction of outgoing datagrams."""
+
+    def __init__(self, sock, loss_rate, seed=7):
+        self.sock = sock
+        self.loss_rate = loss_rate
+        self.rng = random.Random(seed)
+
+    def sendto(self, data, address):
+        if self.rng.random() >= self.loss_rate:
+            self.sock.sendto(data, address)
+
+    def recvfrom(self, size):
+        return self.sock.recvfrom(size)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def close(self):
+        self.sock.close()
+
+def run_transfer(readings=200_000, loss_rate=0.01, retransmit=True,
+                 mtu_payload=DEFAULT_MTU_PAYLOAD, rate_limit=5000):
+    """Send `readings` over loopback with injected loss and measure the result.
+
+    The sender paces itself to `rate_limit` datagrams per burst so the kernel
+    receive buffer, not the injected loss, stays out of the picture.
+    """
+    receiver = TelemetryReceiver(retransmit=retransmit)
+    raw = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender = TelemetrySender(receiver.address, mtu_payload, retransmit=retransmit,
+                             sock=LossySocket(raw, loss_rate))
+    received = []
+    done = threading.Event()
+    cpu = {}
+
+    def receive():
+        start = time.thread_time()
+        quiet_since = None
+        while True:
+            batch = receiver.poll(0.01)
+            received.extend(batch)
+            finished = (receiver.next_seq > receiver.highest_seq
+                        and receiver.highest_seq >= receiver.unwrap(sender.next_seq) - 1)
+            if done.is_set() and finished:
+                if quiet_since is None:
+                    quiet_since = time.monotonic()
+                elif time.monotonic() - quiet_since > 0.05:
+                    break
+            elif batch:
+                quiet_since = None
+        cpu["receiver"] = time.thread_time() - start
+
+    thread = threading.Thread(target=receive)
+    thread.start()
+    start = time.perf_counter()
+    sender_cpu = time.thread_time()
+    for i in range(readings):
+        sender.send(i % 1000, float(i))
+        if retransmit and i % (sender.readings_per_datagram * 64) == 0:
+            sender.service()
+        if i % (sender.readings_per_datagram * rate_limit) == 0:
+            time.sleep(0.001)
+    sender.sync()
+    # Keep answering NACKs until the receiver has caught up
+    deadline = time.monotonic() + 2.0
+    while time.monotonic() < deadline and receiver.next_seq < receiver.unwrap(sender.next_seq):
+        if retransmit:
+            sender.service(0.005)
+        sender.sync()
+        time.sleep(0.005)
+    done.set()
+    sender_cpu = time.thread_time() - sender_cpu
+    thread.join()
+    elapsed = time.perf_counter() - start
+    sender.close()
+    receiver.close()
+
+    payload = len(received) * READING.size
+    return {
+        "delivered": f"{len(received) / readings:.2%}",
+        "goodput_mb_s": round(payload / elapsed / 1e6, 2),
+        "readings_per_s": round(len(received) / elapsed),
+        "cpu_us_per_msg": round((sender_cpu + cpu["receiver"]) / max(1, len(received)) * 1e6, 2),
+        "retransmitted": sender.stats["retransmitted"],
+        "lost_datagrams": receiver.stats["lost"],
+    }
+
+def benchmark_telemetry(readings=200_000):
+    """Compare per-reading datagrams with batching, with and without retransmission."""
+    print("UDP TELEMETRY BENCHMARK")
+    print("-----------------------")
+    cases = [
+        ("1 reading/datagram, 0% loss", dict(loss_rate=0.0, retransmit=False,
+                                             mtu_payload=DATA_HEADER.size + READING.size)),
+        ("batched, 0% loss", dict(loss_rate=0.0, retransmit=False)),
+        ("batched, 2% loss, no retransmit", dict(loss_rate=0.02, retransmit=False)),
+        ("batched, 2% loss, retransmit", dict(loss_rate=0.02, retransmit=True)),
+    ]
+    for name, options in cases:
+        print(f"{name:>32}: {run_transfer(readings, **options)}")
+
+if __name__ == "__main__":
+    benchmark_telemetry()